@@ -0,0 +1,77 @@
+"""
+Latency / throughput of the flat forest engine vs plain sklearn.
+
+The flat engine removes sklearn's per-call validation and per-tree dispatch,
+so it wins by ~100x on single rows and still leads at matchweek/season sized
+batches. For very large offline batches (10k+ rows) sklearn's compiled tree
+walk is faster; use the sklearn model there.
+
+Run from the project root after training the model:
+    python benchmarks/bench_forest_engine.py
+"""
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from forest_engine import FlatForest
+
+MODEL_PATH = os.path.join("outputs", "final_rf_model.joblib")
+DATA_PATH = os.path.join("data", "processed", "chelsea_features_odds.csv")
+
+SINGLE_ROW_CALLS = 200
+BATCH_SIZES = [1, 38, 380, 10000]
+
+
+def latency(fn, calls):
+    times = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    times = np.array(times) * 1000
+    return np.percentile(times, 50), np.percentile(times, 99)
+
+
+def main():
+    bundle = joblib.load(MODEL_PATH)
+    model = bundle["model"]
+    FEATURES = bundle["features"]
+    flat = FlatForest.from_model(model)
+
+    X = pd.read_csv(DATA_PATH)[FEATURES].dropna().to_numpy(dtype=float)
+    rng = np.random.default_rng(0)
+
+    row = X[:1]
+    row_df = pd.DataFrame(row, columns=FEATURES)
+    sk_calls = max(SINGLE_ROW_CALLS // 10, 10)
+
+    print("Single-row latency (ms)")
+    p50, p99 = latency(lambda: model.predict_proba(row_df), sk_calls)
+    print(f"  sklearn   p50={p50:8.3f}  p99={p99:8.3f}")
+    p50, p99 = latency(lambda: flat.predict_proba(row), SINGLE_ROW_CALLS)
+    print(f"  flat      p50={p50:8.3f}  p99={p99:8.3f}")
+
+    print("\nBatch throughput (rows/s)")
+    for n in BATCH_SIZES:
+        batch = X[rng.integers(0, len(X), n)]
+        batch_df = pd.DataFrame(batch, columns=FEATURES)
+
+        t0 = time.perf_counter()
+        expected = model.predict_proba(batch_df)
+        sk = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        got = flat.predict_proba(batch)
+        fl = time.perf_counter() - t0
+
+        same = np.array_equal(expected, got)
+        print(f"  n={n:6d}  sklearn={n / sk:12.0f}  flat={n / fl:12.0f}  speedup={sk / fl:6.1f}x  identical={same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+"""
+Benchmark suite with stored baselines and regression gating.
+
+Covers:
+  * every src/0*_*.py stage, run as a script on synthetic match histories
+    scaled up from data/raw (1x, 10x, 100x the real ~2,300 EPL rows)
+  * parse_scorelines, and the compiled feature transform on 1 and 5,000
+    raw fixtures
+  * single-row and batch predict_proba for the saved bundle (sklearn model
+    and the flat engine the app serves with, plus the compacted forest if
+    src/18_compact_forest.py has been run), and a prediction cache hit
+  * the Flask index() handler (GET and form POST) via the test client,
+    with and without metrics recording (instrumentation overhead)
+  * cold start of the web app and both CLIs in fresh interpreters: import
+    time, model load time and first-prediction latency
+
+Run from the project root after training the model:
+    python benchmarks/bench_suite.py run                      # -> benchmarks/results/latest.json
+    python benchmarks/bench_suite.py run --save-baseline      # -> benchmarks/baselines/default.json
+    python benchmarks/bench_suite.py compare                  # latest vs baseline, exit 1 on regressions
+    python benchmarks/bench_suite.py startup                  # cold-start report only
+
+Each synthetic copy of the raw files renames every club except Chelsea, so
+fixtures stay unique while Chelsea's history (and every stage's workload)
+grows with the scale factor.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
+
+RAW_GLOB = os.path.join("data", "raw", "E0*.csv")
+MODEL_PATH = os.path.join("outputs", "final_rf_model.joblib")
+DATA_PATH = os.path.join("data", "processed", "chelsea_features_odds.csv")
+
+RESULTS_DIR = os.path.join("benchmarks", "results")
+BASELINE_DIR = os.path.join("benchmarks", "baselines")
+LATEST_PATH = os.path.join(RESULTS_DIR, "latest.json")
+
+SCALES = [1, 10, 100]
+TEAM = "Chelsea"
+THRESHOLD = 0.20  # flag cases more than 20% slower than the baseline
+BATCH_ROWS = 380  # one season of fixtures
+FEATURIZE_ROWS = 5000  # raw fixtures featurized per call
+
+APP_FORM = {
+    "is_home": "1", "odds_win": "1.8", "odds_draw": "3.6", "odds_loss": "4.5",
+    "last5_scores": "2-1,0-0,1-2,3-0,1-1",
+}
+
+# Modules the serving path should never import
+HEAVY_MODULES = ["pandas", "sklearn", "scipy", "joblib"]
+FIXTURE_ARGS = ["--is_home", "1", "--odds_win", "1.8", "--odds_draw", "3.6", "--odds_loss", "4.5"]
+CLI_ARGS = {
+    "predict": FIXTURE_ARGS + ["--last5", "W,W,D,L,W"],
+    "predict_plus": FIXTURE_ARGS + ["--last5_scores", "2-1,0-0,1-2,3-0,1-1"],
+}
+
+
+# ---------------------------------------------------------------------------
+# Timing helpers
+# ---------------------------------------------------------------------------
+
+def measure(fn, repeat: int = 5, min_time: float = 0.2):
+    """Median / min seconds per call; fast calls are looped until min_time per sample."""
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time or number >= 1_000_000:
+            break
+        number *= 10
+    samples = np.array(timer.repeat(repeat=repeat, number=number)) / number
+    return {"median_s": float(np.median(samples)), "min_s": float(samples.min()), "runs": repeat * number}
+
+
+def run_stage(script: str, workdir: str):
+    t0 = time.perf_counter()
+    proc = subprocess.run([sys.executable, os.path.join(ROOT, "src", script)], cwd=workdir,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    elapsed = time.perf_counter() - t0
+    if proc.returncode:
+        raise RuntimeError(f"{script} failed:\n{proc.stderr[-2000:]}")
+    return elapsed
+
+
+# ---------------------------------------------------------------------------
+# Synthetic histories
+# ---------------------------------------------------------------------------
+
+def write_synthetic_raw(raw_dir: str, scale: int):
+    """scale copies of data/raw/E0*.csv; copy i renames every club except Chelsea to '<club> <i>'."""
+    os.makedirs(raw_dir, exist_ok=True)
+    rows = 0
+    for fp in sorted(glob.glob(RAW_GLOB)):
+        raw = pd.read_csv(fp, dtype=str, encoding="utf-8-sig", encoding_errors="replace")
+        name = os.path.splitext(os.path.basename(fp))[0].replace(" ", "_").replace("(", "").replace(")", "")
+        for i in range(scale):
+            copy = raw.copy()
+            if i:
+                for col in ["HomeTeam", "AwayTeam"]:
+                    copy[col] = copy[col].where(copy[col] == TEAM, copy[col] + f" {i}")
+            copy.to_csv(os.path.join(raw_dir, f"{name}_x{i:03d}.csv"), index=False)
+            rows += len(copy)
+    return rows
+
+
+def bench_stages(scales, repeat: int = 1):
+    results = {}
+    scripts = sorted(os.path.basename(p) for p in glob.glob(os.path.join(ROOT, "src", "0*_*.py")))
+    for scale in scales:
+        workdir = tempfile.mkdtemp(prefix=f"bench_x{scale}_")
+        try:
+            rows = write_synthetic_raw(os.path.join(workdir, "data", "raw"), scale)
+            os.makedirs(os.path.join(workdir, "data", "processed"))
+            print(f"\nStages at {scale}x ({rows} raw rows)")
+            for script in scripts:
+                times = [run_stage(script, workdir) for _ in range(repeat)]
+                key = f"stage/{os.path.splitext(script)[0]}/x{scale}"
+                results[key] = {"median_s": float(np.median(times)), "min_s": float(min(times)),
+                                "runs": repeat, "rows": rows}
+                print(f"  {script:<36} {np.median(times):8.2f} s")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Serving
+# ---------------------------------------------------------------------------
+
+def bench_serving():
+    from feature_spec import FEATURE_SETS, FeatureTransform, parse_scorelines
+
+    results = {"parse_scorelines": measure(lambda: parse_scorelines("2-1, 0-0, 1-2, 3-0, 1-1"))}
+    transform = FeatureTransform(FEATURE_SETS["odds"])
+    fixtures = [{"is_home": i % 2, "odds_win": 1.5 + i % 7, "odds_draw": 3.4, "odds_loss": 4.5,
+                 "last5_scores": f"{i % 4}-1, 0-0, 1-2, 3-{i % 3}, 1-1"} for i in range(FEATURIZE_ROWS)]
+    results["featurize/single"] = measure(lambda: transform(fixtures[:1]))
+    results["featurize/batch"] = measure(lambda: transform(fixtures))
+
+    if not os.path.exists(MODEL_PATH):
+        print(f"\nModel not found at {MODEL_PATH}; skipping predict and app benchmarks.")
+        return results
+
+    import joblib
+    from forest_engine import compile_bundle
+
+    bundle = compile_bundle(joblib.load(MODEL_PATH))
+    features = bundle["features"]
+    X = pd.read_csv(DATA_PATH)[features].dropna()
+    batch = X.sample(BATCH_ROWS, replace=True, random_state=0)
+    row = X.iloc[:1]
+
+    model, engine = bundle["model"], bundle["engine"]
+    results["predict_proba/sklearn/single"] = measure(lambda: model.predict_proba(row))
+    results["predict_proba/sklearn/batch"] = measure(lambda: model.predict_proba(batch))
+    row_np, batch_np = row.to_numpy(dtype=float), batch.to_numpy(dtype=float)
+    results["predict_proba/engine/single"] = measure(lambda: engine.predict_proba(row_np))
+    results["predict_proba/engine/batch"] = measure(lambda: engine.predict_proba(batch_np))
+
+    from forest_compaction import COMPACT_PATH
+    from forest_engine import load_flat
+
+    if os.path.exists(COMPACT_PATH):
+        compact = load_flat(COMPACT_PATH)["engine"]
+        results["predict_proba/compact/single"] = measure(lambda: compact.predict_proba(row_np))
+        results["predict_proba/compact/batch"] = measure(lambda: compact.predict_proba(batch_np))
+
+    from prediction_cache import PredictionCache
+
+    cache = PredictionCache()
+    cache.predict_proba("bench", engine, row_np)
+    results["predict_proba/cache_hit/single"] = measure(lambda: cache.predict_proba("bench", engine, row_np))
+
+    from web.app import app, metrics
+
+    client = app.test_client()
+    form = APP_FORM
+
+    def get():
+        assert client.get("/").status_code == 200
+
+    def post():
+        assert client.post("/", data=form).status_code == 200
+
+    results["app/index/get"] = measure(get)
+    results["app/index/post"] = measure(post)
+
+    # Instrumentation overhead: the same request with metrics recording off,
+    # and the cost of one histogram observation
+    metrics.enabled = False
+    results["app/index/post/no_metrics"] = measure(post)
+    metrics.enabled = True
+    results["metrics/observe"] = measure(lambda: metrics.observe("bench_seconds", 0.001, phase="bench"))
+
+    print()
+    for name, r in results.items():
+        print(f"  {name:<32} {r['median_s'] * 1000:10.3f} ms")
+    overhead = results["app/index/post"]["min_s"] - results["app/index/post/no_metrics"]["min_s"]
+    print(f"  metrics overhead per form POST: {overhead * 1e6:.0f} us "
+          f"({overhead / results['app/index/post/no_metrics']['min_s']:+.1%}, fastest samples)")
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Cold start
+# ---------------------------------------------------------------------------
+
+# Runs in a fresh interpreter; prints the target's own startup report as JSON
+STARTUP_PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+sys.path[:0] = [{src!r}, {root!r}]
+if {cli!r}:
+    import runpy
+    sys.argv = [{cli!r}] + {args!r}
+    startup = runpy.run_path({cli!r}, run_name="__main__")["startup"]
+else:
+    import web.app
+    client = web.app.app.test_client()
+    assert client.post("/", data={form!r}).status_code == 200
+    startup = web.app.startup
+report = dict(startup, total_seconds=time.perf_counter() - t0,
+              heavy_modules=[m for m in {heavy!r} if m in sys.modules])
+print("STARTUP " + json.dumps(report))
+"""
+
+
+def probe_startup(cli: str = None, args=()):
+    code = STARTUP_PROBE.format(src=os.path.join(ROOT, "src"), root=ROOT, cli=cli, args=list(args),
+                                form=APP_FORM, heavy=HEAVY_MODULES)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if proc.returncode:
+        raise RuntimeError(f"Startup probe failed:\n{proc.stderr[-2000:]}")
+    line = [l for l in proc.stdout.splitlines() if l.startswith("STARTUP ")][-1]
+    return json.loads(line[len("STARTUP "):])
+
+
+def bench_startup(repeat: int = 5):
+    """
+    Each case is a new Python process: importing the app (or running a CLI)
+    through to its first prediction, as a freshly started gunicorn worker
+    without --preload, or a CLI call, would. Reports the fastest run.
+    """
+    if not os.path.exists(MODEL_PATH):
+        print(f"\nModel not found at {MODEL_PATH}; skipping startup benchmarks.")
+        return {}
+
+    targets = {"app": (None, ())}
+    targets.update({name: (os.path.join(ROOT, "src", f"{name}.py"), args) for name, args in CLI_ARGS.items()})
+    results = {}
+    print(f"\n{'startup':<16}{'imports':>10}{'load':>10}{'first':>10}{'total':>10}  artifact  heavy modules")
+    for name, (cli, args) in targets.items():
+        reports = [probe_startup(cli, args) for _ in range(repeat)]
+        for key in ["import_seconds", "model_load_seconds", "first_prediction_seconds", "total_seconds"]:
+            samples = [r[key] for r in reports]
+            results[f"startup/{name}/{key.replace('_seconds', '')}"] = {
+                "median_s": float(np.median(samples)), "min_s": float(min(samples)), "runs": repeat,
+            }
+        fast = min(reports, key=lambda r: r["total_seconds"])
+        print(f"{name:<16}" + "".join(f"{fast[k] * 1000:>8.1f}ms" for k in
+              ["import_seconds", "model_load_seconds", "first_prediction_seconds", "total_seconds"])
+              + f"  {fast['artifact']:<8}  {', '.join(fast['heavy_modules']) or '-'}")
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Run / compare
+# ---------------------------------------------------------------------------
+
+def environment():
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        rev = None
+    return {"created_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "git": rev, "python": platform.python_version(),
+            "machine": platform.machine(), "cpu_count": os.cpu_count()}
+
+
+def save(path: str, report: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print("\nSaved results to:", path)
+
+
+def compare(baseline: dict, current: dict, threshold: float = THRESHOLD):
+    """
+    Cases slower than the baseline by more than `threshold` (as a fraction),
+    plus a printed table. Compares the fastest sample of each case, which is
+    the least sensitive to background noise (as timeit recommends).
+    """
+    regressions = []
+    print(f"{'case':<48}{'baseline':>12}{'current':>12}{'change':>9}")
+    for name, base in baseline["results"].items():
+        cur = current["results"].get(name)
+        if cur is None:
+            print(f"{name:<48}{base['min_s'] * 1000:>10.2f}ms{'missing':>12}")
+            continue
+        change = cur["min_s"] / base["min_s"] - 1.0
+        flag = "  REGRESSION" if change > threshold else ""
+        print(f"{name:<48}{base['min_s'] * 1000:>10.2f}ms{cur['min_s'] * 1000:>10.2f}ms{change:>+8.0%}{flag}")
+        if flag:
+            regressions.append((name, change))
+    for name in current["results"].keys() - baseline["results"].keys():
+        print(f"{name:<48}{'new':>12}{current['results'][name]['min_s'] * 1000:>10.2f}ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages and serving; gate on regressions")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="Run the benchmarks")
+    run.add_argument("--scales", default=",".join(map(str, SCALES)), help="Synthetic history sizes, e.g. 1,10,100")
+    run.add_argument("--repeat", type=int, default=1, help="Runs per pipeline stage")
+    run.add_argument("--skip-stages", action="store_true", help="Only the serving and startup benchmarks")
+    run.add_argument("--out", default=LATEST_PATH)
+    run.add_argument("--save-baseline", nargs="?", const="default", metavar="NAME",
+                     help="Also store the results as benchmarks/baselines/NAME.json")
+
+    startup = sub.add_parser("startup", help="Cold-start report for the web app and CLIs (not saved)")
+    startup.add_argument("--repeat", type=int, default=5, help="Fresh processes per target")
+
+    cmp = sub.add_parser("compare", help="Compare results against a baseline")
+    cmp.add_argument("--baseline", default="default", help="Baseline name or path")
+    cmp.add_argument("--current", default=LATEST_PATH)
+    cmp.add_argument("--threshold", type=float, default=THRESHOLD, help="Allowed slowdown, e.g. 0.2 = 20%%")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        results = {}
+        if not args.skip_stages:
+            results.update(bench_stages([int(s) for s in args.scales.split(",")], args.repeat))
+        results.update(bench_serving())
+        results.update(bench_startup())
+        report = {"environment": environment(), "results": results}
+        save(args.out, report)
+        if args.save_baseline:
+            save(os.path.join(BASELINE_DIR, f"{args.save_baseline}.json"), report)
+        return
+
+    if args.command == "startup":
+        bench_startup(args.repeat)
+        return
+
+    baseline_path = args.baseline if args.baseline.endswith(".json") else os.path.join(BASELINE_DIR, f"{args.baseline}.json")
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} case(s) slower than the baseline by more than {args.threshold:.0%}.")
+        raise SystemExit(1)
+    print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
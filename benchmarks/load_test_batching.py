@@ -0,0 +1,145 @@
+"""
+Load test for micro-batching: throughput and latency of concurrent single
+fixture predictions, one model call per request vs coalesced model calls.
+
+In-process (default), N threads call the app's predict_rows back to back,
+first with micro-batching off, then on for each --max-wait-ms setting.
+Every request has random odds, so the prediction cache never answers.
+
+Against a running server instead (start it with e.g.
+    MICROBATCH_MAX_WAIT_MS=2 gunicorn -k gthread --threads 16 web.app:app
+and again without MICROBATCH_MAX_WAIT_MS for the baseline), POST to
+/api/predict:
+    python benchmarks/load_test_batching.py --url http://127.0.0.1:8000
+
+Run from the project root after training the model:
+    python benchmarks/load_test_batching.py
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+sys.path.insert(0, ROOT)
+
+from batching import MAX_BATCH, MicroBatcher
+
+THREADS = [1, 8, 32, 64]
+REQUESTS_PER_THREAD = 200
+MAX_WAITS_MS = [0.2, 1.0]
+
+FIXTURE = {"is_home": 1, "last5_scores": "2-1,0-0,1-2,3-0,1-1"}
+
+
+def random_fixture(rng):
+    odds = rng.uniform([1.2, 2.5, 1.5], [6.0, 5.0, 12.0]).round(3)
+    return {**FIXTURE, "odds_win": odds[0], "odds_draw": odds[1], "odds_loss": odds[2]}
+
+
+def run_threads(call, threads: int, per_thread: int, seed: int = 0):
+    """Run `per_thread` calls on each of `threads` threads; returns (wall seconds, latencies)."""
+    latencies = [[] for _ in range(threads)]
+    start = threading.Barrier(threads + 1)
+
+    def worker(i):
+        rng = np.random.default_rng(seed + i)
+        fixtures = [random_fixture(rng) for _ in range(per_thread)]
+        start.wait()
+        for fixture in fixtures:
+            t0 = time.perf_counter()
+            call(fixture)
+            latencies[i].append(time.perf_counter() - t0)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in pool:
+        t.join()
+    return time.perf_counter() - t0, np.concatenate(latencies)
+
+
+def summarize(label, threads, wall, latencies, batcher=None):
+    ms = latencies * 1000
+    row = {
+        "mode": label,
+        "threads": threads,
+        "requests": len(latencies),
+        "req_per_s": len(latencies) / wall,
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_batch": batcher.requests / batcher.batches if batcher is not None and batcher.batches else 1.0,
+    }
+    print(f"{label:<16} {threads:>7} {row['req_per_s']:>9,.0f} {row['p50_ms']:>8.2f} {row['p99_ms']:>8.2f} "
+          f"{row['mean_batch']:>10.1f}")
+    return row
+
+
+def in_process(args):
+    import web.app as web_app
+
+    entry = web_app.registry.entry()
+
+    def call(fixture):
+        web_app.predict_rows(entry, web_app.featurize(entry, [fixture]))
+
+    web_app.metrics.enabled = False
+    results = []
+    for threads in args.threads:
+        web_app.batcher = None
+        wall, lat = run_threads(call, threads, args.requests)
+        results.append(summarize("per-request", threads, wall, lat))
+        for wait_ms in args.max_wait_ms:
+            batcher = MicroBatcher(web_app.score, max_wait=wait_ms / 1000, max_batch=args.max_batch)
+            web_app.batcher = batcher
+            wall, lat = run_threads(call, threads, args.requests)
+            results.append(summarize(f"batched {wait_ms:g} ms", threads, wall, lat, batcher))
+    return results
+
+
+def over_http(args):
+    url = args.url.rstrip("/")
+
+    def call(fixture):
+        req = urllib.request.Request(url + "/api/predict", data=json.dumps([fixture]).encode(),
+                                     headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req) as resp:
+            resp.read()
+
+    results = []
+    for threads in args.threads:
+        wall, lat = run_threads(call, threads, args.requests)
+        results.append(summarize("http", threads, wall, lat))
+    with urllib.request.urlopen(url + "/api/model") as resp:
+        print("Server micro-batching:", json.loads(resp.read()).get("micro_batching"))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of per-request vs micro-batched inference")
+    parser.add_argument("--threads", type=int, nargs="+", default=THREADS)
+    parser.add_argument("--requests", type=int, default=REQUESTS_PER_THREAD, help="Requests per thread")
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=MAX_WAITS_MS)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--url", help="Load test a running server instead of the app in-process")
+    parser.add_argument("--out", help="Save the results as JSON")
+    args = parser.parse_args()
+
+    print(f"{'mode':<16} {'threads':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'mean batch':>10}")
+    results = over_http(args) if args.url else in_process(args)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print("Saved results to:", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,31 @@
-import pandas as pd
-import glob
 import os
+import time
 
-RAW_PATTERN = os.path.join("data", "raw", "E0*.csv")  # matches E0_*.csv and similar
+from ingest import OUTPUT_COLUMNS, ingest_raw
+from pipeline import RAW_DIR, RAW_GLOB, raw_files
 
-files = sorted(glob.glob(RAW_PATTERN))
+RAW_PATTERN = os.path.join(RAW_DIR, RAW_GLOB)
+
+files = raw_files()
 if not files:
     raise FileNotFoundError(
         f"No EPL CSV files found in data/raw/. Expected pattern: {RAW_PATTERN}\n"
         "Make sure you downloaded Premier League files from football-data.co.uk and moved them into data/raw/."
     )
 
-df_list = []
-for fp in files:
-    season_tag = os.path.splitext(os.path.basename(fp))[0]  # e.g., E0_1819
-    df = pd.read_csv(fp)
-    df["SeasonTag"] = season_tag
-    df_list.append(df)
+out_path = os.path.join("data", "processed", "epl_all_seasons.csv")
+os.makedirs(os.path.dirname(out_path), exist_ok=True)
 
-epl = pd.concat(df_list, ignore_index=True)
+# Stream each file (declared columns only, fixed dtypes, day-first dates,
+# season-to-season column names reconciled) into the combined CSV
+t0 = time.perf_counter()
+counts = ingest_raw(files, out_path)
+elapsed = time.perf_counter() - t0
 
 print("Loaded files:", len(files))
-print("Combined dataset shape:", epl.shape)
-print("Some columns:", list(epl.columns)[:25])
-print(epl.head(3))
-
-# Save combined dataset
-out_path = os.path.join("data", "processed", "epl_all_seasons.csv")
-os.makedirs(os.path.dirname(out_path), exist_ok=True)
-epl.to_csv(out_path, index=False)
-print("Saved:", out_path)
\ No newline at end of file
+for fp, n in counts.items():
+    print(f"  {os.path.basename(fp)}: {n} rows")
+print("Combined dataset shape:", (sum(counts.values()), len(OUTPUT_COLUMNS)))
+print("Columns:", OUTPUT_COLUMNS[:25], "...")
+print(f"Ingest time: {elapsed:.2f}s")
+print("Saved:", out_path)
@@ -1,56 +1,30 @@
-import pandas as pd
+import argparse
 import os
 
+from pipeline import build_team_matches, read_processed
+
 IN_PATH = os.path.join("data", "processed", "epl_all_seasons.csv")
 OUT_PATH = os.path.join("data", "processed", "chelsea_matches.csv")
 
-df = pd.read_csv(IN_PATH)
-
-# --- Basic sanity checks ---
-required_cols = ["Date", "HomeTeam", "AwayTeam", "FTHG", "FTAG", "FTR"]
-missing = [c for c in required_cols if c not in df.columns]
-if missing:
-    raise ValueError(f"Missing required columns: {missing}")
-
-# --- Filter to Chelsea matches only ---
-chelsea = df[(df["HomeTeam"] == "Chelsea") | (df["AwayTeam"] == "Chelsea")].copy()
-
-# --- Convert Date to datetime (football-data uses day-first dates) ---
-chelsea["Date"] = pd.to_datetime(chelsea["Date"], dayfirst=True, errors="coerce")
-
-# Drop invalid dates and sort chronologically
-chelsea = chelsea.dropna(subset=["Date"]).sort_values("Date").reset_index(drop=True)
-
-# --- Create target label from Chelsea perspective: Win/Draw/Loss ---
-def chelsea_outcome(row):
-    # FTR: H=home win, D=draw, A=away win
-    if row["HomeTeam"] == "Chelsea":
-        return "Win" if row["FTR"] == "H" else "Draw" if row["FTR"] == "D" else "Loss"
-    else:
-        return "Win" if row["FTR"] == "A" else "Draw" if row["FTR"] == "D" else "Loss"
-
-chelsea["Target"] = chelsea.apply(chelsea_outcome, axis=1)
+parser = argparse.ArgumentParser(description="Build one team's match dataset from the combined EPL file")
+parser.add_argument("--team", default="Chelsea", help="Team name as written in football-data files")
+parser.add_argument("--out", default=OUT_PATH, help="Output CSV path")
+args = parser.parse_args()
 
-# --- Helper columns ---
-chelsea["IsHome"] = (chelsea["HomeTeam"] == "Chelsea").astype(int)
-chelsea["Opponent"] = chelsea.apply(lambda r: r["AwayTeam"] if r["IsHome"] == 1 else r["HomeTeam"], axis=1)
-chelsea["ChelseaGoals"] = chelsea.apply(lambda r: r["FTHG"] if r["IsHome"] == 1 else r["FTAG"], axis=1)
-chelsea["OppGoals"] = chelsea.apply(lambda r: r["FTAG"] if r["IsHome"] == 1 else r["FTHG"], axis=1)
+df = read_processed(IN_PATH)
 
-# Keep clean core columns (we add engineered features in the next script)
-keep_cols = [
-    "Date", "SeasonTag", "HomeTeam", "AwayTeam", "Opponent",
-    "IsHome", "FTHG", "FTAG", "ChelseaGoals", "OppGoals", "FTR", "Target"
-]
-keep_cols = [c for c in keep_cols if c in chelsea.columns]
-chelsea_clean = chelsea[keep_cols].copy()
+# --- Team-perspective rows for the requested team (see team_perspective.py) ---
+# (raises ValueError if required columns are missing; invalid dates dropped)
+team_clean = build_team_matches(df, args.team)
+if team_clean.empty:
+    raise ValueError(f"No matches found for team '{args.team}'.")
 
-os.makedirs(os.path.dirname(OUT_PATH), exist_ok=True)
-chelsea_clean.to_csv(OUT_PATH, index=False)
+os.makedirs(os.path.dirname(args.out), exist_ok=True)
+team_clean.to_csv(args.out, index=False)
 
-print("Chelsea dataset saved:", OUT_PATH)
-print("Rows:", chelsea_clean.shape[0])
+print(f"{args.team} dataset saved:", args.out)
+print("Rows:", team_clean.shape[0])
 print("Target distribution:")
-print(chelsea_clean["Target"].value_counts())
+print(team_clean["Target"].value_counts())
 print("\nSample rows:")
-print(chelsea_clean.head(5))
\ No newline at end of file
+print(team_clean.head(5))
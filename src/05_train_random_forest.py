@@ -1,24 +1,17 @@
-import pandas as pd
-import os
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
 
-# Load dataset
-DATA_PATH = os.path.join("data", "processed", "chelsea_features.csv")
-df = pd.read_csv(DATA_PATH, parse_dates=["Date"])
+from feature_spec import FEATURE_SETS
+from feature_store import load_table
+
+FEATURES = FEATURE_SETS["form"]
+
+# Load only the columns we need from the feature store
+df = load_table("chelsea_features", ["Date", "Target"] + FEATURES)
 
 # Encode target
 label_map = {"Loss": 0, "Draw": 1, "Win": 2}
-df["TargetEncoded"] = df["Target"].map(label_map)
-
-FEATURES = [
-    "IsHome",
-    "FormPoints_5",
-    "GoalsFor_5",
-    "GoalsAgainst_5",
-    "GoalDiff_5",
-    "WinRate_5",
-]
+df["TargetEncoded"] = df["Target"].map(label_map).astype(int)
 
 X = df[FEATURES]
 y = df["TargetEncoded"]
@@ -1,30 +1,19 @@
 import pandas as pd
-import os
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, confusion_matrix, classification_report
 
-DATA_PATH = os.path.join("data", "processed", "chelsea_features_odds.csv")
-df = pd.read_csv(DATA_PATH)
+from feature_spec import FEATURE_SETS
+from feature_store import load_table
 
-# Ensure Date is datetime and keep chronological order
-df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+FEATURES = FEATURE_SETS["odds"]
+
+# Load only the columns we need from the feature store (Date is already datetime64)
+df = load_table("chelsea_features_odds", ["Date", "Target"] + FEATURES)
 df = df.dropna(subset=["Date"]).sort_values("Date").reset_index(drop=True)
 
 # Encode target
 label_map = {"Loss": 0, "Draw": 1, "Win": 2}
-df["TargetEncoded"] = df["Target"].map(label_map)
-
-FEATURES = [
-    "IsHome",
-    "FormPoints_5",
-    "GoalsFor_5",
-    "GoalsAgainst_5",
-    "GoalDiff_5",
-    "WinRate_5",
-    "Odds_Win",
-    "Odds_Draw",
-    "Odds_Loss",
-]
+df["TargetEncoded"] = df["Target"].map(label_map).astype(int)
 
 X = df[FEATURES]
 y = df["TargetEncoded"]
@@ -1,32 +1,24 @@
 import os
 import joblib
-import pandas as pd
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 
-DATA_PATH = os.path.join("data", "processed", "chelsea_features_odds.csv")
+from feature_spec import FEATURE_SETS, FeatureTransform
+from feature_store import load_table
+
 MODEL_PATH = os.path.join("outputs", "final_rf_model.joblib")
 
-# Load data
-df = pd.read_csv(DATA_PATH)
-df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+# The bundle stores this spec, and serving rebuilds the same columns from it
+transform = FeatureTransform(FEATURE_SETS["odds"])
+FEATURES = transform.features
+
+# Load only the columns we need from the feature store (Date is already datetime64)
+df = load_table("chelsea_features_odds", ["Date", "Target"] + FEATURES)
 df = df.dropna(subset=["Date"]).sort_values("Date").reset_index(drop=True)
 
 label_map = {"Loss": 0, "Draw": 1, "Win": 2}
 inv_label_map = {v: k for k, v in label_map.items()}
-df["TargetEncoded"] = df["Target"].map(label_map)
-
-FEATURES = [
-    "IsHome",
-    "FormPoints_5",
-    "GoalsFor_5",
-    "GoalsAgainst_5",
-    "GoalDiff_5",
-    "WinRate_5",
-    "Odds_Win",
-    "Odds_Draw",
-    "Odds_Loss",
-]
+df["TargetEncoded"] = df["Target"].map(label_map).astype(int)
 
 X = df[FEATURES]
 y = df["TargetEncoded"]
@@ -52,11 +44,12 @@ print("Accuracy:", accuracy_score(y_test, y_pred))
 print("\nConfusion Matrix:\n", confusion_matrix(y_test, y_pred))
 print("\nClassification Report:\n", classification_report(y_test, y_pred, target_names=["Loss", "Draw", "Win"]))
 
-# Save model bundle (model + features + label maps)
+# Save model bundle (model + features + feature spec + label maps)
 os.makedirs(os.path.dirname(MODEL_PATH), exist_ok=True)
 bundle = {
     "model": model,
     "features": FEATURES,
+    "feature_spec": transform.spec(),
     "label_map": label_map,
     "inv_label_map": inv_label_map,
 }
@@ -1,49 +1,73 @@
-import os
-import pandas as pd
+import argparse
+
 from sklearn.metrics import accuracy_score, classification_report
 from sklearn.ensemble import RandomForestClassifier, ExtraTreesClassifier, HistGradientBoostingClassifier
 
-DATA_PATH = os.path.join("data", "processed", "chelsea_features_odds_plus.csv")
-df = pd.read_csv(DATA_PATH)
-
-df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
-df = df.dropna(subset=["Date"]).sort_values("Date").reset_index(drop=True)
-
-label_map = {"Loss": 0, "Draw": 1, "Win": 2}
-inv = {v: k for k, v in label_map.items()}
-df["y"] = df["Target"].map(label_map)
-
-FEATURES = [
-    "IsHome",
-    "FormPoints_5", "GoalsFor_5", "GoalsAgainst_5", "GoalDiff_5", "WinRate_5",
-    "Odds_Win", "Odds_Draw", "Odds_Loss",
-    "ImpP_Win", "ImpP_Draw", "ImpP_Loss", "Overround",
-    "LogOdds_Win", "LogOdds_Draw", "LogOdds_Loss",
-]
-
-X = df[FEATURES]
-y = df["y"]
-
-split = int(len(df) * 0.8)
-X_train, X_test = X.iloc[:split], X.iloc[split:]
-y_train, y_test = y.iloc[:split], y.iloc[split:]
-
-models = {
-    "RandomForest": RandomForestClassifier(
-        n_estimators=800, max_depth=12, random_state=42, class_weight="balanced"
-    ),
-    "ExtraTrees": ExtraTreesClassifier(
-        n_estimators=1200, max_depth=14, random_state=42, class_weight="balanced"
-    ),
-    "HistGradientBoosting": HistGradientBoostingClassifier(
-        max_depth=6, learning_rate=0.08, max_iter=600, random_state=42
-    ),
-}
-
-for name, model in models.items():
-    model.fit(X_train, y_train)
-    pred = model.predict(X_test)
-    acc = accuracy_score(y_test, pred)
-    print("\n====", name, "====")
-    print("Accuracy:", round(acc, 4))
-    print(classification_report(y_test, pred, target_names=["Loss", "Draw", "Win"]))
\ No newline at end of file
+from feature_spec import FEATURE_SETS
+from feature_store import load_table
+from model_compare import REPORT_PATH, compare_models, write_report
+
+FEATURE_SET = "odds_plus"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare candidate models on accuracy, probabilities and cost")
+    parser.add_argument("--workers", type=int, default=None, help="Models trained at once (default: one per core)")
+    parser.add_argument("--out", default=REPORT_PATH, help="JSON report path")
+    parser.add_argument("--feature-set", default=FEATURE_SET, choices=["odds_plus", "odds_elo"],
+                        help="odds_elo swaps the market features for Elo ratings (src/elo.py)")
+    args = parser.parse_args()
+    FEATURES = FEATURE_SETS[args.feature_set]
+
+    # Load only the columns we need from the feature store (Date is already datetime64)
+    df = load_table("chelsea_features_odds_plus", ["Date", "Target"] + FEATURES)
+    df = df.dropna(subset=["Date"]).sort_values("Date").reset_index(drop=True)
+
+    label_map = {"Loss": 0, "Draw": 1, "Win": 2}
+    df["y"] = df["Target"].map(label_map).astype(int)
+
+    X = df[FEATURES]
+    y = df["y"]
+
+    split = int(len(df) * 0.8)
+    X_train, X_test = X.iloc[:split], X.iloc[split:]
+    y_train, y_test = y.iloc[:split], y.iloc[split:]
+
+    models = {
+        "RandomForest": RandomForestClassifier(
+            n_estimators=800, max_depth=12, random_state=42, class_weight="balanced"
+        ),
+        "ExtraTrees": ExtraTreesClassifier(
+            n_estimators=1200, max_depth=14, random_state=42, class_weight="balanced"
+        ),
+        "HistGradientBoosting": HistGradientBoostingClassifier(
+            max_depth=6, learning_rate=0.08, max_iter=600, random_state=42
+        ),
+    }
+
+    # Each model is trained in its own process, all at once
+    results, probas = compare_models(models, X_train, y_train, X_test, y_test, workers=args.workers)
+
+    for name, proba in probas.items():
+        pred = proba.argmax(axis=1)
+        acc = accuracy_score(y_test, pred)
+        print("\n====", name, "====")
+        print("Accuracy:", round(acc, 4))
+        print(classification_report(y_test, pred, target_names=["Loss", "Draw", "Win"], zero_division=0))
+
+    print("\n==== Cost and probabilistic metrics ====")
+    header = f"{'model':<22}{'fit s':>7}{'1 row ms':>10}{'batch ms':>10}{'10k ms':>9}{'engine ms':>11}" \
+             f"{'RSS MB':>8}{'size MB':>9}{'logloss':>9}{'RPS':>7}"
+    print(header)
+    for r in results.values():
+        engine = f"{r['engine_single_ms']:.2f}" if "engine_single_ms" in r else "-"
+        print(f"{r['model']:<22}{r['fit_seconds']:>7.2f}{r['predict_single_ms']:>10.2f}{r['predict_batch_ms']:>10.2f}"
+              f"{r['predict_10k_ms']:>9.1f}{engine:>11}{r['peak_rss_mb']:>8.0f}{r['artifact_bytes'] / 1e6:>9.2f}"
+              f"{r['log_loss']:>9.4f}{r['rps']:>7.4f}")
+
+    write_report(results, args.out, features=FEATURES, train_rows=len(X_train), test_rows=len(X_test))
+    print("\nSaved report to:", args.out)
+
+
+if __name__ == "__main__":
+    main()
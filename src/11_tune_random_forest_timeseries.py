@@ -1,37 +1,38 @@
+import argparse
+import json
 import os
-import pandas as pd
+
 from sklearn.model_selection import TimeSeriesSplit, RandomizedSearchCV
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score
-import numpy as np
 
-DATA_PATH = os.path.join("data", "processed", "chelsea_features_odds.csv")
-df = pd.read_csv(DATA_PATH)
+from feature_spec import FEATURE_SETS
+from feature_store import load_table
+from tuning import CHECKPOINT_PATH, ETA, RANK_BY, candidate_times, successive_halving
+
+REPORT_PATH = os.path.join("outputs", "tuning", "halving_report.json")
+
+FEATURES = FEATURE_SETS["odds"]
 
-df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+parser = argparse.ArgumentParser(description="Tune the random forest on time-series folds")
+parser.add_argument("--mode", choices=["halving", "random"], default="halving",
+                    help="halving = successive halving over trees and window (default), random = full RandomizedSearchCV")
+parser.add_argument("--rank-by", choices=["log_loss", "rps", "brier", "accuracy"], default=RANK_BY)
+parser.add_argument("--eta", type=int, default=ETA)
+parser.add_argument("--n-jobs", type=int, default=-1)
+parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of an earlier run")
+args = parser.parse_args()
+
+# Load only the columns we need from the feature store (Date is already datetime64)
+df = load_table("chelsea_features_odds", ["Date", "Target"] + FEATURES)
 df = df.dropna(subset=["Date"]).sort_values("Date").reset_index(drop=True)
 
 label_map = {"Loss": 0, "Draw": 1, "Win": 2}
-df["y"] = df["Target"].map(label_map)
-
-FEATURES = [
-    "IsHome",
-    "FormPoints_5",
-    "GoalsFor_5",
-    "GoalsAgainst_5",
-    "GoalDiff_5",
-    "WinRate_5",
-    "Odds_Win",
-    "Odds_Draw",
-    "Odds_Loss",
-]
+df["y"] = df["Target"].map(label_map).astype(int)
 
 X = df[FEATURES]
 y = df["y"]
 
-# Time series split
-tscv = TimeSeriesSplit(n_splits=5)
-
 param_dist = {
     "n_estimators": [300, 500, 800, 1000],
     "max_depth": [6, 8, 10, 12, None],
@@ -40,20 +41,47 @@ param_dist = {
     "class_weight": [None, "balanced"],
 }
 
-rf = RandomForestClassifier(random_state=42)
+if args.mode == "random":
+    # Time series split
+    tscv = TimeSeriesSplit(n_splits=5)
 
-search = RandomizedSearchCV(
-    rf,
-    param_distributions=param_dist,
-    n_iter=25,
-    cv=tscv,
-    scoring="accuracy",
-    random_state=42,
-    n_jobs=-1,
+    rf = RandomForestClassifier(random_state=42)
+
+    search = RandomizedSearchCV(
+        rf,
+        param_distributions=param_dist,
+        n_iter=25,
+        cv=tscv,
+        scoring="accuracy",
+        random_state=42,
+        n_jobs=args.n_jobs,
+    )
+
+    search.fit(X, y)
+
+    print("Best Parameters:")
+    print(search.best_params_)
+    print("Best Cross-Validated Accuracy:", round(search.best_score_, 4))
+    raise SystemExit
+
+# Successive halving: 25 candidates, same folds and search space as above
+best, records = successive_halving(
+    X, y, param_dist, n_iter=25, n_splits=5, eta=args.eta, rank_by=args.rank_by,
+    n_jobs=args.n_jobs, checkpoint=args.checkpoint, restart=args.restart,
 )
 
-search.fit(X, y)
+print("\nBest Parameters:")
+print(best["params"])
+print(f"Cross-validated scores (full budget): accuracy {best['accuracy']:.4f}, "
+      f"log loss {best['log_loss']:.4f}, RPS {best['rps']:.4f}, Brier {best['brier']:.4f}")
+
+times = candidate_times(records)
+print("\nWall time per candidate (all rungs and folds):")
+for t in times:
+    print(f"  #{t['candidate']:>2}  {t['seconds']:6.2f} s  rungs={t['rungs']}  {t['params']}")
+print(f"Total fit time: {sum(t['seconds'] for t in times):.1f} s")
 
-print("Best Parameters:")
-print(search.best_params_)
-print("Best Cross-Validated Accuracy:", round(search.best_score_, 4))
\ No newline at end of file
+os.makedirs(os.path.dirname(REPORT_PATH), exist_ok=True)
+with open(REPORT_PATH, "w") as f:
+    json.dump({"best": best, "evaluations": records, "candidate_times": times}, f, indent=2, default=str)
+print("\nSaved report to:", REPORT_PATH)
@@ -0,0 +1,60 @@
+import os
+import joblib
+import numpy as np
+import pandas as pd
+
+from feature_spec import attach_transform
+from forest_engine import FLAT_PATH, TOLERANCE, FlatForest, export_forest, load_flat, save_flat
+from model_registry import file_checksum
+
+MODEL_PATH = os.path.join("outputs", "final_rf_model.joblib")
+DATA_PATH = os.path.join("data", "processed", "chelsea_features_odds.csv")
+
+if not os.path.exists(MODEL_PATH):
+    raise FileNotFoundError(f"Model not found at {MODEL_PATH}. Run src/08_train_and_save_final_model.py first.")
+
+# Older bundles get a feature spec from their column list
+bundle = attach_transform(joblib.load(MODEL_PATH))
+model = bundle["model"]
+FEATURES = bundle["features"]
+
+# Pack the fitted forest into flat arrays
+arrays = export_forest(model)
+flat = FlatForest(arrays)
+print("Trees:", flat.n_estimators)
+print("Total nodes:", len(arrays["feature"]))
+print("Max depth:", flat.max_depth)
+
+# ---- Verify against sklearn ----
+# Real feature rows plus jittered copies so thresholds are hit from both sides,
+# and copies with missing values so the NaN routing is checked too
+df = pd.read_csv(DATA_PATH)
+X = df[FEATURES].dropna().to_numpy(dtype=float)
+rng = np.random.default_rng(42)
+jitter = X[rng.integers(0, len(X), 5000)] * rng.uniform(0.7, 1.3, size=(5000, X.shape[1]))
+missing = X[rng.integers(0, len(X), 2000)]
+missing[rng.random(missing.shape) < 0.25] = np.nan
+X_check = np.vstack([X, jitter, missing])
+
+expected = model.predict_proba(pd.DataFrame(X_check, columns=FEATURES))
+got = flat.predict_proba(X_check)
+max_diff = float(np.abs(expected - got).max())
+
+print("Rows checked:", len(X_check))
+print("Max |flat - sklearn|:", max_diff)
+print("Bit-for-bit identical:", bool((expected == got).all()))
+if max_diff > TOLERANCE:
+    raise ValueError(f"Flat forest deviates from sklearn by {max_diff} (tolerance {TOLERANCE}).")
+
+# Record which artifact this export came from, so the web app and CLIs only
+# serve it while it is still current (see model_registry.artifact_checksum)
+st = os.stat(MODEL_PATH)
+source = {"checksum": file_checksum(MODEL_PATH), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+save_flat(FLAT_PATH, arrays, FEATURES, bundle["inv_label_map"], source=source, max_diff=max_diff,
+          feature_spec=bundle["feature_spec"])
+
+# Round trip: the file as the server will load it
+reloaded = load_flat(FLAT_PATH)["engine"].predict_proba(X_check)
+if not (reloaded == got).all():
+    raise ValueError("Reloaded flat forest does not match the exported one.")
+print("Saved flat forest to:", FLAT_PATH)
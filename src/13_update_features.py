@@ -0,0 +1,39 @@
+import argparse
+import tempfile
+import time
+
+from pipeline import PROCESSED_DIR, RAW_DIR, TEAM, compare_outputs, full_build, incremental_update
+
+parser = argparse.ArgumentParser(
+    description="Update processed datasets (01, 02, 03, 06, 09) with only the matches added to data/raw since the last run"
+)
+parser.add_argument("--full", action="store_true", help="Rebuild everything from the raw files")
+parser.add_argument("--check", action="store_true", help="After updating, verify a full rebuild produces identical data")
+parser.add_argument("--raw-dir", default=RAW_DIR)
+parser.add_argument("--out-dir", default=PROCESSED_DIR)
+parser.add_argument("--team", default=TEAM)
+args = parser.parse_args()
+
+t0 = time.perf_counter()
+if args.full:
+    mode, counts = "full", full_build(args.raw_dir, args.out_dir, args.team)
+else:
+    mode, counts = incremental_update(args.raw_dir, args.out_dir, args.team)
+elapsed = time.perf_counter() - t0
+
+print("Mode:", mode)
+print(f"Time: {elapsed * 1000:.1f} ms")
+print("Rows written:" if mode == "full" else "Rows appended:")
+for k, n in counts.items():
+    print(f"  {k}: {n}")
+
+if args.check:
+    with tempfile.TemporaryDirectory() as tmp:
+        full_build(args.raw_dir, tmp, args.team, index_dir=None)
+        problems = compare_outputs(args.out_dir, tmp)
+    if problems:
+        print("\nCHECK FAILED: incremental output differs from a full rebuild")
+        for p in problems:
+            print(" ", p)
+        raise SystemExit(1)
+    print("\nCheck passed: identical to a full rebuild.")
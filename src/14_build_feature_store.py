@@ -0,0 +1,65 @@
+import os
+import time
+
+import pandas as pd
+
+from feature_store import DAYFIRST_TABLES, PROCESSED_DIR, STORE_DIR, csv_to_table, read_table
+
+# Columns the odds-based training scripts (07, 08, 11) actually use
+TRAIN_COLS = [
+    "Date", "Target", "IsHome",
+    "FormPoints_5", "GoalsFor_5", "GoalsAgainst_5", "GoalDiff_5", "WinRate_5",
+    "Odds_Win", "Odds_Draw", "Odds_Loss",
+]
+
+REPEATS = 5
+
+
+def timed(fn):
+    best = None
+    for _ in range(REPEATS):
+        t0 = time.perf_counter()
+        out = fn()
+        elapsed = time.perf_counter() - t0
+        best = elapsed if best is None else min(best, elapsed)
+    return out, best * 1000
+
+
+def mem_kb(df):
+    return df.memory_usage(deep=True).sum() / 1024
+
+
+def dir_kb(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path)) / 1024
+
+
+def read_csv_path(csv_path, name):
+    # What the scripts did before: parse the CSV, then convert Date
+    df = pd.read_csv(csv_path, low_memory=False)
+    df["Date"] = pd.to_datetime(df["Date"], dayfirst=name in DAYFIRST_TABLES, errors="coerce")
+    return df
+
+
+names = sorted(os.path.splitext(f)[0] for f in os.listdir(PROCESSED_DIR) if f.endswith(".csv"))
+
+print(f"{'table':32s} {'disk KB':>14s} {'read ms':>24s} {'memory KB':>24s}")
+print(f"{'':32s} {'csv / store':>14s} {'csv / store / projected':>24s} {'csv / store / projected':>24s}")
+for name in names:
+    csv_path = os.path.join(PROCESSED_DIR, f"{name}.csv")
+    csv_to_table(csv_path, name)
+
+    csv_df, csv_ms = timed(lambda: read_csv_path(csv_path, name))
+    store_df, store_ms = timed(lambda: read_table(name))
+
+    cols = [c for c in TRAIN_COLS if c in store_df.columns]
+    proj_df, proj_ms = timed(lambda: read_table(name, cols))
+
+    csv_kb = os.path.getsize(csv_path) / 1024
+    store_kb = dir_kb(os.path.join(STORE_DIR, name))
+    print(
+        f"{name:32s} {csv_kb:6.0f} / {store_kb:5.0f} "
+        f"{csv_ms:8.1f} / {store_ms:5.1f} / {proj_ms:5.1f} "
+        f"{mem_kb(csv_df):8.0f} / {mem_kb(store_df):5.0f} / {mem_kb(proj_df):5.0f}"
+    )
+
+print("\nFeature store written to:", STORE_DIR)
@@ -0,0 +1,42 @@
+import json
+import os
+import time
+
+import pandas as pd
+
+from feature_store import STORE_DIR, write_table
+from rolling_form import EWM_SPANS, WINDOWS, build_form_states, rolling_features
+from team_perspective import build_team_perspective
+
+EPL_PATH = os.path.join("data", "processed", "epl_all_seasons.csv")
+STATE_PATH = os.path.join(STORE_DIR, "team_form_state.json")
+
+epl = pd.read_csv(EPL_PATH)
+
+t0 = time.perf_counter()
+perspective = build_team_perspective(epl).reset_index(drop=True)
+t1 = time.perf_counter()
+
+# Windows 3/5/10, season-to-date and EWM variants for every team in one pass
+form = rolling_features(perspective, windows=WINDOWS, ewm_spans=EWM_SPANS, season=True)
+t2 = time.perf_counter()
+
+team_form = pd.concat([perspective, form], axis=1)
+write_table(team_form, "team_form", source=EPL_PATH)
+
+# Running per-team state so new results can be added in O(1)
+states = build_form_states(perspective)
+t3 = time.perf_counter()
+os.makedirs(STORE_DIR, exist_ok=True)
+with open(STATE_PATH, "w") as f:
+    json.dump({team: state.to_dict() for team, state in states.items()}, f)
+
+print("Teams:", perspective["Team"].nunique())
+print("Team-match rows:", len(team_form))
+print("Feature columns:", len(form.columns))
+print(f"Perspective table: {(t1 - t0) * 1000:.1f} ms")
+print(f"Rolling features (all teams, all windows): {(t2 - t1) * 1000:.1f} ms")
+print(f"Per-team form state replay: {(t3 - t2) * 1000:.1f} ms")
+print("Saved table 'team_form' to:", STORE_DIR)
+print("Saved form state to:", STATE_PATH)
+print(team_form[team_form["Team"] == "Chelsea"][["Date", "Opponent", "FormPoints_3", "FormPoints_5", "FormPoints_10", "FormPoints_season", "FormPoints_ewm5"]].tail(5))
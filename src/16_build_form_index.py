@@ -0,0 +1,27 @@
+import os
+import time
+
+import pandas as pd
+
+from form_index import INDEX_DIR, FormIndex, build_form_index
+from pipeline import read_processed
+
+EPL_PATH = os.path.join("data", "processed", "epl_all_seasons.csv")
+
+epl = read_processed(EPL_PATH)
+
+t0 = time.perf_counter()
+meta = build_form_index(epl, source=EPL_PATH)
+elapsed = time.perf_counter() - t0
+
+print("Teams:", len(meta["teams"]))
+print("Team-match rows:", meta["rows"])
+print("Data up to:", meta["last_date"])
+print(f"Build time: {elapsed * 1000:.1f} ms")
+print("Saved form index to:", INDEX_DIR)
+
+index = FormIndex()
+t0 = time.perf_counter()
+latest = index.lookup("Chelsea", pd.Timestamp.today())
+print(f"\nLookup time: {(time.perf_counter() - t0) * 1e6:.0f} us")
+print("Chelsea latest form:", latest["form"])
@@ -0,0 +1,57 @@
+import argparse
+import os
+import time
+
+from backtest import INITIAL_TREES, MAX_TREES, MIN_TRAIN, STEP, TREES_PER_STEP, summarize, walk_forward
+from feature_spec import FEATURE_SETS
+from feature_store import load_table
+
+OUT_PATH = os.path.join("outputs", "walk_forward_predictions.csv")
+
+FEATURES = FEATURE_SETS["odds"]
+
+parser = argparse.ArgumentParser(description="Walk-forward backtest: retrain every matchweek on all earlier matches")
+parser.add_argument("--mode", choices=["grow", "refit", "both"], default="grow",
+                    help="grow = warm-start tree growth (fast), refit = fresh model per step (exact), both = compare")
+parser.add_argument("--step", default=STEP, help='Retrain frequency as a pandas period, e.g. "W" (matchweek) or "M"')
+parser.add_argument("--min-train", type=int, default=MIN_TRAIN)
+parser.add_argument("--initial-trees", type=int, default=INITIAL_TREES)
+parser.add_argument("--trees-per-step", type=int, default=TREES_PER_STEP)
+parser.add_argument("--max-trees", type=int, default=MAX_TREES)
+parser.add_argument("--n-jobs", type=int, default=-1)
+parser.add_argument("--out", default=OUT_PATH)
+args = parser.parse_args()
+
+# Load only the columns we need from the feature store (Date is already datetime64)
+df = load_table("chelsea_features_odds", ["Date", "Target"] + FEATURES)
+df = df.dropna(subset=["Date"]).sort_values("Date").reset_index(drop=True)
+
+label_map = {"Loss": 0, "Draw": 1, "Win": 2}
+df["y"] = df["Target"].map(label_map).astype(int)
+
+modes = ["grow", "refit"] if args.mode == "both" else [args.mode]
+results = {}
+for mode in modes:
+    t0 = time.perf_counter()
+    results[mode] = walk_forward(
+        df[FEATURES], df["y"], df["Date"], mode=mode, min_train=args.min_train, step=args.step,
+        initial_trees=args.initial_trees, trees_per_step=args.trees_per_step,
+        max_trees=args.max_trees, n_jobs=args.n_jobs,
+    )
+    elapsed = time.perf_counter() - t0
+
+    summary = summarize(results[mode])
+    print(f"\n==== {mode} ====")
+    print(f"Steps: {summary['steps']}  Predicted matches: {summary['matches']}  Time: {elapsed:.1f} s")
+    print("Accuracy:", round(summary["accuracy"], 4))
+    print("Log loss:", round(summary["log_loss"], 4))
+    print("Brier:", round(summary["brier"], 4))
+    print("RPS:", round(summary["rps"], 4))
+
+if args.mode == "both":
+    gap = (results["grow"]["P_Win"] - results["refit"]["P_Win"]).abs()
+    print(f"\nP_Win difference grow vs refit: mean {gap.mean():.3f}, max {gap.max():.3f}")
+
+os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+results[modes[0]].assign(Target=lambda d: d["y"].map({v: k for k, v in label_map.items()})).to_csv(args.out, index=False)
+print("\nSaved out-of-sample predictions to:", args.out)
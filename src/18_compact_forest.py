@@ -0,0 +1,98 @@
+import argparse
+import json
+import os
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from forest_compaction import (
+    COMPACT_PATH, MAX_DEVIATION, MIN_TREES, REPORT_PATH, choose_step, compaction_ladder, evaluate,
+)
+from feature_spec import attach_transform
+from forest_engine import export_forest, save_flat
+from model_registry import MODEL_PATH, file_checksum
+
+DATA_PATH = os.path.join("data", "processed", "chelsea_features_odds.csv")
+
+
+def sklearn_nbytes(model):
+    """Memory held by the fitted trees' node and value arrays."""
+    total = 0
+    for est in model.estimators_:
+        state = est.tree_.__getstate__()
+        total += state["nodes"].nbytes + state["values"].nbytes
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shrink the served forest to fit a per-worker memory budget")
+    parser.add_argument("--model", default=MODEL_PATH, help="joblib model bundle to compact")
+    parser.add_argument("--budget-mb", type=float, help="Max memory for the forest (default: lossless steps only)")
+    parser.add_argument("--max-deviation", type=float, default=MAX_DEVIATION,
+                        help="Max allowed |compact - original| on any class probability")
+    parser.add_argument("--collapse-tol", type=float, default=0.0,
+                        help="Merge sibling leaves whose probabilities differ by at most this (0 = identical only)")
+    parser.add_argument("--min-trees", type=int, default=MIN_TREES, help="Smallest forest tried by tree selection")
+    parser.add_argument("--out", default=COMPACT_PATH)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        raise FileNotFoundError(f"Model not found at {args.model}. Run src/08_train_and_save_final_model.py first.")
+
+    bundle = attach_transform(joblib.load(args.model))
+    model = bundle["model"]
+    FEATURES = bundle["features"]
+    arrays = export_forest(model)
+
+    # Reference rows: real feature rows plus jittered copies (as in src/12_export_flat_forest.py)
+    X = pd.read_csv(DATA_PATH)[FEATURES].dropna().to_numpy(dtype=float)
+    rng = np.random.default_rng(42)
+    jitter = X[rng.integers(0, len(X), 5000)] * rng.uniform(0.7, 1.3, size=(5000, X.shape[1]))
+    X_check = np.vstack([X, jitter])
+    reference = model.predict_proba(pd.DataFrame(X_check, columns=FEATURES))
+
+    t0 = time.perf_counter()
+    steps = compaction_ladder(arrays, X_check[::2], args.collapse_tol, args.min_trees)
+    print(f"Built {len(steps)} compaction steps in {time.perf_counter() - t0:.1f} s")
+
+    results = [{"step": name, **evaluate(step, X_check, reference)} for name, step in steps]
+    budget = int(args.budget_mb * 1e6) if args.budget_mb is not None else None
+    chosen = choose_step(results, budget, args.max_deviation)
+
+    print(f"\nsklearn trees in memory: {sklearn_nbytes(model) / 1e6:.2f} MB ({model.n_estimators} trees)")
+    print(f"{'step':<30}{'trees':>6}{'nodes':>8}{'mem MB':>8}{'file MB':>9}{'1 row ms':>10}{'batch ms':>10}"
+          f"{'max diff':>10}{'same class':>12}")
+    for i, r in enumerate(results):
+        mark = "  <- chosen" if i == chosen else ""
+        print(f"{r['step']:<30}{r['trees']:>6}{r['nodes']:>8}{r['memory_bytes'] / 1e6:>8.2f}{r['file_bytes'] / 1e6:>9.2f}"
+              f"{r['single_ms']:>10.2f}{r['batch_ms']:>10.2f}{r['max_abs_diff']:>10.2g}{r['argmax_agreement']:>12.2%}{mark}")
+
+    # Same source stamp as the exact export, so the registry serves it only for this model
+    st = os.stat(args.model)
+    source = {"checksum": file_checksum(args.model), "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    compact = dict(steps[chosen][1], compaction=np.array(results[chosen]["step"]),
+                   compaction_max_diff=np.float64(results[chosen]["max_abs_diff"]))
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    save_flat(args.out, compact, FEATURES, bundle["inv_label_map"], source=source,
+              feature_spec=bundle["feature_spec"])
+    print("\nSaved compact forest to:", args.out)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "model": args.model,
+        "sklearn_bytes": sklearn_nbytes(model),
+        "budget_bytes": budget,
+        "max_deviation": args.max_deviation,
+        "chosen": results[chosen]["step"],
+        "reference_rows": len(X_check),
+        "steps": results,
+    }
+    with open(REPORT_PATH, "w") as f:
+        json.dump(report, f, indent=2)
+    print("Saved report to:", REPORT_PATH)
+
+
+if __name__ == "__main__":
+    main()
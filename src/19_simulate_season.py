@@ -0,0 +1,123 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from feature_store import load_table
+from form_index import INDEX_DIR, FormIndex
+from model_registry import MODEL_PATH, load_bundle
+from season_sim import CHUNK_ELEMENTS, N_SIMS, fixture_probabilities, league_table, simulate, split_season, summarize
+
+TEAM = "Chelsea"
+OUT_PATH = os.path.join("outputs", "season_simulation.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate the rest of a season from the model and the odds")
+    parser.add_argument("--season", help="SeasonTag in epl_all_seasons (default: the latest season)")
+    parser.add_argument("--as-of", help="Simulate fixtures from this date on (default: the season's midpoint)")
+    parser.add_argument("--fixtures", help="CSV of upcoming fixtures in the raw football-data format (no results)")
+    parser.add_argument("--team", default=TEAM)
+    parser.add_argument("--sims", type=int, default=N_SIMS)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk", type=int, default=CHUNK_ELEMENTS, help="Random draws per chunk (memory bound)")
+    parser.add_argument("--out", default=OUT_PATH)
+    args = parser.parse_args()
+
+    if not os.path.exists(INDEX_DIR):
+        raise FileNotFoundError(f"Form index not found at {INDEX_DIR}. Run src/16_build_form_index.py first.")
+
+    epl = load_table("epl_all_seasons")
+    for col in ["HomeTeam", "AwayTeam", "FTR", "SeasonTag"]:
+        epl[col] = epl[col].astype(str)  # the store keeps these as categoricals
+    season_tag = args.season or epl.loc[epl["Date"].idxmax(), "SeasonTag"]
+    season = epl[epl["SeasonTag"] == season_tag]
+    if season.empty:
+        raise ValueError(f"Unknown season '{season_tag}'. Options: {sorted(epl['SeasonTag'].unique())}")
+    if args.fixtures:
+        upcoming = pd.read_csv(args.fixtures)
+        upcoming["Date"] = pd.to_datetime(upcoming["Date"], dayfirst=True)
+        season = pd.concat([season, upcoming], ignore_index=True)
+
+    as_of = pd.Timestamp(args.as_of) if args.as_of else season["Date"].sort_values().iloc[len(season) // 2]
+    played, remaining = split_season(season, as_of)
+    teams = sorted(set(season["HomeTeam"]) | set(season["AwayTeam"]))
+    if args.team not in teams:
+        raise ValueError(f"{args.team} has no fixtures in season {season_tag}.")
+
+    table = league_table(played, teams)
+    history = epl[(epl["Date"] < as_of) & epl["FTR"].isin(["H", "D", "A"])]
+    base_rates = history["FTR"].value_counts(normalize=True).reindex(["H", "D", "A"]).fillna(1 / 3).to_numpy()
+
+    # Outcome probabilities: the model for the team's fixtures (one batch), the market for the rest
+    t0 = time.perf_counter()
+    bundle, version, _ = load_bundle(MODEL_PATH)
+    form = FormIndex().lookup(args.team, as_of)["form"]
+    probs, source = fixture_probabilities(remaining, args.team, bundle, form, base_rates)
+    prob_seconds = time.perf_counter() - t0
+
+    pos = {t: i for i, t in enumerate(teams)}
+    home = remaining["HomeTeam"].map(pos).to_numpy(dtype=np.int64)
+    away = remaining["AwayTeam"].map(pos).to_numpy(dtype=np.int64)
+    tiebreak = table["GoalDiff"].to_numpy() * 1000 + table["GoalsFor"].to_numpy()
+
+    t0 = time.perf_counter()
+    result = simulate(home, away, probs, table["Points"].to_numpy(), tiebreak, args.sims, args.seed, args.chunk)
+    sim_seconds = time.perf_counter() - t0
+
+    print(f"Season {season_tag}, as of {as_of.date()}: {len(played)} played, {len(remaining)} remaining "
+          f"({(source == 'model').sum()} by the model, {(source == 'market').sum()} from odds, "
+          f"{(source == 'base').sum()} at base rates)")
+    print(f"Probabilities: {prob_seconds * 1000:.0f} ms. Simulation: {args.sims:,} seasons in {sim_seconds:.2f} s "
+          f"({args.sims / sim_seconds:,.0f}/s)")
+
+    summary = summarize(result, teams, args.team)
+    p = summary["position_probabilities"]
+    current = table.set_index("Team").loc[args.team]
+    print(f"\n{args.team}: {current['Points']} pts from {current['Played']} games")
+    print(f"Final points: mean {summary['points_mean']:.1f}, 5%/50%/95%: {summary['points_p5_p50_p95']}")
+    print(f"Title {p['1']:.1%}  Top 4 {sum(p[str(k)] for k in range(1, 5)):.1%}  "
+          f"Top 6 {sum(p[str(k)] for k in range(1, 7)):.1%}  "
+          f"Relegation {sum(p[str(k)] for k in range(18, len(teams) + 1)):.1%}")
+
+    print("\nPoints of the team finishing in position:")
+    for position, th in summary["thresholds"].items():
+        print(f"  {position:>2}: mean {th['points_mean']:.1f}, 5%/50%/95% {th['points_p5_p50_p95']}"
+              f"  ({args.team} finishes this high: {th['team_probability']:.1%})")
+
+    n = result["n_sims"]
+    values = np.arange(result["points"].shape[1])
+    projection = pd.DataFrame({
+        "Team": teams,
+        "Points": table["Points"],
+        "ExpPoints": (result["points"] * values).sum(axis=1) / n,
+        "Title": result["position"][:, 0] / n,
+        "Top4": result["position"][:, :4].sum(axis=1) / n,
+        "Relegated": result["position"][:, 17:].sum(axis=1) / n,
+    }).sort_values("ExpPoints", ascending=False)
+    print("\nProjected table:")
+    print(projection.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+
+    report = {
+        "season": season_tag,
+        "as_of": str(as_of.date()),
+        "model_version": version[:12],
+        "seed": args.seed,
+        "played": len(played),
+        "remaining": len(remaining),
+        "probability_seconds": prob_seconds,
+        "simulation_seconds": sim_seconds,
+        **summary,
+        "projection": projection.to_dict(orient="records"),
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print("\nSaved report to:", args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from team_models import LEAGUE, MEMORY_CAP_MB, MIN_MATCHES, TEAM_MODEL_DIR, TeamModelRegistry, team_datasets, \
+    train_team_models
+
+EPL_PATH = os.path.join("data", "processed", "epl_all_seasons.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train one model per EPL team (plus a league-wide fallback)")
+    parser.add_argument("--teams", nargs="+", help="Only these teams (default: every team with enough matches)")
+    parser.add_argument("--min-matches", type=int, default=MIN_MATCHES)
+    parser.add_argument("--no-league", action="store_true", help="Skip the league-wide fallback model")
+    parser.add_argument("--workers", type=int, help="Training processes (default: one per core)")
+    parser.add_argument("--trees", type=int, default=500)
+    parser.add_argument("--memory-cap-mb", type=float, default=MEMORY_CAP_MB,
+                        help="Cap for the serving check at the end")
+    parser.add_argument("--out-dir", default=TEAM_MODEL_DIR)
+    args = parser.parse_args()
+
+    epl = pd.read_csv(EPL_PATH)
+    datasets = team_datasets(epl, args.min_matches)
+    if args.teams:
+        unknown = [t for t in args.teams if t not in datasets]
+        if unknown:
+            raise ValueError(f"Not enough matches (or unknown team) for {unknown}. Options: {sorted(datasets)}")
+        datasets = {t: datasets[t] for t in args.teams + ([] if args.no_league else [LEAGUE])}
+    elif args.no_league:
+        datasets.pop(LEAGUE)
+
+    params = {"n_estimators": args.trees, "max_depth": 10, "random_state": 42, "class_weight": "balanced"}
+    t0 = time.perf_counter()
+    manifest = train_team_models(datasets, args.out_dir, args.workers, params, source=EPL_PATH)
+    elapsed = time.perf_counter() - t0
+
+    records = list(manifest["teams"].values()) + ([manifest["league"]] if manifest["league"] else [])
+    print(f"Trained {len(records)} models in {elapsed:.1f} s "
+          f"({sum(r['fit_seconds'] for r in records):.1f} s of fitting, {args.workers or os.cpu_count()} workers)")
+    print(f"\n{'model':<18} {'train':>6} {'test':>5} {'acc':>6} {'logloss':>8} {'MB':>6}")
+    for r in records:
+        print(f"{r['team']:<18} {r['train_rows']:>6} {r['test_rows']:>5} {r['accuracy']:>6.3f} "
+              f"{r['log_loss']:>8.3f} {r['bytes'] / 1e6:>6.2f}")
+
+    # Serving check: touch every model once through a registry with the given cap
+    registry = TeamModelRegistry(args.out_dir, args.memory_cap_mb)
+    for team in registry.teams():
+        registry.entry(team)
+    info = registry.info()
+    print(f"\nServing all {len(registry.teams())} teams with a {args.memory_cap_mb:g} MB cap: "
+          f"{len(info['resident'])} resident ({info['resident_megabytes']:.1f} MB), "
+          f"{info['evictions']} evicted, mean load {info['mean_load_ms']} ms")
+    print("Saved models to:", args.out_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from elo import ELO_PATH, EloState, expected_home, match_elo
+
+EPL_PATH = os.path.join("data", "processed", "epl_all_seasons.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rate every EPL team (Elo) over all matches in epl_all_seasons")
+    parser.add_argument("--out", default=ELO_PATH)
+    parser.add_argument("--top", type=int, default=10, help="Teams to show")
+    args = parser.parse_args()
+
+    epl = pd.read_csv(EPL_PATH)
+
+    t0 = time.perf_counter()
+    rows, state = match_elo(epl)
+    elapsed = time.perf_counter() - t0
+    state.save(args.out)
+
+    print("Matches rated:", len(rows))
+    print("Teams:", len(state.teams))
+    print("Ratings as of:", state.last_date)
+    print(f"Rating pass: {elapsed * 1000:.1f} ms")
+    print("Saved ratings to:", args.out)
+
+    # One new result on a copy of the state: O(1), no replay
+    copy = EloState.from_dict(state.to_dict())
+    home, away = state.table()[0][0], state.table()[-1][0]
+    t0 = time.perf_counter()
+    copy.update(home, away, 2, 1)
+    print(f"Single update: {(time.perf_counter() - t0) * 1e6:.1f} us")
+
+    # How well the pre-match ratings alone call results (decided matches only)
+    scores = epl[["HomeTeam", "AwayTeam", "FTHG", "FTAG"]].assign(
+        Date=pd.to_datetime(epl["Date"], dayfirst=True, errors="coerce"))
+    result = rows.merge(scores, on=["Date", "HomeTeam", "AwayTeam"])
+    expected = expected_home(result["Elo_Home"].to_numpy(), result["Elo_Away"].to_numpy())
+    decided = (result["FTHG"] != result["FTAG"]).to_numpy()
+    home_won = (result["FTHG"] > result["FTAG"]).to_numpy()
+    print(f"Favourite won {np.mean((expected > 0.5)[decided] == home_won[decided]):.1%} "
+          f"of {decided.sum()} decided matches")
+
+    print(f"\n{'team':<18}{'rating':>8}{'games':>7}")
+    for team, rating, games in state.table()[:args.top]:
+        print(f"{team:<18}{rating:>8.1f}{games:>7}")
+
+
+if __name__ == "__main__":
+    main()
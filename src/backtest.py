@@ -0,0 +1,148 @@
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.metrics import accuracy_score, log_loss
+from sklearn.utils.class_weight import compute_sample_weight
+
+CLASSES = np.array([0, 1, 2])  # Loss / Draw / Win (label_map in the training scripts)
+CLASS_NAMES = ["Loss", "Draw", "Win"]
+
+MIN_TRAIN = 60        # matches before the first out-of-sample prediction
+STEP = "W"            # retrain every calendar week (one matchweek)
+INITIAL_TREES = 200   # "grow" mode: trees in the first fit...
+TREES_PER_STEP = 25   # ...new trees added at every step...
+MAX_TREES = 500       # ...and the oldest trees are dropped beyond this
+
+
+def default_model(random_state: int = 42):
+    """Same settings as the final model (08); class balancing is done via sample weights."""
+    return RandomForestClassifier(n_estimators=500, max_depth=10, random_state=random_state)
+
+
+def walk_forward_steps(dates, min_train: int = MIN_TRAIN, step: str = STEP):
+    """
+    (train_end, test_start, test_end) row ranges for an expanding-window
+    walk-forward over rows sorted by date: every period (a pandas frequency,
+    "W" = matchweek) is predicted by a model trained on all earlier rows.
+    """
+    periods = pd.Series(pd.to_datetime(dates)).dt.to_period(step).to_numpy()
+    starts = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1]])
+    ends = np.r_[starts[1:], len(periods)]
+    return [(s, s, e) for s, e in zip(starts, ends) if s >= min_train]
+
+
+def _fit_predict(model, X, y, train_end, test_start, test_end):
+    """One refit step (runs in a worker for mode="refit")."""
+    model = clone(model)
+    weights = compute_sample_weight("balanced", y[:train_end])
+    model.fit(X[:train_end], y[:train_end], sample_weight=weights)
+    return class_proba(model, X[test_start:test_end])
+
+
+def class_proba(model, X):
+    """Probabilities for all CLASSES, even if a class is missing from the training window."""
+    proba = np.zeros((len(X), len(CLASSES)))
+    proba[:, np.searchsorted(CLASSES, model.classes_)] = model.predict_proba(X)
+    return proba
+
+
+def walk_forward(X, y, dates, model=None, mode: str = "grow", min_train: int = MIN_TRAIN, step: str = STEP,
+                 initial_trees: int = INITIAL_TREES, trees_per_step: int = TREES_PER_STEP,
+                 max_trees: int = MAX_TREES, n_jobs: int = -1):
+    """
+    Walk-forward backtest: retrain on the expanding window at every step and
+    record out-of-sample probabilities for the next step's matches.
+
+    mode="refit" fits a fresh clone of `model` at every step, exactly like
+    retraining from scratch each week. Steps are independent, so they run in
+    parallel across cores.
+
+    mode="grow" keeps one random forest and, with warm_start, only fits
+    `trees_per_step` new trees on the current window at every step (the
+    oldest are dropped beyond `max_trees`). Each tree has seen all data up to
+    when it was grown, so the forest tracks a weekly retrain at a fraction of
+    the cost: full history runs in seconds.
+
+    The features are converted once to a contiguous float32 matrix (what the
+    sklearn trees use internally) and reused by every step.
+
+    Returns a DataFrame with one row per predicted match: Date, Step,
+    TrainSize, y, P_Loss, P_Draw, P_Win, Pred.
+    """
+    X = np.ascontiguousarray(np.asarray(X, dtype=np.float32))
+    y = np.asarray(y)
+    dates = pd.to_datetime(pd.Series(dates)).reset_index(drop=True)
+    steps = walk_forward_steps(dates, min_train, step)
+    if not steps:
+        raise ValueError(f"Not enough rows for a walk-forward backtest (min_train={min_train}).")
+
+    model = default_model() if model is None else model
+
+    if mode == "refit":
+        results = Parallel(n_jobs=n_jobs)(delayed(_fit_predict)(model, X, y, *s) for s in steps)
+    elif mode == "grow":
+        if not isinstance(model, RandomForestClassifier):
+            raise ValueError("mode='grow' needs a RandomForestClassifier (warm_start tree growth).")
+        forest = clone(model).set_params(warm_start=True, n_estimators=initial_trees, n_jobs=n_jobs)
+        seed = model.random_state if isinstance(model.random_state, int) else 0
+        results = []
+        for i, (train_end, test_start, test_end) in enumerate(steps):
+            if i:
+                # Fresh seeds for the new trees, so trimmed forests never regrow old trees
+                forest.set_params(n_estimators=len(forest.estimators_) + trees_per_step, random_state=seed + i)
+            weights = compute_sample_weight("balanced", y[:train_end])
+            forest.fit(X[:train_end], y[:train_end], sample_weight=weights)
+            if len(forest.estimators_) > max_trees:
+                forest.estimators_ = forest.estimators_[-max_trees:]
+                forest.n_estimators = max_trees
+            results.append(class_proba(forest, X[test_start:test_end]))
+    else:
+        raise ValueError(f"Unknown mode '{mode}' (use 'grow' or 'refit').")
+
+    rows = []
+    for i, ((train_end, test_start, test_end), proba) in enumerate(zip(steps, results)):
+        part = pd.DataFrame(proba, columns=[f"P_{c}" for c in CLASS_NAMES])
+        part.insert(0, "Date", dates.iloc[test_start:test_end].to_numpy())
+        part.insert(1, "Step", i)
+        part.insert(2, "TrainSize", train_end)
+        part.insert(3, "y", y[test_start:test_end])
+        rows.append(part)
+    out = pd.concat(rows, ignore_index=True)
+    out["Pred"] = CLASSES[out[[f"P_{c}" for c in CLASS_NAMES]].to_numpy().argmax(axis=1)]
+    return out
+
+
+def ranked_probability_score(y, proba):
+    """
+    Mean RPS for ordered outcomes (Loss < Draw < Win): squared error between
+    cumulative predicted and observed distributions. Lower is better; unlike
+    log loss it credits a "Draw" forecast for a near miss.
+    """
+    onehot = (np.asarray(y)[:, None] == CLASSES).astype(float)
+    gap = np.cumsum(proba, axis=1) - np.cumsum(onehot, axis=1)
+    return float((gap[:, :-1] ** 2).sum(axis=1).mean() / (len(CLASSES) - 1))
+
+
+def probabilistic_scores(y, proba):
+    """Accuracy, log loss, multi-class Brier score and RPS of class probabilities (columns = CLASSES)."""
+    y = np.asarray(y)
+    proba = np.asarray(proba, dtype=float)
+    onehot = (y[:, None] == CLASSES).astype(float)
+    return {
+        "accuracy": accuracy_score(y, CLASSES[proba.argmax(axis=1)]),
+        "log_loss": log_loss(y, proba, labels=CLASSES),
+        "brier": float(((proba - onehot) ** 2).sum(axis=1).mean()),
+        "rps": ranked_probability_score(y, proba),
+    }
+
+
+def summarize(results: pd.DataFrame):
+    """Scores of the out-of-sample predictions from walk_forward()."""
+    proba = results[[f"P_{c}" for c in CLASS_NAMES]].to_numpy()
+    return {
+        "matches": len(results),
+        "steps": int(results["Step"].nunique()),
+        **probabilistic_scores(results["y"], proba),
+    }
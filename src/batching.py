@@ -0,0 +1,152 @@
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+# How long (seconds) the first request of a batch waits for others to join
+MAX_WAIT = 0.002
+
+# Feature rows per model call; a batch closes early once it has this many
+MAX_BATCH = 64
+
+# Seconds a request waits for its batch before giving up
+TIMEOUT = 30.0
+
+
+class _Pending:
+    __slots__ = ("context", "X", "enqueued", "done", "result", "error")
+
+    def __init__(self, context, X):
+        self.context = context
+        self.X = X
+        self.enqueued = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent predictions into one vectorized model call.
+
+    predict(context, X) queues the rows and blocks until they are scored. A
+    single background thread takes the oldest waiting request, keeps
+    collecting for up to max_wait seconds or until max_batch rows are
+    queued, then calls fn(context, X_all) once per distinct context (the
+    registry entry, so a batch never mixes model versions) and hands each
+    request its slice of the result. Errors raised by fn are re-raised in
+    every request of that call, and an error anywhere else in the loop
+    (including on_batch) in every request of that batch; a request whose
+    batch is not scored within timeout seconds raises TimeoutError.
+
+    Only useful with several requests in flight per process (gunicorn
+    -k gthread --threads N); the thread is started on first use, so it is
+    safe to create before gunicorn forks.
+
+    on_batch, if given, is called as on_batch(requests, rows, waits) after
+    each model call, and on_queue(depth) for every new request (for metrics).
+    """
+
+    def __init__(self, fn, max_wait: float = MAX_WAIT, max_batch: int = MAX_BATCH, on_batch=None, on_queue=None,
+                 timeout: float = TIMEOUT):
+        self.fn = fn
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self.on_batch = on_batch
+        self.on_queue = on_queue
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def _reset(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = os.getpid()
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.requests = 0
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._start_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._thread.start()
+
+    def predict(self, context, X: np.ndarray):
+        self._ensure_thread()
+        item = _Pending(context, X)
+        self._queue.put(item)
+        if self.on_queue is not None:
+            self.on_queue(self._queue.qsize())
+        if not item.done.wait(self.timeout):
+            raise TimeoutError(f"Prediction not scored within {self.timeout:g} s (micro-batcher stalled).")
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _collect(self, batch):
+        """Fill batch (collected into the caller's list, so a failure can still answer them); returns its rows."""
+        first = self._queue.get()
+        batch.append(first)
+        rows = len(first.X)
+        deadline = first.enqueued + self.max_wait
+        while rows < self.max_batch:
+            timeout = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            rows += len(item.X)
+        return rows
+
+    def _run(self):
+        while True:
+            batch = []
+            try:
+                rows = self._collect(batch)
+                started = time.monotonic()
+                groups = {}
+                for item in batch:
+                    groups.setdefault(id(item.context), []).append(item)
+                for items in groups.values():
+                    self._score(items)
+                self.batches += 1
+                self.requests += len(batch)
+                if self.on_batch is not None:
+                    self.on_batch(len(batch), rows, [started - item.enqueued for item in batch])
+            except Exception as e:
+                # Keep the thread alive: fail whatever in this batch is still waiting
+                for item in batch:
+                    if not item.done.is_set():
+                        item.error = e
+                        item.done.set()
+
+    def _score(self, items):
+        try:
+            X = items[0].X if len(items) == 1 else np.concatenate([item.X for item in items])
+            proba = self.fn(items[0].context, X)
+        except Exception as e:
+            for item in items:
+                item.error = e
+                item.done.set()
+            return
+        start = 0
+        for item in items:
+            item.result = proba[start:start + len(item.X)]
+            start += len(item.X)
+            item.done.set()
+
+    def info(self):
+        return {
+            "max_wait_ms": self.max_wait * 1000,
+            "max_batch": self.max_batch,
+            "timeout_s": self.timeout,
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_requests_per_batch": round(self.requests / self.batches, 2) if self.batches else None,
+            "queued": self._queue.qsize(),
+        }
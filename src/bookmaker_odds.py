@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+
+# Individual bookmakers with 1X2 prices in the raw files (see ingest.BOOKMAKERS);
+# "Max" / "Avg" are market aggregates and PSC* is Pinnacle's closing price.
+BOOKS = ["B365", "BW", "IW", "PS", "WH", "VC"]
+MARKET_MAX = "Max"
+MARKET_AVG = "Avg"
+CLOSING_BOOK = "PSC"
+
+SIDES = "HDA"
+OUTCOMES = ["Win", "Draw", "Loss"]
+
+# For away rows the team's Win is the away price and its Loss the home price
+HOME_ORDER = np.array([0, 1, 2])
+AWAY_ORDER = np.array([2, 1, 0])
+
+
+def outcome_cols(prefix: str):
+    return [f"{prefix}_{o}" for o in OUTCOMES]
+
+
+CONSENSUS_COLS = (
+    ["Books"]
+    + outcome_cols("AvgOdds")
+    + outcome_cols("MaxOdds")
+    + outcome_cols("Spread")
+    + outcome_cols("MktP")
+    + ["MktOverround"]
+    + outcome_cols("CloseP")
+)
+
+
+def odds_matrix(df: pd.DataFrame, books=BOOKS):
+    """
+    Stack H/D/A prices into an (n_rows, n_books, 3) float array. Missing
+    bookmakers (whole column absent) and non-positive prices are NaN, and a
+    book only counts for a row when all three of its prices are present.
+    """
+    out = np.full((len(df), len(books), 3), np.nan)
+    for b, book in enumerate(books):
+        for s, side in enumerate(SIDES):
+            col = f"{book}{side}"
+            if col in df.columns:
+                out[:, b, s] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+    out[~(out > 1.0)] = np.nan  # decimal odds are > 1; also clears 0 / negative placeholders
+    out[np.isnan(out).any(axis=2)] = np.nan
+    return out
+
+
+def orient(prices: np.ndarray, is_home):
+    """
+    Reorder the last axis from H/D/A to Win/Draw/Loss for each row's team.
+    Works on (n, 3) or (n, books, 3) arrays by index, without row-wise apply.
+    """
+    order = np.where(np.asarray(is_home, dtype=bool)[:, None], HOME_ORDER, AWAY_ORDER)
+    if prices.ndim == 3:
+        order = np.broadcast_to(order[:, None, :], prices.shape)
+    return np.take_along_axis(prices, order, axis=-1)
+
+
+def _nan_reduce(values: np.ndarray, have: np.ndarray, how):
+    """Row-wise reduction over books, NaN (not a warning) where no book has prices."""
+    filled = np.where(np.isnan(values), {"max": -np.inf, "min": np.inf, "sum": 0.0}[how], values)
+    reduced = {"max": np.max, "min": np.min, "sum": np.sum}[how](filled, axis=1)
+    return np.where(have[:, None], reduced, np.nan)
+
+
+def _margin_free(prices: np.ndarray):
+    """Implied probabilities with the bookmaker margin removed (normalised 1/odds)."""
+    raw = 1.0 / prices
+    total = raw.sum(axis=-1, keepdims=True)
+    return raw / total, total[..., 0]
+
+
+def consensus_odds(df: pd.DataFrame, is_home=None, books=BOOKS):
+    """
+    Consolidate every bookmaker's 1X2 prices in one vectorized pass.
+
+    Returns a DataFrame aligned with df with:
+      Books          number of bookmakers with a full set of prices
+      AvgOdds_*      mean price across those books
+      MaxOdds_*      best price (also using the market Max columns if present)
+      Spread_*       max - min price across books
+      MktP_*         mean margin-free implied probability across books
+      MktOverround   mean bookmaker overround (sum of 1/odds)
+      CloseP_*       margin-free probabilities from Pinnacle closing odds
+
+    Outcomes are Win/Draw/Loss for the row's team when is_home is given
+    (1 = team at home), otherwise Win/Loss mean home/away win. Rows without
+    any book fall back to the market Avg/Max columns.
+    """
+    if is_home is None:
+        is_home = np.ones(len(df), dtype=bool)
+    prices = orient(odds_matrix(df, books), is_home)
+    market = orient(odds_matrix(df, [MARKET_AVG, MARKET_MAX, CLOSING_BOOK]), is_home)
+    market_avg, market_max, closing = market[:, 0], market[:, 1], market[:, 2]
+
+    present = ~np.isnan(prices[:, :, 0])
+    n_books = present.sum(axis=1)
+    have = n_books > 0
+    denom = np.where(have, n_books, 1)[:, None]
+
+    probs, overround = _margin_free(prices)
+    avg_odds = _nan_reduce(prices, have, "sum") / denom
+    max_odds = _nan_reduce(prices, have, "max")
+    spread = max_odds - _nan_reduce(prices, have, "min")
+    mkt_p = _nan_reduce(probs, have, "sum") / denom
+    mkt_overround = np.where(have, np.where(present, overround, 0.0).sum(axis=1) / denom[:, 0], np.nan)
+
+    # No individual books: use the market average / best prices instead
+    avg_odds = np.where(have[:, None], avg_odds, market_avg)
+    fallback_p, fallback_overround = _margin_free(market_avg)
+    mkt_p = np.where(have[:, None], mkt_p, fallback_p)
+    mkt_overround = np.where(have, mkt_overround, fallback_overround)
+    max_odds = np.fmax(max_odds, market_max)
+
+    close_p, _ = _margin_free(closing)
+
+    blocks = [n_books[:, None], avg_odds, max_odds, spread, mkt_p, mkt_overround[:, None], close_p]
+    out = pd.DataFrame(np.hstack(blocks), columns=CONSENSUS_COLS, index=df.index)
+    out["Books"] = n_books.astype(np.int8)
+    return out
@@ -0,0 +1,224 @@
+import json
+import os
+import time
+
+import numpy as np
+
+# Written by the data pipeline (src/13_update_features.py) and src/21_build_elo_ratings.py
+ELO_PATH = os.path.join("data", "processed", "elo_ratings.json")
+
+INITIAL = 1500.0
+K = 20.0
+HOME_ADVANTAGE = 60.0  # rating points added to the home side's expectation
+
+
+def expected_home(home: float, away: float):
+    """Expected score (win 1, draw 0.5) of the home side."""
+    return 1.0 / (1.0 + 10.0 ** ((away - home - HOME_ADVANTAGE) / 400.0))
+
+
+def rating_change(home: float, away: float, home_goals: int, away_goals: int):
+    """
+    Points the home side gains (the away side loses the same) from one
+    result. Wins by more than one goal count for more, as in the World
+    Football Elo ratings: x1.5 for two goals, x(11 + margin) / 8 beyond.
+    """
+    margin = abs(home_goals - away_goals)
+    weight = 1.0 if margin <= 1 else 1.5 if margin == 2 else (11.0 + margin) / 8.0
+    actual = 1.0 if home_goals > away_goals else 0.5 if home_goals == away_goals else 0.0
+    return K * weight * (actual - expected_home(home, away))
+
+
+def elo_pass(home, away, home_goals, away_goals, ratings):
+    """
+    Rate matches in order: home/away are team codes (indexes into the
+    `ratings` list, updated in place), goals the full-time score. One pass
+    over plain lists, no per-row pandas access. Returns (n, 2) pre-match
+    ratings (home, away).
+    """
+    pre = np.empty((len(home), 2))
+    for i, (h, a, hg, ag) in enumerate(zip(home.tolist(), away.tolist(), home_goals.tolist(), away_goals.tolist())):
+        rh, ra = ratings[h], ratings[a]
+        pre[i] = rh, ra
+        delta = rating_change(rh, ra, hg, ag)
+        ratings[h] = rh + delta
+        ratings[a] = ra - delta
+    return pre
+
+
+def elo_features(team, opponent, is_home):
+    """
+    (n, 4) ELO_FEATURES (src/feature_spec.py) from pre-match ratings: the
+    team's rating, the opponent's, the difference and the team's expected
+    score with home advantage. Used by the pipeline and FeatureTransform alike.
+    """
+    team, opponent = np.asarray(team, dtype=np.float64), np.asarray(opponent, dtype=np.float64)
+    edge = team - opponent + HOME_ADVANTAGE * (2.0 * np.asarray(is_home, dtype=np.float64) - 1.0)
+    return np.column_stack([team, opponent, team - opponent, 1.0 / (1.0 + 10.0 ** (-edge / 400.0))])
+
+
+class EloState:
+    """
+    Every team's current rating. update() applies one result in O(1), so
+    new matches never replay the history; to_dict()/save() persist it for
+    the incremental pipeline and the web app.
+
+    Teams start at INITIAL the first time they appear.
+    """
+
+    def __init__(self):
+        self.teams = {}      # team -> index into ratings
+        self.ratings = []
+        self.games = []
+        self.last_date = None
+
+    def team_code(self, team: str):
+        code = self.teams.get(team)
+        if code is None:
+            code = self.teams[team] = len(self.ratings)
+            self.ratings.append(INITIAL)
+            self.games.append(0)
+        return code
+
+    def update(self, home: str, away: str, home_goals: int, away_goals: int, date: str = None):
+        """Apply one result; returns the pre-match (home, away) ratings."""
+        h, a = self.team_code(home), self.team_code(away)
+        rh, ra = self.ratings[h], self.ratings[a]
+        delta = rating_change(rh, ra, home_goals, away_goals)
+        self.ratings[h] = rh + delta
+        self.ratings[a] = ra - delta
+        self.games[h] += 1
+        self.games[a] += 1
+        if date is not None and (self.last_date is None or date > self.last_date):
+            self.last_date = date
+        return rh, ra
+
+    def rating(self, team: str):
+        code = self.teams.get(team)
+        if code is None:
+            raise ValueError(f"No Elo rating for '{team}'.")
+        return self.ratings[code]
+
+    def table(self):
+        """[(team, rating, games)], highest rated first."""
+        rows = [(t, self.ratings[c], self.games[c]) for t, c in self.teams.items()]
+        return sorted(rows, key=lambda r: -r[1])
+
+    def to_dict(self):
+        return {
+            "params": {"initial": INITIAL, "k": K, "home_advantage": HOME_ADVANTAGE},
+            "last_date": self.last_date,
+            "teams": {t: {"rating": self.ratings[c], "games": self.games[c]} for t, c in self.teams.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict):
+        if d.get("params") != {"initial": INITIAL, "k": K, "home_advantage": HOME_ADVANTAGE}:
+            raise ValueError("Elo ratings were computed with different parameters; rebuild them.")
+        state = cls()
+        for team, t in d["teams"].items():
+            state.teams[team] = len(state.ratings)
+            state.ratings.append(float(t["rating"]))
+            state.games.append(int(t["games"]))
+        state.last_date = d.get("last_date")
+        return state
+
+    def save(self, path: str = ELO_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path + ".tmp", "w") as f:
+            json.dump({**self.to_dict(), "saved_at": time.strftime("%Y-%m-%dT%H:%M:%S")}, f, indent=2)
+        os.replace(path + ".tmp", path)  # EloRatings never reads a half-written file
+
+    @classmethod
+    def load(cls, path: str = ELO_PATH):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def match_elo(epl, state: EloState = None):
+    """
+    Pre-match ratings for every match in `epl` (football-data rows), rated
+    in date order on top of `state` (updated in place; a new one if None).
+    Returns (ratings, state), ratings having Date, HomeTeam, AwayTeam,
+    Elo_Home and Elo_Away, one row per match in date order.
+    """
+    import pandas as pd
+
+    state = state if state is not None else EloState()
+    dates = epl["Date"]
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, dayfirst=True, errors="coerce")
+    played = dates.notna().to_numpy() & epl["FTHG"].notna().to_numpy() & epl["FTAG"].notna().to_numpy()
+    order = np.flatnonzero(played)[np.argsort(dates.to_numpy()[played], kind="stable")]
+
+    home_names = epl["HomeTeam"].to_numpy()[order]
+    away_names = epl["AwayTeam"].to_numpy()[order]
+    home = np.array([state.team_code(t) for t in home_names], dtype=np.int64)
+    away = np.array([state.team_code(t) for t in away_names], dtype=np.int64)
+    pre = elo_pass(home, away, epl["FTHG"].to_numpy(dtype=np.int64)[order],
+                   epl["FTAG"].to_numpy(dtype=np.int64)[order], state.ratings)
+
+    games = np.bincount(np.concatenate([home, away]), minlength=len(state.ratings))
+    state.games = [g + int(n) for g, n in zip(state.games, games)]
+    if len(order):
+        last = dates.iloc[order[-1]].strftime("%Y-%m-%d")
+        state.last_date = max(last, state.last_date) if state.last_date else last
+
+    rows = pd.DataFrame({
+        "Date": dates.iloc[order].to_numpy(),
+        "HomeTeam": home_names,
+        "AwayTeam": away_names,
+        "Elo_Home": pre[:, 0],
+        "Elo_Away": pre[:, 1],
+    })
+    return rows, state
+
+
+class EloRatings:
+    """
+    Current ratings for the web app, read from the file the pipeline
+    keeps up to date and re-read within check_interval seconds of a change.
+    """
+
+    def __init__(self, path: str = ELO_PATH, check_interval: float = 2.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._state = None
+        self._stat = None
+        self._last_check = 0.0
+
+    def state(self):
+        """The latest EloState, or None if the file does not exist."""
+        now = time.monotonic()
+        if self._state is not None and now - self._last_check < self.check_interval:
+            return self._state
+        self._last_check = now
+        if not os.path.exists(self.path):
+            self._state = self._stat = None
+            return None
+        st = os.stat(self.path)
+        stat_key = (st.st_mtime_ns, st.st_size)
+        if stat_key != self._stat:
+            self._state, self._stat = EloState.load(self.path), stat_key
+        return self._state
+
+    def lookup(self, team: str, opponent: str, is_home=None):
+        """
+        {"team", "opponent", "expected_score", "as_of"} from the current
+        ratings; expected_score (with home advantage) needs is_home.
+        """
+        state = self.state()
+        if state is None:
+            raise FileNotFoundError(f"No Elo ratings at {self.path}. Run src/21_build_elo_ratings.py first.")
+        team_rating, opp_rating = state.rating(team), state.rating(opponent)
+        expected = None
+        if is_home is not None:
+            expected = float(elo_features([team_rating], [opp_rating], [is_home])[0, 3])
+        return {"team": team_rating, "opponent": opp_rating, "expected_score": expected, "as_of": state.last_date}
+
+    def info(self):
+        state = self.state()
+        if state is None:
+            return None
+        return {"path": self.path, "as_of": state.last_date, "teams": len(state.teams),
+                "top": [{"team": t, "rating": round(r, 1)} for t, r, _ in state.table()[:5]]}
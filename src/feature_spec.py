@@ -0,0 +1,300 @@
+import re
+
+import numpy as np
+
+from elo import elo_features
+
+# Rolling form is taken over the previous WINDOW matches
+WINDOW = 5
+FORM_FEATURES = [f"FormPoints_{WINDOW}", f"GoalsFor_{WINDOW}", f"GoalsAgainst_{WINDOW}",
+                 f"GoalDiff_{WINDOW}", f"WinRate_{WINDOW}"]
+ODDS_FEATURES = ["Odds_Win", "Odds_Draw", "Odds_Loss"]
+MARKET_FEATURES = ["ImpP_Win", "ImpP_Draw", "ImpP_Loss", "Overround", "LogOdds_Win", "LogOdds_Draw", "LogOdds_Loss"]
+# Pre-match Elo ratings (src/elo.py) of the team and its opponent
+ELO_FEATURES = ["Elo_Team", "Elo_Opp", "Elo_Diff", "Elo_Exp"]
+
+# Model columns, in order, for each family of models
+FEATURE_SETS = {
+    "form": ["IsHome"] + FORM_FEATURES,                                      # scripts 04, 05
+    "odds": ["IsHome"] + FORM_FEATURES + ODDS_FEATURES,                      # 07, 08, 11, 17, team models
+    "odds_plus": ["IsHome"] + FORM_FEATURES + ODDS_FEATURES + MARKET_FEATURES,  # 10
+    "odds_elo": ["IsHome"] + FORM_FEATURES + ODDS_FEATURES + ELO_FEATURES,      # 10 --feature-set odds_elo
+}
+
+# Every feature a transform can produce, in the order they are computed:
+# the raw fields first, then the ones derived from them
+ALL_FEATURES = ["IsHome"] + FORM_FEATURES + ODDS_FEATURES + ELO_FEATURES[:2] + MARKET_FEATURES + ELO_FEATURES[2:]
+
+# Raw fixture fields (the keys /api/predict takes; the CLIs' argument names)
+FORM_FIELDS = [f.lower() for f in FORM_FEATURES]
+ODDS_FIELDS = [f.lower() for f in ODDS_FEATURES]
+ELO_FIELDS = [f.lower() for f in ELO_FEATURES[:2]]
+SCORES_FIELD = "last5_scores"
+
+# Raw numeric fields behind ALL_FEATURES[:len(RAW_FIELDS)], in the same order
+RAW_FIELDS = ["is_home"] + FORM_FIELDS + ODDS_FIELDS + ELO_FIELDS
+
+# Where each block sits in ALL_FEATURES
+_FORM = slice(1, 1 + WINDOW)
+_ODDS = slice(_FORM.stop, _FORM.stop + len(ODDS_FIELDS))
+_ELO = slice(_ODDS.stop, len(RAW_FIELDS))
+_MARKET = slice(len(RAW_FIELDS), len(RAW_FIELDS) + len(MARKET_FEATURES))
+_ELO_DERIVED = slice(_MARKET.stop, len(ALL_FEATURES))
+
+SPEC_VERSION = 1
+
+# Models walk float32 inputs (as sklearn does); anything larger becomes inf there
+FLOAT32_MAX = float(np.finfo(np.float32).max)
+
+_SCORELINE = re.compile(r"(\d+)\s*-\s*(\d+)")
+# All WINDOW scorelines in one match (the common case); anything else goes through _scoreline_goals
+_SCORELINES = re.compile(r"[\s,]*" + r"\s*,[\s,]*".join([r"(\d+)\s*-\s*(\d+)"] * WINDOW) + r"[\s,]*")
+
+
+class FeatureError(ValueError):
+    """Bad input in one fixture; `index` is its position in the batch."""
+
+    def __init__(self, index: int, message: str):
+        super().__init__(message)
+        self.index = index
+
+
+def _scoreline_goals(scorelines: str):
+    """(for, against) goals of WINDOW scorelines, with a message for the first problem."""
+    parts = [p.strip() for p in str(scorelines).split(",") if p.strip()]
+    if len(parts) != WINDOW:
+        raise ValueError(f"Enter exactly {WINDOW} scorelines separated by commas, e.g. 2-1,0-0,1-2,3-0,1-1.")
+    goals = []
+    for s in parts:
+        m = _SCORELINE.fullmatch(s)
+        if not m:
+            raise ValueError(f"Invalid scoreline '{s}'. Use format like 2-1.")
+        goals.append((int(m.group(1)), int(m.group(2))))
+    return goals
+
+
+def scoreline_form(scorelines):
+    """
+    (n, 5) FORM_FEATURES from n strings of the last WINDOW scorelines, each
+    "2-1, 0-0, 1-2, 3-0, 1-1" from the team's side (team goals first).
+    One regex match per string; the sums are done on the whole array.
+    Raises FeatureError for the first string that does not parse.
+    """
+    groups = []
+    for i, s in enumerate(scorelines):
+        m = _SCORELINES.fullmatch(str(s))
+        if m is not None:
+            groups.append(m.groups())
+            continue
+        try:
+            groups.append([g for pair in _scoreline_goals(s) for g in pair])
+        except ValueError as e:
+            raise FeatureError(i, str(e)) from None
+    goals = np.array(groups, dtype=np.float64).reshape(len(groups), WINDOW, 2)
+    gf, ga = goals[:, :, 0], goals[:, :, 1]
+    wins = (gf > ga).sum(axis=1)
+    draws = (gf == ga).sum(axis=1)
+    goals_for, goals_against = gf.sum(axis=1), ga.sum(axis=1)
+    return np.column_stack([3 * wins + draws, goals_for, goals_against, goals_for - goals_against, wins / WINDOW])
+
+
+def parse_scorelines(scorelines: str):
+    """
+    scorelines example:
+      "2-1, 0-0, 1-2, 3-0, 1-1"
+    Interpreted from the team's perspective (TeamGoals-OppGoals) for each match.
+    Returns rolling features for the last 5:
+      FormPoints_5, GoalsFor_5, GoalsAgainst_5, GoalDiff_5, WinRate_5
+    """
+    try:
+        return tuple(float(v) for v in scoreline_form([scorelines])[0])
+    except FeatureError as e:
+        raise ValueError(str(e)) from None
+
+
+def market_features(odds: np.ndarray):
+    """
+    MARKET_FEATURES from (n, 3) decimal odds (Win, Draw, Loss): margin-free
+    implied probabilities, the overround and log odds. Used by the training
+    pipeline (add_implied_probs) and by FeatureTransform alike.
+    """
+    raw = 1.0 / odds
+    overround = raw.sum(axis=1, keepdims=True)
+    return np.hstack([raw / overround, overround, np.log(odds)])
+
+
+def has_form(fixture: dict):
+    """Whether a raw fixture carries its own form (scorelines or all raw form fields)."""
+    return bool(fixture.get(SCORES_FIELD)) or all(fixture.get(k) is not None for k in FORM_FIELDS)
+
+
+def _column(values, field: str):
+    """Raw values -> float array, NaN where missing (None or blank)."""
+    if isinstance(values, np.ndarray) and values.dtype.kind in "biuf":
+        return values.astype(np.float64)
+    try:
+        return np.array([np.nan if v is None or v == "" else v for v in values], dtype=np.float64)
+    except (TypeError, ValueError):
+        for i, v in enumerate(values):
+            try:
+                float(np.nan if v is None or v == "" else v)
+            except (TypeError, ValueError):
+                raise FeatureError(i, f"{field} must be a number, got {v!r}.") from None
+        raise
+
+
+class FeatureTransform:
+    """
+    A feature spec compiled into a vectorized transform: raw fixtures in,
+    a contiguous float64 matrix in the model's column order out.
+
+    Call it with a list of raw fixture dicts (the /api/predict format) or a
+    dict of columns (field -> sequence), so thousands of fixtures are
+    featurized with one pass per field and array maths, never a dict per row:
+
+      is_home                    0 or 1
+      odds_win/draw/loss         decimal odds from the team's side
+      last5_scores               "2-1, 0-0, 1-2, 3-0, 1-1", or
+      formpoints_5 ... winrate_5 the raw form stats
+      elo_team, elo_opp          pre-match Elo ratings (models with ELO_FEATURES)
+
+    Scorelines win over raw form stats. `context` fills what fixtures leave
+    out, e.g. form index lookups for fixtures named by date:
+    {"form": (n, 5), "is_home": (n,), "odds": (n, 3), "elo": (n, 2)} with
+    NaN where unknown.
+
+    The spec (spec()) is stored in every model bundle and flat export, and
+    the bundle's transform is compiled from it at load time, so training
+    and serving always agree on the columns.
+    """
+
+    def __init__(self, features):
+        unknown = [f for f in features if f not in ALL_FEATURES]
+        if unknown:
+            raise ValueError(f"No feature definition for {unknown}.")
+        self.features = list(features)
+        self._columns = np.array([ALL_FEATURES.index(f) for f in self.features], dtype=np.intp)
+        self._market = any(f in MARKET_FEATURES for f in self.features)
+        self._odds = self._market or any(f in ODDS_FEATURES for f in self.features)
+        self._form = any(f in FORM_FEATURES for f in self.features)
+        self.uses_elo = any(f in ELO_FEATURES for f in self.features)
+        self._is_home = "IsHome" in self.features
+
+    @classmethod
+    def from_spec(cls, spec: dict):
+        if spec.get("version", SPEC_VERSION) != SPEC_VERSION:
+            raise ValueError(f"Unsupported feature spec version {spec.get('version')}.")
+        if spec.get("window", WINDOW) != WINDOW:
+            raise ValueError(f"Feature spec uses a {spec['window']}-match window; this code computes {WINDOW}.")
+        return cls(spec["features"])
+
+    def spec(self):
+        return {"version": SPEC_VERSION, "window": WINDOW, "features": list(self.features)}
+
+    def from_table(self, df):
+        """Model matrix from a processed table that already has the feature columns (training)."""
+        return np.ascontiguousarray(df[self.features].to_numpy(dtype=np.float64))
+
+    def __call__(self, fixtures, context: dict = None):
+        return self.from_raw(self.raw(fixtures, context))
+
+    def raw(self, fixtures, context: dict = None):
+        """
+        (n, len(RAW_FIELDS)) raw fields, NaN where unknown, after `context`
+        and scorelines are applied but before any checks. from_raw() turns
+        them into the model matrix; editing in between (e.g. sweeping the
+        odds columns) avoids parsing the same fixture again.
+        """
+        raw, scores = _raw_fields(fixtures)
+        is_home, form, odds, elo = raw[:, 0], raw[:, _FORM], raw[:, _ODDS], raw[:, _ELO]
+
+        context = context or {}
+        if "is_home" in context:
+            np.copyto(is_home, context["is_home"], where=np.isnan(is_home))
+        if "form" in context:
+            # Form stats only count when all of them are given
+            np.copyto(form, context["form"], where=np.isnan(form).any(axis=1, keepdims=True))
+        if "odds" in context:
+            np.copyto(odds, context["odds"], where=np.isnan(odds))
+        if "elo" in context:
+            np.copyto(elo, context["elo"], where=np.isnan(elo))
+        rows = [i for i, s in enumerate(scores) if s]
+        if rows and self._form:
+            try:
+                form[rows] = scoreline_form([scores[i] for i in rows])
+            except FeatureError as e:
+                raise FeatureError(rows[e.index], str(e)) from None
+        return raw
+
+    def from_raw(self, raw: np.ndarray):
+        """The model matrix from raw() output; raises FeatureError for the first incomplete or invalid row."""
+        full = np.empty((len(raw), len(ALL_FEATURES)))
+        full[:, :len(RAW_FIELDS)] = raw
+        is_home, odds, elo = full[:, 0], full[:, _ODDS], full[:, _ELO]
+
+        missing = np.isnan(raw)
+        too_large = np.abs(raw) > FLOAT32_MAX  # inf included, NaN not
+        if too_large.any():
+            row = int(too_large.any(axis=1).argmax())
+            raise FeatureError(row, f"{RAW_FIELDS[too_large[row].argmax()]} must be a finite number.")
+        if self._is_home:
+            _check(missing[:, 0], "is_home is required for fixtures not in the data.")
+            _check((is_home != 0) & (is_home != 1) & ~missing[:, 0], "is_home must be 0 or 1.")
+        if self._form:
+            _check(missing[:, _FORM].any(axis=1), (
+                f"Provide {SCORES_FIELD}, all 5 rolling form fields ({', '.join(FORM_FIELDS)}), "
+                "or a fixture date (and opponent)."
+            ))
+        if self._odds:
+            _check(missing[:, _ODDS].any(axis=1),
+                   "odds_win, odds_draw and odds_loss are required for fixtures not in the data.")
+            _check((odds <= 1.0).any(axis=1), "Decimal odds must be greater than 1.")
+        if self.uses_elo:
+            _check(missing[:, _ELO].any(axis=1),
+                   "elo_team and elo_opp are required unless the opponent is named and rated.")
+            full[:, _ELO_DERIVED] = elo_features(elo[:, 0], elo[:, 1], is_home)[:, 2:]
+        if self._market:
+            full[:, _MARKET] = market_features(odds)
+        return np.ascontiguousarray(full[:, self._columns])
+
+
+def _check(bad: np.ndarray, message: str):
+    """Raise FeatureError for the first fixture flagged in `bad`."""
+    if bad.any():
+        raise FeatureError(int(bad.argmax()), message)
+
+
+def _raw_fields(fixtures):
+    """
+    (n, len(RAW_FIELDS)) floats (NaN where missing) and the scoreline
+    strings, from a list of fixture dicts or a dict of columns.
+    """
+    if isinstance(fixtures, dict):
+        n = len(next(iter(fixtures.values()))) if fixtures else 0
+        raw = np.column_stack([_column(fixtures[k], k) if k in fixtures else np.full(n, np.nan) for k in RAW_FIELDS])
+        return raw.reshape(n, len(RAW_FIELDS)), fixtures.get(SCORES_FIELD, [None] * n)
+
+    values = [[f.get(k) for k in RAW_FIELDS] for f in fixtures]
+    scores = [f.get(SCORES_FIELD) for f in fixtures]
+    try:
+        # One conversion for the whole batch (numpy turns None into NaN)
+        return np.array(values, dtype=np.float64).reshape(len(values), len(RAW_FIELDS)), scores
+    except (TypeError, ValueError):
+        # Blank strings or bad values: column by column, to name the culprit
+        raw = np.column_stack([_column([v[j] for v in values], k) for j, k in enumerate(RAW_FIELDS)])
+        return raw, scores
+
+
+def attach_transform(bundle: dict):
+    """
+    Compile the bundle's stored feature spec (bundles saved before specs
+    existed get one from their feature list) into bundle["transform"].
+    Raises ValueError if the spec and the model's columns disagree.
+    """
+    spec = bundle.get("feature_spec") or {"features": bundle["features"]}
+    transform = FeatureTransform.from_spec(spec)
+    if transform.features != list(bundle["features"]):
+        raise ValueError("The bundle's feature spec does not match the model's columns.")
+    bundle["feature_spec"] = transform.spec()
+    bundle["transform"] = transform
+    return bundle
@@ -0,0 +1,135 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+PROCESSED_DIR = os.path.join("data", "processed")
+STORE_DIR = os.path.join("data", "store")
+META_FILE = "meta.json"
+
+# Tables whose Date column is in raw football-data day-first format
+DAYFIRST_TABLES = {"epl_all_seasons"}
+
+
+def _table_dir(name: str, store_dir: str):
+    return os.path.join(store_dir, name)
+
+
+def _source_sig(path: str):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _int_dtype(values: np.ndarray):
+    lo, hi = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for dt in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dt)
+        if info.min <= lo and hi <= info.max:
+            return dt
+    return np.int64
+
+
+def write_table(df: pd.DataFrame, name: str, store_dir: str = STORE_DIR, source: str = None):
+    """
+    Store a DataFrame as one .npy file per column plus meta.json:
+      datetime columns -> datetime64[ns]
+      text columns     -> categorical (smallest int codes + categories in meta)
+      float columns    -> float32 (the tree models cast inputs to float32 anyway)
+      int columns      -> smallest int type that fits
+    .npy files are uncompressed so they can be memory-mapped; the narrow
+    dtypes are what keep them small.
+    """
+    out_dir = _table_dir(name, store_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    columns = {}
+
+    for i, col in enumerate(df.columns):
+        s = df[col]
+        fname = f"{i:03d}.npy"
+        info = {"file": fname}
+        if pd.api.types.is_datetime64_any_dtype(s):
+            values = s.to_numpy(dtype="datetime64[ns]")
+            info["kind"] = "datetime"
+        elif pd.api.types.is_bool_dtype(s):
+            values = s.to_numpy(dtype=bool)
+            info["kind"] = "bool"
+        elif pd.api.types.is_integer_dtype(s):
+            values = s.to_numpy()
+            values = values.astype(_int_dtype(values))
+            info["kind"] = "int"
+        elif pd.api.types.is_float_dtype(s):
+            values = s.to_numpy(dtype=np.float32)
+            info["kind"] = "float"
+        else:
+            cat = pd.Categorical(s.astype("string"))
+            codes = cat.codes
+            values = codes.astype(_int_dtype(codes))
+            info["kind"] = "category"
+            info["categories"] = [str(c) for c in cat.categories]
+        np.save(os.path.join(out_dir, fname), np.ascontiguousarray(values))
+        columns[col] = info
+
+    meta = {
+        "name": name,
+        "rows": len(df),
+        "columns": columns,
+        "source": source,
+        "source_sig": _source_sig(source) if source else None,
+    }
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def read_meta(name: str, store_dir: str = STORE_DIR):
+    path = os.path.join(_table_dir(name, store_dir), META_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_table(name: str, columns=None, store_dir: str = STORE_DIR, mmap: bool = True):
+    """
+    Read only `columns` (all if None) from a stored table. With mmap=True the
+    numeric columns are memory-mapped rather than read into memory up front.
+    """
+    meta = read_meta(name, store_dir)
+    if meta is None:
+        raise FileNotFoundError(f"Table '{name}' not found in {store_dir}.")
+    columns = list(meta["columns"]) if columns is None else list(columns)
+    missing = [c for c in columns if c not in meta["columns"]]
+    if missing:
+        raise KeyError(f"Columns not in table '{name}': {missing}")
+
+    data = {}
+    for col in columns:
+        info = meta["columns"][col]
+        values = np.load(os.path.join(_table_dir(name, store_dir), info["file"]), mmap_mode="r" if mmap else None)
+        if info["kind"] == "category":
+            data[col] = pd.Categorical.from_codes(np.asarray(values), categories=info["categories"])
+        else:
+            data[col] = values
+    return pd.DataFrame(data, columns=columns, copy=False)
+
+
+def csv_to_table(csv_path: str, name: str = None, store_dir: str = STORE_DIR):
+    """Convert one processed CSV into the store (Date parsed once, here)."""
+    name = name or os.path.splitext(os.path.basename(csv_path))[0]
+    df = pd.read_csv(csv_path, low_memory=False)
+    if "Date" in df.columns:
+        df["Date"] = pd.to_datetime(df["Date"], dayfirst=name in DAYFIRST_TABLES, errors="coerce")
+    return write_table(df, name, store_dir, source=csv_path)
+
+
+def load_table(name: str, columns=None, processed_dir: str = PROCESSED_DIR, store_dir: str = STORE_DIR):
+    """
+    Projected read used by the training scripts. The store copy is (re)built
+    from data/processed/<name>.csv when it is missing or older than the CSV.
+    """
+    csv_path = os.path.join(processed_dir, f"{name}.csv")
+    meta = read_meta(name, store_dir)
+    if meta is None or (os.path.exists(csv_path) and meta.get("source_sig") != _source_sig(csv_path)):
+        csv_to_table(csv_path, name, store_dir)
+    return read_table(name, columns, store_dir)
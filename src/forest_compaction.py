@@ -0,0 +1,218 @@
+import io
+import os
+
+import numpy as np
+
+from forest_engine import FlatForest
+from timing import median_ms
+
+COMPACT_PATH = os.path.join("outputs", "final_rf_compact.npz")
+REPORT_PATH = os.path.join("outputs", "compaction_report.json")
+
+# Default cap on |compact - original| for any class probability on the reference rows
+MAX_DEVIATION = 0.02
+
+# Tree selection stops halving below this many trees
+MIN_TREES = 25
+
+# Rows used to score candidate trees during selection
+SELECTION_ROWS = 2000
+
+
+def node_depths(arrays: dict):
+    """Depth of every node reachable from a root (-1 for unreachable nodes)."""
+    left, right = arrays["left"], arrays["right"]
+    depth = np.full(len(left), -1, dtype=np.int32)
+    frontier = arrays["roots"].astype(np.int64)
+    d = 0
+    while len(frontier):
+        depth[frontier] = d
+        internal = frontier[left[frontier] != frontier]
+        frontier = np.concatenate([left[internal], right[internal]])
+        d += 1
+    return depth
+
+
+def _renumber(arrays: dict, keep: np.ndarray, roots: np.ndarray):
+    """Drop nodes outside `keep` and remap child/root indices to the survivors."""
+    new_id = (np.cumsum(keep) - 1).astype(np.int32)
+    out = dict(arrays)
+    for k in ["feature", "threshold", "value", "missing_left"]:
+        if k in arrays:
+            out[k] = np.ascontiguousarray(arrays[k][keep])
+    out["left"] = new_id[arrays["left"][keep]]
+    out["right"] = new_id[arrays["right"][keep]]
+    out["roots"] = new_id[roots]
+    out["max_depth"] = np.int32(node_depths(out).max())
+    return out
+
+
+def collapse_subtrees(arrays: dict, tol: float = 0.0):
+    """
+    Turn every split whose two leaves predict the same probabilities (within
+    tol) into a leaf, bottom-up, so whole subtrees that agree become one
+    node. With tol=0 predictions are unchanged; otherwise the new leaf gets
+    the split node's own value (the weighted mean of its children).
+    Unreachable nodes are removed and max_depth is recomputed.
+    """
+    left, right = arrays["left"].copy(), arrays["right"].copy()
+    feature, threshold, value = arrays["feature"].copy(), arrays["threshold"].copy(), arrays["value"].copy()
+    depth = node_depths(arrays)
+    ids = np.arange(len(left), dtype=left.dtype)
+
+    for d in range(depth.max() - 1, -1, -1):
+        nodes = ids[(depth == d) & (left != ids)]
+        l, r = left[nodes], right[nodes]
+        diff = np.abs(value[l] - value[r]).max(axis=1)
+        ok = (left[l] == l) & (left[r] == r) & (diff <= tol)
+        nodes, l, exact = nodes[ok], l[ok], diff[ok] == 0
+        value[nodes[exact]] = value[l[exact]]
+        left[nodes] = nodes
+        right[nodes] = nodes
+        feature[nodes] = 0
+        threshold[nodes] = np.inf
+
+    collapsed = dict(arrays, left=left, right=right, feature=feature, threshold=threshold, value=value)
+    return _renumber(collapsed, node_depths(collapsed) >= 0, arrays["roots"])
+
+
+def leaf_values_only(arrays: dict):
+    """
+    Reorder nodes so all split nodes come first and keep values only for
+    leaves (prediction never reads a split node's value). FlatForest finds
+    a leaf's row as node - leaf_offset. Exact; apply after the steps that
+    need per-tree contiguous nodes or split values.
+    """
+    ids = np.arange(len(arrays["left"]), dtype=np.int32)
+    is_leaf = arrays["left"] == ids
+    order = np.concatenate([ids[~is_leaf], ids[is_leaf]])
+    new_id = np.empty_like(ids)
+    new_id[order] = ids
+    routing = {"missing_left": arrays["missing_left"][order]} if "missing_left" in arrays else {}
+    return dict(
+        arrays,
+        **routing,
+        feature=arrays["feature"][order],
+        threshold=arrays["threshold"][order],
+        left=new_id[arrays["left"][order]],
+        right=new_id[arrays["right"][order]],
+        roots=new_id[arrays["roots"]],
+        value=np.ascontiguousarray(arrays["value"][is_leaf]),
+        leaf_offset=np.int32((~is_leaf).sum()),
+    )
+
+
+def shrink_dtypes(arrays: dict, values: str = None):
+    """
+    Store thresholds as float32 and feature ids in the smallest integer type,
+    and optionally leaf values as `values` (e.g. "float32", "float16").
+
+    Inputs are cast to float32 before the walk, so rounding each threshold
+    *down* to the nearest float32 sends every input the same way as before:
+    this step is exact. Only the leaf value cast changes probabilities.
+    """
+    t = arrays["threshold"]
+    t32 = t.astype(np.float32)
+    up = t32.astype(np.float64) > t
+    t32[up] = np.nextafter(t32[up], np.float32(-np.inf))
+    out = dict(arrays, threshold=t32, feature=arrays["feature"].astype(np.min_scalar_type(arrays["feature"].max())))
+    if values is not None:
+        out["value"] = arrays["value"].astype(values)
+    return out
+
+
+def subset_trees(arrays: dict, trees):
+    """Keep only the given trees (indices into roots)."""
+    roots = arrays["roots"]
+    ends = np.append(roots[1:], len(arrays["left"]))
+    keep = np.zeros(len(arrays["left"]), dtype=bool)
+    for t in trees:
+        keep[roots[t]:ends[t]] = True
+    return _renumber(arrays, keep, roots[np.sort(np.asarray(trees))])
+
+
+def select_trees(arrays: dict, X, n_trees: int):
+    """
+    Greedy forward selection: repeatedly add the tree that brings the
+    subset's average probabilities closest (mean absolute error) to the
+    full forest's on the reference rows X.
+    """
+    forest = FlatForest(arrays)
+    per_tree = forest.value.take(forest.apply(X), axis=0).astype(np.float64)  # (rows, trees, classes)
+    target = per_tree.mean(axis=1)
+    total = np.zeros_like(target)
+    available = np.ones(per_tree.shape[1], dtype=bool)
+    chosen = []
+    for k in range(1, n_trees + 1):
+        err = np.abs((total[:, np.newaxis, :] + per_tree) / k - target[:, np.newaxis, :]).mean(axis=(0, 2))
+        err[~available] = np.inf
+        best = int(np.argmin(err))
+        chosen.append(best)
+        available[best] = False
+        total += per_tree[:, best]
+    return subset_trees(arrays, chosen)
+
+
+def compaction_ladder(arrays: dict, X_select, collapse_tol: float = 0.0, min_trees: int = MIN_TREES):
+    """
+    Cumulative compaction steps, cheapest loss first:
+    (name, arrays) for the exact export, collapsed subtrees, leaf-only
+    values, narrow thresholds/feature ids, float32 then float16 leaf
+    values, then greedy tree selection halving the tree count down to
+    min_trees.
+    """
+    steps = [("exact", arrays)]
+    step = collapse_subtrees(arrays, collapse_tol)
+    steps.append((f"collapse subtrees (tol {collapse_tol:g})", step))
+    steps.append(("leaf values only", leaf_values_only(step)))
+    step = shrink_dtypes(step)
+    steps.append(("float32 thresholds", leaf_values_only(step)))
+    for dtype in ["float32", "float16"]:
+        step = shrink_dtypes(step, values=dtype)
+        steps.append((f"{dtype} leaf values", leaf_values_only(step)))
+
+    if len(X_select) > SELECTION_ROWS:
+        X_select = X_select[np.random.default_rng(0).choice(len(X_select), SELECTION_ROWS, replace=False)]
+    n_trees = len(arrays["roots"]) // 2
+    while n_trees >= min_trees:
+        steps.append((f"{n_trees} trees (greedy)", leaf_values_only(select_trees(step, X_select, n_trees))))
+        n_trees //= 2
+    return steps
+
+
+def evaluate(arrays: dict, X_check, reference):
+    """Size, latency and deviation from `reference` probabilities for one compaction step."""
+    forest = FlatForest(arrays)
+    proba = forest.predict_proba(X_check)
+    diff = np.abs(proba - reference)
+    buf = io.BytesIO()
+    np.savez(buf, **{k: v for k, v in arrays.items() if isinstance(v, np.ndarray)})
+    return {
+        "trees": forest.n_estimators,
+        "nodes": len(forest.feature),
+        "max_depth": forest.max_depth,
+        "memory_bytes": forest.nbytes,
+        "file_bytes": buf.getbuffer().nbytes,
+        "single_ms": median_ms(lambda: forest.predict_proba(X_check[:1]), 200),
+        "batch_ms": median_ms(lambda: forest.predict_proba(X_check[:380]), 20),
+        "max_abs_diff": float(diff.max()),
+        "mean_abs_diff": float(diff.mean()),
+        "argmax_agreement": float((proba.argmax(axis=1) == reference.argmax(axis=1)).mean()),
+    }
+
+
+def choose_step(results: list, budget_bytes: int = None, max_deviation: float = MAX_DEVIATION):
+    """
+    Index of the first step that fits the memory budget without exceeding
+    max_deviation; with no budget, the last exact (lossless) step.
+    Raises ValueError if no step qualifies.
+    """
+    if budget_bytes is None:
+        return max(i for i, r in enumerate(results) if r["max_abs_diff"] == 0.0)
+    for i, r in enumerate(results):
+        if r["memory_bytes"] <= budget_bytes and r["max_abs_diff"] <= max_deviation:
+            return i
+    raise ValueError(
+        f"No compaction step fits {budget_bytes / 1e6:.2f} MB with deviation <= {max_deviation}. "
+        "Raise the budget or --max-deviation."
+    )
@@ -0,0 +1,279 @@
+import json
+import os
+
+import numpy as np
+
+from feature_spec import attach_transform
+
+# Max allowed |flat - sklearn| on predicted probabilities. In practice the
+# engine reproduces sklearn bit-for-bit (same float32 input cast, same
+# leaf values, same sequential tree summation); this is the
+# contract checked by src/12_export_flat_forest.py.
+TOLERANCE = 1e-12
+
+FLAT_PATH = os.path.join("outputs", "final_rf_flat.npz")
+FLAT_ARRAYS = ["feature", "threshold", "left", "right", "value", "roots", "max_depth", "classes", "features", "labels"]
+
+# Rows walked together; keeps the (rows x trees) node matrix cache friendly
+CHUNK_ROWS = 64
+
+
+class StaleExport(ValueError):
+    """An export written before the engine could route missing values; it must be re-exported."""
+
+
+def export_forest(model):
+    """
+    Pack a fitted RandomForestClassifier (or ExtraTreesClassifier) into flat
+    NumPy arrays covering all trees:
+      feature, threshold, left, right  -> one entry per node (all trees concatenated)
+      value                            -> per-node class probabilities
+      roots                            -> index of each tree's root node
+      missing_left                     -> where a NaN goes at each split (sklearn >= 1.3)
+    Leaves point to themselves on both sides with an +inf threshold, so every
+    row can be walked a fixed max_depth steps without branching.
+    """
+    features, thresholds, lefts, rights, values, roots, missing = [], [], [], [], [], [], []
+    offset = 0
+    max_depth = 0
+    n_classes = len(model.classes_)
+
+    for est in model.estimators_:
+        tree = est.tree_
+        n = tree.node_count
+        node_ids = np.arange(n, dtype=np.int32) + offset
+        is_leaf = tree.children_left == -1
+
+        left = np.where(is_leaf, node_ids, tree.children_left + offset).astype(np.int32)
+        right = np.where(is_leaf, node_ids, tree.children_right + offset).astype(np.int32)
+        feature = np.where(is_leaf, 0, tree.feature).astype(np.int32)
+        threshold = np.where(is_leaf, np.inf, tree.threshold)
+        # Splits send NaN where they saw missing values in training, else to the larger child
+        if hasattr(tree, "missing_go_to_left"):
+            missing.append(np.asarray(tree.missing_go_to_left, dtype=bool))
+
+        # sklearn >= 1.4 stores class fractions in tree_.value and returns them
+        # as-is; older versions store weighted counts and normalise per row
+        value = tree.value[:, 0, :n_classes].astype(np.float64)
+        normalizer = value.sum(axis=1)[:, np.newaxis]
+        if np.abs(normalizer - 1.0).max() > 1e-9:
+            normalizer[normalizer == 0.0] = 1.0
+            value = value / normalizer
+
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(left)
+        rights.append(right)
+        values.append(value)
+        roots.append(offset)
+        offset += n
+        max_depth = max(max_depth, tree.max_depth)
+
+    arrays = {
+        "feature": np.concatenate(features),
+        "threshold": np.concatenate(thresholds).astype(np.float64),
+        "left": np.concatenate(lefts),
+        "right": np.concatenate(rights),
+        "value": np.ascontiguousarray(np.concatenate(values)),
+        "roots": np.array(roots, dtype=np.int32),
+        "max_depth": np.int32(max_depth),
+        "classes": np.asarray(model.classes_),
+    }
+    if len(missing) == len(roots):
+        arrays["missing_left"] = np.concatenate(missing)
+    return arrays
+
+
+class FlatForest:
+    """
+    Vectorized traversal over the packed arrays from export_forest().
+    Exposes classes_ and predict_proba() so it can stand in for the sklearn
+    model wherever the bundle's "model" is used for inference.
+
+    Compacted exports (src/forest_compaction.py) may store thresholds as
+    float32, features as uint8 and leaf values as float32/float16; the walk
+    is unchanged and probabilities are still summed in float64. They may
+    also keep values for leaves only, stored after all split nodes:
+    a leaf's values are then value[node - leaf_offset].
+
+    NaN inputs follow each split's missing_left, as in sklearn; exports
+    without it reject NaN, and infinite inputs are rejected as sklearn does.
+    """
+
+    def __init__(self, arrays: dict):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+        self.max_depth = int(arrays["max_depth"])
+        self.leaf_offset = int(arrays.get("leaf_offset", 0))
+        self.classes_ = arrays["classes"]
+        self.n_estimators = len(self.roots)
+        self.missing_right = ~arrays["missing_left"] if "missing_left" in arrays else None
+        # children[2 * node] = left, children[2 * node + 1] = right
+        self.children = np.ascontiguousarray(np.stack([arrays["left"], arrays["right"]], axis=1).ravel())
+
+    @property
+    def nbytes(self):
+        """Memory held by the node arrays."""
+        arrays = [self.feature, self.threshold, self.value, self.roots, self.children, self.missing_right]
+        return sum(a.nbytes for a in arrays if a is not None)
+
+    @classmethod
+    def from_model(cls, model):
+        return cls(export_forest(model))
+
+    def _apply_chunk(self, X):
+        n_rows, n_features = X.shape
+        # Row offsets into X.ravel(), so the feature lookup is one flat take()
+        row_offsets = (np.arange(n_rows, dtype=np.int64) * n_features)[:, np.newaxis]
+        x_flat = X.ravel()
+        node = np.tile(self.roots, (n_rows, 1))
+        # NaN compares False (left) everywhere; only chunks that have one pay for the routing
+        has_nan = np.isnan(x_flat).any()
+
+        for _ in range(self.max_depth):
+            x = x_flat.take(row_offsets + self.feature.take(node))
+            go_right = x > self.threshold.take(node)
+            if has_nan:
+                go_right |= np.isnan(x) & self.missing_right.take(node)
+            node = self.children.take(2 * node + go_right)
+        return node
+
+    def apply(self, X):
+        """Leaf node index for every (row, tree): shape (n_rows, n_trees)."""
+        # sklearn casts inputs to float32 before walking the trees
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if not np.isfinite(X).all():
+            if np.isinf(X).any():
+                raise ValueError("Input contains infinity or a value too large for float32.")
+            if self.missing_right is None:
+                raise ValueError("Input contains NaN, and this export has no missing-value routing; "
+                                 "re-export it with src/12_export_flat_forest.py.")
+        if len(X) <= CHUNK_ROWS:
+            return self._apply_chunk(X)
+        # Chunk rows so the (rows x trees) working set stays cache sized
+        return np.vstack([self._apply_chunk(X[i:i + CHUNK_ROWS]) for i in range(0, len(X), CHUNK_ROWS)])
+
+    def predict_proba(self, X):
+        if hasattr(X, "to_numpy"):
+            X = X.to_numpy()
+        leaves = self.apply(X)
+        if self.leaf_offset:
+            leaves -= self.leaf_offset
+        leaf_values = self.value.take(leaves, axis=0)  # (n_rows, n_trees, n_classes)
+        # cumsum adds trees in order, matching sklearn's sequential accumulation
+        total = np.cumsum(leaf_values, axis=1, dtype=np.float64)[:, -1, :]
+        return total / self.n_estimators
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+def save_flat(path: str, arrays: dict, features, inv_label_map, source: dict = None, max_diff: float = None,
+              feature_spec: dict = None):
+    """
+    Write the packed forest plus the bundle metadata needed for serving,
+    including the feature spec (src/feature_spec.py) it was trained with.
+    source ({"checksum", "size", "mtime_ns"} of the joblib artifact it was
+    exported from) lets loaders tell whether the export is still current;
+    max_diff is the verified deviation from sklearn.
+    """
+    labels = np.array([inv_label_map[int(c)] for c in arrays["classes"]])
+    extra = {}
+    if source is not None:
+        extra["source_checksum"] = np.array(source["checksum"])
+        extra["source_size"] = np.int64(source["size"])
+        extra["source_mtime_ns"] = np.int64(source["mtime_ns"])
+    if max_diff is not None:
+        extra["max_diff"] = np.float64(max_diff)
+    if feature_spec is not None:
+        extra["feature_spec"] = np.array(json.dumps(feature_spec))
+    np.savez(path, features=np.array(features), labels=labels, **arrays, **extra)
+
+
+def flat_source(path: str = FLAT_PATH):
+    """The source stamp stored by save_flat(), or None (missing file or older export). Reads only those entries."""
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            if "source_checksum" not in data.files:
+                return None
+            return {
+                "checksum": str(data["source_checksum"]),
+                "size": int(data["source_size"]),
+                "mtime_ns": int(data["source_mtime_ns"]),
+            }
+    except (OSError, ValueError):
+        return None
+
+
+def validate_flat(arrays: dict):
+    """
+    Cheap structural checks so a truncated, mismatched or stale export is
+    never served. Raises ValueError (StaleExport for exports without
+    missing-value routing).
+    """
+    missing = [k for k in FLAT_ARRAYS if k not in arrays]
+    if missing:
+        raise ValueError(f"Flat forest is missing {missing}.")
+    n = len(arrays["feature"])
+    if any(len(arrays[k]) != n for k in ["threshold", "left", "right"]):
+        raise ValueError("Flat forest node arrays have different lengths.")
+    if len(arrays["value"]) != n - int(arrays.get("leaf_offset", 0)):
+        raise ValueError("Flat forest leaf values do not match its nodes.")
+    if arrays["value"].shape[1:] != (len(arrays["classes"]),) or len(arrays["labels"]) != len(arrays["classes"]):
+        raise ValueError("Flat forest classes do not match its leaf values.")
+    for k in ["left", "right", "roots"]:
+        if len(arrays[k]) and (arrays[k].min() < 0 or arrays[k].max() >= n):
+            raise ValueError(f"Flat forest {k} points outside the node arrays.")
+    if "missing_left" not in arrays:
+        # Such exports would fail on the first NaN input instead of routing it as sklearn does
+        raise StaleExport("Flat forest has no missing-value routing (exported by an older version); "
+                          "re-export it, or retrain the model it came from.")
+    if len(arrays["missing_left"]) != n:
+        raise ValueError("Flat forest missing-value routing does not match its nodes.")
+    if n and (arrays["feature"].min() < 0 or arrays["feature"].max() >= len(arrays["features"])):
+        raise ValueError("Flat forest splits on a feature it does not list.")
+    if not np.isfinite(arrays["value"]).all():
+        raise ValueError("Flat forest has non-finite leaf values.")
+    if "max_diff" in arrays and not float(arrays["max_diff"]) <= TOLERANCE:
+        raise ValueError(f"Flat forest was exported with max deviation {float(arrays['max_diff'])} (tolerance {TOLERANCE}).")
+
+
+def load_flat(path: str = FLAT_PATH):
+    """
+    Load and validate an exported forest. Returns a bundle-like dict with a
+    FlatForest as "model" and "engine" and the compiled feature transform
+    (the same keys compile_bundle sets), so it can be served without
+    unpickling or importing sklearn.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {k: data[k] for k in data.files}
+    validate_flat(arrays)
+    classes = arrays["classes"]
+    inv_label_map = {int(c): str(lbl) for c, lbl in zip(classes, arrays["labels"])}
+    forest = FlatForest(arrays)
+    return attach_transform({
+        "model": forest,
+        "engine": forest,
+        "features": [str(f) for f in arrays["features"]],
+        "feature_spec": json.loads(str(arrays["feature_spec"])) if "feature_spec" in arrays else None,
+        "label_map": {v: k for k, v in inv_label_map.items()},
+        "inv_label_map": inv_label_map,
+    })
+
+
+def compile_bundle(bundle: dict):
+    """
+    Attach a FlatForest for the bundle's model as bundle["engine"] and its
+    compiled feature transform as bundle["transform"].
+    Models that are not tree ensembles (e.g. HistGradientBoosting) are used as-is.
+    """
+    model = bundle["model"]
+    if all(hasattr(e, "tree_") for e in getattr(model, "estimators_", [None])):
+        bundle["engine"] = FlatForest.from_model(model)
+    else:
+        bundle["engine"] = model
+    return attach_transform(bundle)
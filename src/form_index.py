@@ -0,0 +1,287 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from feature_spec import FORM_FEATURES, WINDOW
+
+INDEX_DIR = os.path.join("outputs", "form_index")
+META_FILE = "meta.json"
+# Each team's running FormState after the indexed matches (for update_form_index)
+STATES_FILE = "form_states.json"
+
+ARRAYS = ["dates", "form", "odds", "elo", "is_home", "opponent", "team_start", "latest"]
+
+
+def build_form_index(epl, out_dir: str = INDEX_DIR, source: str = None):
+    """
+    Precompute every team's pre-match form for every match it played, plus
+    its form after its latest match, and save them as flat .npy arrays:
+
+      dates      (n,)           match dates, grouped by team, sorted within team
+      form       (n, 5)         pre-match FORM_FEATURES for that match
+      odds       (n, 3)         B365 odds oriented to the team (Win/Draw/Loss)
+      elo        (n, 2)         pre-match Elo ratings of the team and its opponent
+      is_home    (n,)           1 if the team was at home
+      opponent   (n,)           index into meta["teams"]
+      team_start (n_teams + 1,) row range of each team
+      latest     (n_teams, 5)   form going into the team's *next* match
+
+    Each team's running FormState and the Elo ratings are saved too, so
+    update_form_index() can append new matches without recomputing anyone's
+    history.
+    """
+    # Imported here so serving (FormIndex only) never loads pandas
+    from elo import match_elo
+    from rolling_form import build_form_states, rolling_features
+    from team_perspective import ORIENTED_ODDS_COLS, build_team_perspective
+
+    perspective = build_team_perspective(epl, with_odds=True).reset_index(drop=True)
+    form = rolling_features(perspective, windows=(WINDOW,), ewm_spans=(), season=False)
+    states = build_form_states(perspective, windows=(WINDOW,), ewm_spans=(), season=False)
+    elo_rows, elo = match_elo(epl)
+
+    teams = sorted(perspective["Team"].unique())
+    team_pos = {t: i for i, t in enumerate(teams)}
+    team_codes = perspective["Team"].map(team_pos).to_numpy()
+
+    arrays = {
+        "dates": perspective["Date"].to_numpy(dtype="datetime64[D]"),
+        "form": form[FORM_FEATURES].to_numpy(dtype=np.float64),
+        "odds": perspective[ORIENTED_ODDS_COLS].to_numpy(dtype=np.float64),
+        "elo": _pre_match_elo(perspective, elo_rows),
+        "is_home": perspective["IsHome"].to_numpy(dtype=np.int8),
+        "opponent": perspective["Opponent"].map(team_pos).fillna(-1).to_numpy(dtype=np.int16),
+        "team_start": np.searchsorted(team_codes, np.arange(len(teams) + 1)),
+    }
+    return _save_index(arrays, teams, states, elo, out_dir, source)
+
+
+def _pre_match_elo(perspective, elo_rows):
+    """(n, 2) ratings of each perspective row's team and opponent, from match_elo() rows; NaN if unplayed."""
+    keys = ["Date", "HomeTeam", "AwayTeam"]
+    merged = perspective[keys].merge(elo_rows, on=keys, how="left", validate="many_to_one")
+    home, away = merged["Elo_Home"].to_numpy(dtype=np.float64), merged["Elo_Away"].to_numpy(dtype=np.float64)
+    is_home = perspective["IsHome"].to_numpy() == 1
+    return np.column_stack([np.where(is_home, home, away), np.where(is_home, away, home)])
+
+
+def update_form_index(new_epl, out_dir: str = INDEX_DIR, source: str = None):
+    """
+    Add newly played matches (football-data rows dated on or after the
+    index's last date) to an index built by build_form_index(). Only the
+    new rows' form and Elo are computed, from each team's saved FormState
+    and the saved ratings; existing rows are copied as they are. Gives the same index as a full rebuild.
+    Raises ValueError (or OSError) when the index cannot be extended, e.g.
+    it was built by an older version without saved states.
+    """
+    from elo import EloState, match_elo
+    from rolling_form import FormState
+    from team_perspective import ORIENTED_ODDS_COLS, build_team_perspective
+
+    old = FormIndex(out_dir, mmap=False)
+    states_path = os.path.join(out_dir, STATES_FILE)
+    if not os.path.exists(states_path):
+        raise ValueError(f"Form index at {out_dir} has no saved form states; rebuild it.")
+    with open(states_path) as f:
+        saved = json.load(f)
+    if saved.get("rows") != old.meta["rows"] or "elo" not in saved:
+        raise ValueError(f"Form states at {out_dir} do not match the index; rebuild it.")
+    states = {t: FormState.from_dict(d) for t, d in saved["states"].items()}
+    elo_rows, elo = match_elo(new_epl, EloState.from_dict(saved["elo"]))
+
+    new = build_team_perspective(new_epl, with_odds=True).reset_index(drop=True)
+    new_dates = new["Date"].to_numpy(dtype="datetime64[D]")
+    if old.meta["last_date"] and len(new) and new_dates.min() < np.datetime64(old.meta["last_date"]):
+        raise ValueError("New matches are dated before the end of the form index; rebuild it.")
+
+    # Pre-match form of each new row, in (team, date) order, from the running states
+    form = np.empty((len(new), len(FORM_FEATURES)))
+    for i, (team, target, gf, ga) in enumerate(zip(new["Team"], new["Target"], new["GoalsFor"], new["GoalsAgainst"])):
+        state = states.get(team)
+        if state is None:
+            state = states[team] = FormState(windows=(WINDOW,), ewm_spans=(), season=False)
+        form[i] = [state.features()[f] for f in FORM_FEATURES]
+        state.update(target, gf, ga)
+
+    teams = sorted(set(old.teams) | set(new["Team"]))
+    team_pos = {t: i for i, t in enumerate(teams)}
+    # Old codes -> new codes (promoted teams shift the sorted list); -1 stays -1
+    remap = np.append(np.array([team_pos[t] for t in old.teams], dtype=np.int16), np.int16(-1))
+    old_codes = np.repeat(remap[:-1], np.diff(old.team_start))
+    new_codes = new["Team"].map(team_pos).to_numpy()
+
+    # Old rows first, so a stable sort by team puts each team's new matches after its history
+    codes = np.concatenate([old_codes, new_codes])
+    order = np.argsort(codes, kind="stable")
+    arrays = {
+        "dates": np.concatenate([old.dates, new_dates])[order],
+        "form": np.concatenate([old.form, form])[order],
+        "odds": np.concatenate([old.odds, new[ORIENTED_ODDS_COLS].to_numpy(dtype=np.float64)])[order],
+        "elo": np.concatenate([old.elo, _pre_match_elo(new, elo_rows)])[order],
+        "is_home": np.concatenate([old.is_home, new["IsHome"].to_numpy(dtype=np.int8)])[order],
+        "opponent": np.concatenate([
+            remap[old.opponent], new["Opponent"].map(team_pos).fillna(-1).to_numpy(dtype=np.int16),
+        ])[order],
+        "team_start": np.searchsorted(codes[order], np.arange(len(teams) + 1)),
+    }
+    return _save_index(arrays, teams, states, elo, out_dir, source)
+
+
+def _save_index(arrays: dict, teams, states: dict, elo, out_dir: str, source: str = None):
+    """Write the arrays, the latest form and the running form and Elo states; returns meta."""
+    arrays["latest"] = np.array([[states[t].features()[f] for f in FORM_FEATURES] for t in teams])
+
+    # Each file is written beside the old one and renamed over it, so
+    # processes with the old arrays memory-mapped keep reading them; meta.json
+    # goes last and tells ReloadingFormIndex to reopen
+    os.makedirs(out_dir, exist_ok=True)
+    for name, values in arrays.items():
+        path = os.path.join(out_dir, f"{name}.npy")
+        np.save(path + ".tmp.npy", np.ascontiguousarray(values))
+        os.replace(path + ".tmp.npy", path)
+    rows = len(arrays["dates"])
+    _write_json(os.path.join(out_dir, STATES_FILE),
+                {"rows": rows, "states": {t: states[t].to_dict() for t in teams}, "elo": elo.to_dict()})
+    meta = {
+        "teams": teams,
+        "features": FORM_FEATURES,
+        "rows": rows,
+        "last_date": str(arrays["dates"].max()) if rows else None,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source": source,
+    }
+    _write_json(os.path.join(out_dir, META_FILE), meta)
+    return meta
+
+
+def _write_json(path: str, data: dict):
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+def to_day(date):
+    """Date-like value -> datetime64[D]. ISO strings are parsed by numpy; other formats fall back to pandas."""
+    try:
+        return np.datetime64(date.strip()[:10] if isinstance(date, str) else date, "D")
+    except (TypeError, ValueError):
+        import pandas as pd
+
+        return np.datetime64(pd.Timestamp(date).date(), "D")
+
+
+def lookup_context(results):
+    """
+    FeatureTransform context (src/feature_spec.py) from FormIndex.lookup()
+    results, one per fixture (None where nothing was looked up): form,
+    is_home, odds and elo arrays with NaN where unknown.
+    """
+    n = len(results)
+    context = {"form": np.full((n, len(FORM_FEATURES)), np.nan), "is_home": np.full(n, np.nan),
+               "odds": np.full((n, 3), np.nan), "elo": np.full((n, 2), np.nan)}
+    for i, found in enumerate(results):
+        if found is None:
+            continue
+        context["form"][i] = list(found["form"].values())
+        if found["is_home"] is not None:
+            context["is_home"][i] = found["is_home"]
+        if found["odds"] is not None:
+            context["odds"][i] = found["odds"]
+        if found.get("elo") is not None:
+            context["elo"][i] = found["elo"]
+    return context
+
+
+class FormIndex:
+    """
+    Memory-mapped lookup of a team's form on a given date.
+
+    lookup("Chelsea", "2024-05-19", opponent="Bournemouth") returns the exact
+    pre-match features for a fixture in the data (with its odds, venue and Elo);
+    any other date returns the form going into the team's next match after
+    that date, or its latest form for dates past the end of the data.
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR, mmap: bool = True):
+        with open(os.path.join(index_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        mode = "r" if mmap else None
+        for name in ARRAYS:
+            setattr(self, name, np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode=mode))
+        if len(self.dates) != self.meta["rows"]:
+            raise ValueError(f"Form index at {index_dir} is being rebuilt (arrays and {META_FILE} disagree).")
+        self.teams = self.meta["teams"]
+        self.features = self.meta["features"]
+        self._team_pos = {t.lower(): i for i, t in enumerate(self.teams)}
+
+    def team_id(self, team: str):
+        pos = self._team_pos.get(str(team).strip().lower())
+        if pos is None:
+            raise ValueError(f"Unknown team '{team}'.")
+        return pos
+
+    def lookup(self, team: str, date, opponent: str = None):
+        t = self.team_id(team)
+        start, end = int(self.team_start[t]), int(self.team_start[t + 1])
+        day = to_day(date)
+        i = start + int(np.searchsorted(self.dates[start:end], day))
+
+        if i < end and self.dates[i] == day:
+            opp = self.teams[self.opponent[i]] if self.opponent[i] >= 0 else None
+            if opponent is not None and self.team_id(opponent) != self.opponent[i]:
+                raise ValueError(f"{self.teams[t]} played {opp} on {day}, not {opponent}.")
+            values = self.form[i]
+            result = {
+                "source": "fixture",
+                "opponent": opp,
+                "is_home": int(self.is_home[i]),
+                "odds": None if np.isnan(self.odds[i]).any() else [float(v) for v in self.odds[i]],
+                # The ratings going into that match, as the pipeline's Elo_Team / Elo_Opp
+                "elo": None if np.isnan(self.elo[i]).any() else [float(v) for v in self.elo[i]],
+            }
+        else:
+            values = self.form[i] if i < end else self.latest[t]
+            result = {"source": "as_of" if i < end else "latest", "opponent": opponent, "is_home": None, "odds": None,
+                      "elo": None}
+
+        if np.isnan(values).any():
+            raise ValueError(f"Not enough match history for {self.teams[t]} before {day}.")
+        result["form"] = {f: float(v) for f, v in zip(self.features, values)}
+        return result
+
+
+class ReloadingFormIndex:
+    """
+    The form index for long-running processes (web app, prediction daemon):
+    reopened within check_interval seconds of a rebuild (meta.json is
+    rewritten last), and picked up if it is first built after startup.
+    """
+
+    def __init__(self, index_dir: str = INDEX_DIR, check_interval: float = 2.0):
+        self.index_dir = index_dir
+        self.check_interval = check_interval
+        self._index = None
+        self._stat = None
+        self._last_check = 0.0
+
+    def current(self):
+        """The latest FormIndex, or None if it has not been built."""
+        now = time.monotonic()
+        if self._index is not None and now - self._last_check < self.check_interval:
+            return self._index
+        self._last_check = now
+        meta_path = os.path.join(self.index_dir, META_FILE)
+        if not os.path.exists(meta_path):
+            self._index = self._stat = None
+            return None
+        st = os.stat(meta_path)
+        stat_key = (st.st_mtime_ns, st.st_size)
+        if stat_key != self._stat:
+            try:
+                self._index, self._stat = FormIndex(self.index_dir), stat_key
+            except (OSError, ValueError):
+                # Caught mid-rebuild: keep serving the old index, retry next check
+                pass
+        return self._index
@@ -0,0 +1,138 @@
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+CHUNK_ROWS = 5000
+
+# Declared raw columns -> dtype. Everything else in a football-data file
+# (over/under and Asian-handicap markets, referee, ...) is never parsed.
+TEXT = "string"
+GOALS = "Int16"
+ODDS = "float64"  # float32 would turn quoted prices like 2.1 into 2.0999999
+
+MATCH_COLUMNS = {
+    "Div": TEXT, "Date": TEXT, "Time": TEXT,
+    "HomeTeam": TEXT, "AwayTeam": TEXT,
+    "FTHG": GOALS, "FTAG": GOALS, "FTR": TEXT,
+    "HTHG": GOALS, "HTAG": GOALS, "HTR": TEXT,
+    "HS": GOALS, "AS": GOALS, "HST": GOALS, "AST": GOALS,
+    "HF": GOALS, "AF": GOALS, "HC": GOALS, "AC": GOALS,
+    "HY": GOALS, "AY": GOALS, "HR": GOALS, "AR": GOALS,
+}
+
+# 1X2 prices: pre-match and closing ("C") for each bookmaker plus market max/avg
+BOOKMAKERS = ["B365", "BW", "IW", "PS", "WH", "VC", "Max", "Avg"]
+ODDS_COLUMNS = {
+    f"{book}{closing}{side}": ODDS
+    for closing in ["", "C"]
+    for book in BOOKMAKERS
+    for side in "HDA"
+}
+
+RAW_SCHEMA = {**MATCH_COLUMNS, **ODDS_COLUMNS}
+
+# Column names that changed between football-data seasons / file families
+ALIASES = {
+    # Betbrain max/avg (seasons up to 2018-19) -> market max/avg
+    "BbMxH": "MaxH", "BbMxD": "MaxD", "BbMxA": "MaxA",
+    "BbAvH": "AvgH", "BbAvD": "AvgD", "BbAvA": "AvgA",
+    # "new league" files
+    "Home": "HomeTeam", "Away": "AwayTeam",
+    "HG": "FTHG", "AG": "FTAG", "Res": "FTR",
+    "PH": "PSH", "PD": "PSD", "PA": "PSA",
+}
+
+OUTPUT_COLUMNS = list(RAW_SCHEMA) + ["SeasonTag"]
+
+
+def canonical(col: str):
+    col = str(col).strip().lstrip("\ufeff")
+    return ALIASES.get(col, col)
+
+
+def parse_match_dates(dates: pd.Series):
+    """football-data dates are day-first: dd/mm/yyyy, or dd/mm/yy in older files."""
+    parsed = pd.to_datetime(dates, format="%d/%m/%Y", errors="coerce")
+    retry = parsed.isna() & dates.notna()
+    if retry.any():
+        parsed[retry] = pd.to_datetime(dates[retry], format="%d/%m/%y", errors="coerce")
+    return parsed
+
+
+def _reconcile(chunk: pd.DataFrame, season_tag: str):
+    """Rename aliases, add missing declared columns, fix dtypes and column order."""
+    chunk = chunk.rename(columns=canonical)
+    chunk = chunk.loc[:, ~chunk.columns.duplicated()]
+    chunk = chunk.dropna(subset=["HomeTeam", "AwayTeam"], how="any")  # blank trailing rows
+    chunk = chunk.reindex(columns=list(RAW_SCHEMA))
+    chunk = chunk.astype(RAW_SCHEMA)
+
+    # Normalise to 4-digit day-first dates (what downstream dayfirst parsing expects)
+    chunk["Date"] = parse_match_dates(chunk["Date"]).dt.strftime("%d/%m/%Y").astype(TEXT)
+    chunk["SeasonTag"] = season_tag
+    return chunk
+
+
+def iter_raw_chunks(fp: str, chunk_rows: int = CHUNK_ROWS):
+    """Stream one raw file in chunks, parsing only declared columns with explicit dtypes."""
+    season_tag = os.path.splitext(os.path.basename(fp))[0]  # e.g., E0_1819
+    dtypes = {raw: RAW_SCHEMA[c] for raw, c in ALIASES.items() if c in RAW_SCHEMA}
+    dtypes.update(RAW_SCHEMA)
+    reader = pd.read_csv(
+        fp,
+        usecols=lambda c: canonical(c) in RAW_SCHEMA,
+        dtype={c: ("float32" if t == GOALS else t) for c, t in dtypes.items()},
+        chunksize=chunk_rows,
+        encoding="utf-8-sig",
+        encoding_errors="replace",
+    )
+    for chunk in reader:
+        yield _reconcile(chunk, season_tag)
+
+
+def read_raw_file(fp: str):
+    """Whole file as one reconciled frame (raw files are one season, so this is small)."""
+    chunks = list(iter_raw_chunks(fp))
+    if not chunks:
+        return pd.DataFrame({c: pd.Series(dtype=RAW_SCHEMA.get(c, TEXT)) for c in OUTPUT_COLUMNS})
+    return pd.concat(chunks, ignore_index=True)
+
+
+def _ingest_one(args):
+    fp, part_path, chunk_rows = args
+    rows = 0
+    with open(part_path, "w", newline="") as f:
+        for chunk in iter_raw_chunks(fp, chunk_rows):
+            chunk.to_csv(f, header=False, index=False)
+            rows += len(chunk)
+    return rows
+
+
+def ingest_raw(files, out_path: str, workers: int = None, chunk_rows: int = CHUNK_ROWS):
+    """
+    Stream every raw file into one combined CSV with a fixed schema.
+    Files are parsed in parallel into part files, then concatenated in file
+    order, so memory stays at one chunk per worker however many seasons or
+    divisions are added. Returns rows written per file.
+    """
+    workers = workers or min(len(files), os.cpu_count() or 1)
+    tmp_dir = tempfile.mkdtemp(prefix="ingest_", dir=os.path.dirname(out_path) or ".")
+    try:
+        jobs = [(fp, os.path.join(tmp_dir, f"{i:05d}.csv"), chunk_rows) for i, fp in enumerate(files)]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                counts = list(pool.map(_ingest_one, jobs))
+        else:
+            counts = [_ingest_one(job) for job in jobs]
+
+        with open(out_path, "w", newline="") as out:
+            out.write(",".join(OUTPUT_COLUMNS) + "\n")
+            for _, part_path, _ in jobs:
+                with open(part_path) as part:
+                    shutil.copyfileobj(part, out)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return dict(zip(files, counts))
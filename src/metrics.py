@@ -0,0 +1,271 @@
+import atexit
+import bisect
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _server_pid():
+    """
+    pid of the gunicorn master when this process is one of its workers
+    (importing the app after the fork, i.e. without --preload), else our
+    own pid: the master itself with --preload, or a single process. Needs
+    /proc to recognise the master; elsewhere set METRICS_DIR unless --preload.
+    """
+    try:
+        with open(f"/proc/{os.getppid()}/cmdline", "rb") as f:
+            parent = f.read()
+    except OSError:
+        return os.getpid()
+    return os.getppid() if b"gunicorn" in parent else os.getpid()
+
+
+# Shared by every worker of one server. Set METRICS_DIR to choose it (and
+# clear it when the server starts); by default each server gets its own
+# directory named after its gunicorn master (see _server_pid), so workers
+# share it with or without --preload.
+METRICS_DIR = os.environ.get("METRICS_DIR") or os.path.join(
+    tempfile.gettempdir(), "chelsea_metrics", str(_server_pid())
+)
+
+# How often (seconds) a worker writes its counters for the others to read
+FLUSH_INTERVAL = 1.0
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+
+# Histograms that count things rather than time them
+BUCKETS = {
+    "chelsea_batch_rows": COUNT_BUCKETS,
+    "chelsea_batch_requests": COUNT_BUCKETS,
+    "chelsea_batch_queue_depth": COUNT_BUCKETS,
+}
+
+HELP = {
+    "chelsea_requests_total": ("counter", "Requests handled, by endpoint and HTTP status."),
+    "chelsea_request_phase_seconds": ("histogram", "Time spent per request phase (parse, featurize, inference, render, total)."),
+    "chelsea_predictions_total": ("counter", "Predictions served, by predicted class and confidence bucket."),
+    "chelsea_errors_total": ("counter", "Request errors, by endpoint and exception type."),
+    "chelsea_model_loads_total": ("counter", "Model artifact load events, by result (loaded, unchanged, error)."),
+    "chelsea_prediction_cache_total": ("counter", "Prediction cache events (hit, miss, eviction, invalidation)."),
+    "chelsea_model_load_seconds": ("histogram", "Time to load and compile the model artifact."),
+    "chelsea_team_model_loads_total": ("counter", "Team model loads, by result (loaded, error)."),
+    "chelsea_team_model_cache_total": ("counter", "Team model cache events (hit, eviction)."),
+    "chelsea_team_model_load_seconds": ("histogram", "Time to load a team model on its first request."),
+    "chelsea_batch_rows": ("histogram", "Feature rows per coalesced model call (micro-batching)."),
+    "chelsea_batch_requests": ("histogram", "Requests per coalesced model call (micro-batching)."),
+    "chelsea_batch_queue_depth": ("histogram", "Requests waiting for the model, seen by each new request."),
+    "chelsea_batch_wait_seconds": ("histogram", "Time a request waited for its batch to be scored."),
+}
+
+
+def _buckets(name):
+    return BUCKETS.get(name, LATENCY_BUCKETS)
+
+
+def _key(name, labels):
+    return (name, tuple(sorted(labels.items()))) if labels else (name, ())
+
+
+def _dump_key(key):
+    return json.dumps([key[0], [list(kv) for kv in key[1]]])
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _format_value(v):
+    return "+Inf" if v == math.inf else repr(float(v))
+
+
+class Metrics:
+    """
+    Counters and histograms for one process, aggregated across processes
+    through small JSON files (one per pid) in a shared directory.
+
+    Recording is an in-memory dict update under a lock. Each process writes
+    its file at most every FLUSH_INTERVAL seconds (a background thread
+    catches up once the worker goes idle, and again at exit), and
+    render() sums every process's file, so /metrics served by any gunicorn
+    worker reports totals for the whole server. Files of exited workers are
+    kept, so counters never go backwards.
+    """
+
+    def __init__(self, directory: str = METRICS_DIR, flush_interval: float = FLUSH_INTERVAL, enabled: bool = True):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._reset()
+        os.register_at_fork(after_in_child=self._reset)
+        atexit.register(self.flush)
+
+    def _reset(self):
+        # A forked worker starts empty: whatever the parent recorded is in the parent's file
+        self._pid = os.getpid()
+        self._counters = {}
+        self._histograms = {}
+        self._last_flush = 0.0
+        self._dirty = False
+        self._flusher = None
+        self._lock = threading.Lock()
+
+    # --- recording ---
+
+    def inc(self, name: str, value: float = 1.0, **labels):
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+            self._dirty = True
+        self._maybe_flush()
+
+    def observe(self, name: str, value: float, **labels):
+        """Record one value (seconds, or a count for the histograms in BUCKETS)."""
+        if not self.enabled:
+            return
+        key = _key(name, labels)
+        buckets = _buckets(name)
+        with self._lock:
+            h = self._histograms.get(key)
+            if h is None:
+                h = self._histograms[key] = [[0] * len(buckets), 0.0, 0]
+            i = bisect.bisect_left(buckets, value)
+            if i < len(buckets):
+                h[0][i] += 1
+            h[1] += value
+            h[2] += 1
+            self._dirty = True
+        self._maybe_flush()
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    # --- sharing across processes ---
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"{pid}.json")
+
+    def _maybe_flush(self):
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        elif self._flusher is None:
+            # Writes the tail of a burst once the worker goes idle
+            self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        pid = self._pid
+        while pid == os.getpid():
+            time.sleep(self.flush_interval)
+            if self._dirty:
+                self.flush()
+
+    def flush(self):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._last_flush = time.monotonic()
+            self._dirty = False
+            if not self._counters and not self._histograms:
+                return
+            data = json.dumps({
+                "counters": {_dump_key(k): v for k, v in self._counters.items()},
+                "histograms": {_dump_key(k): v for k, v in self._histograms.items()},
+            })
+        os.makedirs(self.directory, exist_ok=True)
+        tmp = self._path(f"{self._pid}.tmp")
+        with open(tmp, "w") as f:
+            f.write(data)
+        os.replace(tmp, self._path(self._pid))  # readers never see a half-written file
+
+    def _collect(self):
+        self.flush()
+        counters, histograms = {}, {}
+        names = os.listdir(self.directory) if os.path.isdir(self.directory) else []
+        for fname in names:
+            if not fname.endswith(".json") or fname.endswith(".tmp.json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, fname)) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for key, v in data["counters"].items():
+                counters[key] = counters.get(key, 0.0) + v
+            for key, (buckets, total, count) in data["histograms"].items():
+                h = histograms.setdefault(key, [[0] * len(buckets), 0.0, 0])
+                h[0] = [a + b for a, b in zip(h[0], buckets)]
+                h[1] += total
+                h[2] += count
+        return counters, histograms
+
+    def render(self):
+        """All processes' metrics in the Prometheus text exposition format."""
+        counters, histograms = self._collect()
+        series = {}
+        for key, v in sorted(counters.items()):
+            name, labels = json.loads(key)
+            series.setdefault(name, []).append(f"{name}{_format_labels(labels)} {_format_value(v)}")
+        for key, (buckets, total, count) in sorted(histograms.items()):
+            name, labels = json.loads(key)
+            lines = series.setdefault(name, [])
+            cumulative = 0
+            for bound, n in zip(_buckets(name) + (math.inf,), buckets + [count - sum(buckets)]):
+                cumulative += n
+                le = labels + [["le", _format_value(bound)]]
+                lines.append(f"{name}_bucket{_format_labels(le)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        out = []
+        for name in sorted(series):
+            kind, text = HELP.get(name, ("untyped", name))
+            out += [f"# HELP {name} {text}", f"# TYPE {name} {kind}"] + series[name]
+        return "\n".join(out) + "\n"
+
+
+class RequestTimer:
+    """
+    Per-request phase timing: `with timer.phase("parse"): ...` for each phase,
+    then finish(status) records every phase plus the total.
+    """
+
+    def __init__(self, metrics: Metrics, endpoint: str):
+        self.metrics = metrics
+        self.endpoint = endpoint
+        self.start = time.perf_counter()
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - t0
+
+    def finish(self, status: int):
+        m = self.metrics
+        for name, seconds in self.phases.items():
+            m.observe("chelsea_request_phase_seconds", seconds, endpoint=self.endpoint, phase=name)
+        m.observe("chelsea_request_phase_seconds", time.perf_counter() - self.start,
+                  endpoint=self.endpoint, phase="total")
+        m.inc("chelsea_requests_total", endpoint=self.endpoint, status=status)
@@ -0,0 +1,97 @@
+import io
+import json
+import os
+import platform
+import resource
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+
+from backtest import class_proba, probabilistic_scores
+from forest_engine import FlatForest, export_forest
+from timing import median_ms
+
+REPORT_PATH = os.path.join("outputs", "model_comparison.json")
+
+SINGLE_ROW_CALLS = 200
+LARGE_BATCH_ROWS = 10000
+
+
+def _rss_mb():
+    """Peak resident set size of this process so far (ru_maxrss is KiB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if platform.system() == "Darwin" else peak / 1024
+
+
+def evaluate_model(name, model, X_train, y_train, X_test, y_test):
+    """
+    Fit one model and measure what it costs to train, store and serve.
+    Runs in its own worker process so peak RSS is the model's alone.
+    """
+    rss_start = _rss_mb()
+    t0 = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - t0
+
+    proba = class_proba(model, X_test)
+    row = X_test[:1]
+    large = np.resize(X_test, (LARGE_BATCH_ROWS, X_test.shape[1]))
+
+    buf = io.BytesIO()
+    joblib.dump(model, buf)
+
+    result = {
+        "model": name,
+        "estimator": type(model).__name__,
+        "params": {k: v for k, v in model.get_params().items() if np.isscalar(v) or v is None},
+        "fit_seconds": fit_seconds,
+        "predict_single_ms": median_ms(lambda: model.predict_proba(row), SINGLE_ROW_CALLS),
+        "predict_batch_ms": median_ms(lambda: model.predict_proba(X_test), 20),
+        "predict_10k_ms": median_ms(lambda: model.predict_proba(large), 3),
+        "artifact_bytes": buf.getbuffer().nbytes,
+        **probabilistic_scores(y_test, proba),
+    }
+
+    # Tree ensembles can also be served by the flat engine (src/forest_engine.py)
+    if hasattr(model, "estimators_") and hasattr(model.estimators_[0], "tree_"):
+        engine = FlatForest(export_forest(model))
+        result["engine_single_ms"] = median_ms(lambda: engine.predict_proba(row), SINGLE_ROW_CALLS)
+        result["engine_batch_ms"] = median_ms(lambda: engine.predict_proba(X_test), 20)
+
+    result["peak_rss_mb"] = _rss_mb()
+    result["fit_rss_mb"] = result["peak_rss_mb"] - rss_start
+    return result, proba
+
+
+def compare_models(models: dict, X_train, y_train, X_test, y_test, workers: int = None):
+    """
+    Train every candidate concurrently, one fresh process per model, and
+    return ({name: metrics}, {name: test probabilities}) in `models` order.
+    """
+    X_train, X_test = (np.ascontiguousarray(np.asarray(a, dtype=np.float32)) for a in (X_train, X_test))
+    y_train, y_test = np.asarray(y_train), np.asarray(y_test)
+    workers = workers or min(len(models), os.cpu_count() or 1)
+
+    # max_tasks_per_child=1: a new process per model, so peak RSS is not shared
+    with ProcessPoolExecutor(max_workers=workers, max_tasks_per_child=1) as pool:
+        futures = {
+            name: pool.submit(evaluate_model, name, model, X_train, y_train, X_test, y_test)
+            for name, model in models.items()
+        }
+        done = {name: f.result() for name, f in futures.items()}
+    return {name: r[0] for name, r in done.items()}, {name: r[1] for name, r in done.items()}
+
+
+def write_report(results: dict, path: str = REPORT_PATH, **context):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "cpu_count": os.cpu_count(),
+        **context,
+        "models": list(results.values()),
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    return report
@@ -0,0 +1,201 @@
+import hashlib
+import os
+import threading
+import time
+import warnings
+
+from forest_engine import FLAT_PATH, compile_bundle, flat_source, load_flat
+
+MODEL_PATH = os.path.join("outputs", "final_rf_model.joblib")
+
+# How often (seconds) a request is allowed to stat() the artifact for changes
+CHECK_INTERVAL = 2.0
+
+
+def file_checksum(path: str):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def artifact_checksum(path: str = MODEL_PATH, flat_path: str = FLAT_PATH):
+    """
+    (sha256 of the joblib artifact, whether flat_path is an export of it).
+    When the export's recorded size and mtime match the artifact, the
+    recorded checksum is used and the artifact is not read at all.
+    """
+    source = flat_source(flat_path) if flat_path else None
+    st = os.stat(path)
+    if source is not None and (source["size"], source["mtime_ns"]) == (st.st_size, st.st_mtime_ns):
+        return source["checksum"], True
+    checksum = file_checksum(path)
+    return checksum, source is not None and source["checksum"] == checksum
+
+
+def read_bundle(path: str = MODEL_PATH, flat_path: str = None):
+    """
+    Returns (bundle, artifact). Given a current flat export (see
+    artifact_checksum) it is loaded with NumPy alone, without unpickling or
+    importing sklearn; otherwise the joblib artifact is unpickled and compiled.
+    """
+    if flat_path is not None:
+        try:
+            return load_flat(flat_path), "flat"
+        except (OSError, ValueError, KeyError) as e:
+            warnings.warn(f"Ignoring {flat_path} ({e}); loading {path} instead.")
+    import joblib
+
+    return compile_bundle(joblib.load(path)), "joblib"
+
+
+def load_bundle(path: str = MODEL_PATH, flat_path: str = FLAT_PATH):
+    """One-shot load for the CLIs: (bundle, checksum, artifact)."""
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Model not found at {path}. Run src/08_train_and_save_final_model.py first.")
+    checksum, flat_current = artifact_checksum(path, flat_path)
+    bundle, artifact = read_bundle(path, flat_path if flat_current else None)
+    return bundle, checksum, artifact
+
+
+def format_startup(report: dict):
+    """One line from a cold-start report (import / model load / first prediction seconds)."""
+    parts = [f"{label} {report[key] * 1000:.1f} ms" for key, label in [
+        ("import_seconds", "imports"), ("model_load_seconds", "model load"),
+        ("first_prediction_seconds", "first prediction"),
+    ] if report.get(key) is not None]
+    artifact = f" ({report['artifact']} artifact)" if report.get("artifact") else ""
+    return "Startup: " + ", ".join(parts) + artifact
+
+
+class ModelRegistry:
+    """
+    Holds one loaded model bundle per process and hot-swaps it when the
+    artifact on disk changes.
+
+    The current bundle is stored as a single dict and replaced with one
+    assignment, so a request that already called get() keeps using the bundle
+    it was handed while new requests see the new one. Only one thread reloads
+    at a time; the others keep serving the old bundle meanwhile.
+
+    Loading at import time (see web/app.py) means gunicorn --preload loads the
+    forest once in the master and forked workers share it copy-on-write.
+    The flat export from src/12_export_flat_forest.py is loaded instead of
+    the joblib file whenever it was made from the current artifact, which
+    keeps sklearn out of the serving process (pass flat_path=None to always
+    unpickle).
+
+    on_load, if given, is called as on_load(result, seconds) for every load
+    attempt, with result "loaded", "unchanged" or "error" (for metrics).
+    """
+
+    def __init__(self, path: str = MODEL_PATH, check_interval: float = CHECK_INTERVAL, on_load=None,
+                 flat_path: str = FLAT_PATH):
+        self.path = path
+        self.flat_path = flat_path
+        self.on_load = on_load
+        self.check_interval = check_interval
+        self._current = None
+        self._stat = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.load_count = 0
+        self.last_error = None
+
+    def _stat_key(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def load(self):
+        """Load the artifact from disk and swap it in. Returns the new entry."""
+        t0 = time.perf_counter()
+        try:
+            entry, result = self._load()
+        except Exception:
+            self._notify("error", time.perf_counter() - t0)
+            raise
+        self._notify(result, time.perf_counter() - t0)
+        return entry
+
+    def _notify(self, result, seconds):
+        if self.on_load is not None:
+            self.on_load(result, seconds)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError("Model not found. Run src/08_train_and_save_final_model.py first.")
+
+        stat_key = self._stat_key()
+        checksum, flat_current = artifact_checksum(self.path, self.flat_path)
+        current = self._current
+        if current is not None and current["checksum"] == checksum:
+            # Touched but unchanged: keep the loaded trees
+            self._stat = stat_key
+            return current, "unchanged"
+
+        t0 = time.perf_counter()
+        bundle, artifact = read_bundle(self.path, self.flat_path if flat_current else None)
+        entry = {
+            "bundle": bundle,
+            "artifact": artifact,
+            "checksum": checksum,
+            "version": checksum[:12],
+            "loaded_at": time.time(),
+            "load_seconds": time.perf_counter() - t0,
+        }
+        self._current = entry
+        self._stat = stat_key
+        self.load_count += 1
+        self.last_error = None
+        return entry, "loaded"
+
+    def _maybe_reload(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return
+        # Non-blocking: if another thread is already checking, serve what we have
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._last_check = now
+            try:
+                if self._stat_key() != self._stat:
+                    self.load()
+            except Exception as e:
+                # Artifact missing or half-written: keep the last good model
+                self.last_error = str(e)
+        finally:
+            self._lock.release()
+
+    def entry(self):
+        """Return the current entry (bundle + version info), loading it on first use."""
+        if self._current is None:
+            with self._lock:
+                if self._current is None:
+                    self.load()
+                    self._last_check = time.monotonic()
+        else:
+            self._maybe_reload()
+        return self._current
+
+    def get(self):
+        """Return the current model bundle."""
+        return self.entry()["bundle"]
+
+    def info(self):
+        current = self._current
+        if current is None:
+            return {"loaded": False, "path": self.path, "last_error": self.last_error}
+        return {
+            "loaded": True,
+            "path": self.path,
+            "version": current["version"],
+            "artifact": current["artifact"],
+            "checksum": current["checksum"],
+            "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(current["loaded_at"])),
+            "load_seconds": round(current["load_seconds"], 4),
+            "load_count": self.load_count,
+            "pid": os.getpid(),
+            "last_error": self.last_error,
+        }
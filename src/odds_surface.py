@@ -0,0 +1,113 @@
+import math
+
+import numpy as np
+
+from feature_spec import RAW_FIELDS
+
+OUTCOMES = ["win", "draw", "loss"]
+ODDS_COLUMNS = [RAW_FIELDS.index(f"odds_{o}") for o in OUTCOMES]
+
+# Points per outcome for a {"min", "max"} range without "steps"
+STEPS = 50
+
+# Largest grid scored in one request (e.g. 100 x 100)
+MAX_POINTS = 10000
+
+# Grid rows per forest pass: bounds the (rows, trees, classes) leaf array
+CHUNK_ROWS = 1024
+
+
+def axis_values(spec):
+    """
+    Odds for one outcome from a list, a single number, or a range
+    {"min": 1.5, "max": 6.0, "steps": 50} (evenly spaced, STEPS by default).
+    """
+    if isinstance(spec, dict):
+        if "min" not in spec or "max" not in spec:
+            raise ValueError("An odds range needs min and max.")
+        lo, hi, steps = float(spec["min"]), float(spec["max"]), int(spec.get("steps", STEPS))
+        if steps < 1 or hi < lo:
+            raise ValueError("An odds range needs min <= max and at least 1 step.")
+        # Checked before allocating: odds_grid() only sees the finished axes
+        if steps > MAX_POINTS:
+            raise ValueError(f"An odds range can have at most {MAX_POINTS} steps.")
+        values = np.linspace(lo, hi, steps)
+    else:
+        if isinstance(spec, (list, tuple)) and len(spec) > MAX_POINTS:
+            raise ValueError(f"An odds list can have at most {MAX_POINTS} values.")
+        values = np.atleast_1d(np.asarray(spec, dtype=np.float64))
+        if values.ndim != 1 or not len(values):
+            raise ValueError("Odds must be a number, a list of numbers or a {min, max, steps} range.")
+    if not np.isfinite(values).all() or (values <= 1.0).any():
+        raise ValueError("Decimal odds must be greater than 1.")
+    return values
+
+
+def parse_axis(text: str):
+    """CLI form of axis_values(): "1.2:6:50" (min:max[:steps]) or "3.2,3.4,3.6"."""
+    if ":" in text:
+        lo, hi, *steps = text.split(":")
+        return {"min": float(lo), "max": float(hi), "steps": int(steps[0]) if steps else STEPS}
+    return [float(v) for v in text.split(",")]
+
+
+def odds_grid(axes: dict, base):
+    """
+    Every combination of the swept odds. axes maps outcomes ("win", "draw",
+    "loss") to axis_values() specs; the others keep the fixture's odds from
+    `base` (win, draw, loss; NaN where unknown). Returns (grid (n, 3),
+    {outcome: values} in OUTCOMES order, grid shape).
+    """
+    unknown = [o for o in axes if o not in OUTCOMES]
+    if unknown:
+        raise ValueError(f"Unknown outcome(s) {unknown}; use win, draw and loss.")
+    if not axes:
+        raise ValueError("Give a range or list of odds for at least one of win, draw and loss.")
+    values = {o: axis_values(axes[o]) for o in OUTCOMES if o in axes}
+    shape = tuple(len(v) for v in values.values())
+    if math.prod(shape) > MAX_POINTS:
+        raise ValueError(f"The grid has {math.prod(shape)} points; the limit is {MAX_POINTS}.")
+
+    mesh = dict(zip(values, np.meshgrid(*values.values(), indexing="ij")))
+    grid = np.empty((math.prod(shape), len(OUTCOMES)))
+    for j, o in enumerate(OUTCOMES):
+        grid[:, j] = mesh[o].ravel() if o in mesh else base[j]
+    return grid, values, shape
+
+
+def score_surface(bundle: dict, raw: np.ndarray, axes: dict):
+    """
+    Probability surface for one fixture. raw is the fixture's resolved raw
+    fields (bundle["transform"].raw(), one row); the grid replaces its odds
+    row by row, goes through the transform once and through the forest in
+    a few large batches. Returns {"axes", "fixed", "labels", "proba"}, proba
+    having the grid's shape plus one axis of class probabilities.
+    """
+    grid, values, shape = odds_grid(axes, raw[0, ODDS_COLUMNS])
+    rows = np.repeat(raw[:1], len(grid), axis=0)
+    rows[:, ODDS_COLUMNS] = grid
+    X = bundle["transform"].from_raw(rows)
+
+    engine = bundle["engine"]
+    proba = np.concatenate([engine.predict_proba(X[i:i + CHUNK_ROWS]) for i in range(0, len(X), CHUNK_ROWS)])
+    labels = [bundle["inv_label_map"][c] for c in engine.classes_]
+    return {
+        "axes": values,
+        "fixed": {o: float(grid[0, j]) for j, o in enumerate(OUTCOMES) if o not in values},
+        "labels": labels,
+        "proba": proba.reshape(*shape, len(labels)),
+    }
+
+
+def surface_json(surface: dict, decimals: int = 4):
+    """JSON-ready surface: nested lists indexed like the axes, one per class, plus the predicted class."""
+    proba, labels = surface["proba"], surface["labels"]
+    best = np.array(labels)[proba.argmax(axis=-1)]
+    return {
+        "axes": {o: [round(float(v), 4) for v in values] for o, values in surface["axes"].items()},
+        "fixed": surface["fixed"],
+        "shape": list(proba.shape[:-1]),
+        "points": int(proba[..., 0].size),
+        "probabilities": {label: np.round(proba[..., j], decimals).tolist() for j, label in enumerate(labels)},
+        "prediction": best.tolist(),
+    }
@@ -0,0 +1,397 @@
+import glob
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from bookmaker_odds import BOOKS, CLOSING_BOOK, CONSENSUS_COLS, MARKET_AVG, MARKET_MAX, consensus_odds, orient
+from elo import ELO_PATH, EloState, elo_features, match_elo
+from feature_spec import ELO_FEATURES, MARKET_FEATURES, ODDS_FEATURES, market_features
+from form_index import INDEX_DIR, build_form_index, update_form_index
+from ingest import read_raw_file
+from rolling_form import POINTS_MAP, FormState, rolling_features
+from team_perspective import build_team_perspective, team_matches
+
+RAW_DIR = os.path.join("data", "raw")
+PROCESSED_DIR = os.path.join("data", "processed")
+RAW_GLOB = "E0*.csv"  # matches E0_*.csv and similar
+
+# Processed outputs, in pipeline order (01, 02, 03, 06, 09)
+OUTPUT_FILES = {
+    "epl": "epl_all_seasons.csv",
+    "matches": "chelsea_matches.csv",
+    "features": "chelsea_features.csv",
+    "odds": "chelsea_features_odds.csv",
+    "odds_plus": "chelsea_features_odds_plus.csv",
+}
+STATE_FILE = "pipeline_state.json"
+ELO_FILE = os.path.basename(ELO_PATH)  # current ratings, for the web app
+
+TEAM = "Chelsea"
+WINDOW = 5  # last 5 matches
+ODDS_COLS = ["B365H", "B365D", "B365A"]
+
+MATCH_COLS = [
+    "Date", "SeasonTag", "HomeTeam", "AwayTeam", "Opponent",
+    "IsHome", "FTHG", "FTAG", "ChelseaGoals", "OppGoals", "FTR", "Target"
+]
+
+
+# ---------------------------------------------------------------------------
+# Pipeline steps (shared by the numbered scripts and the incremental updater)
+# ---------------------------------------------------------------------------
+
+def read_processed(path: str, **kwargs):
+    """
+    Read a processed CSV back exactly. to_csv writes the shortest repr of
+    each float, but pandas' default parser can be 1 ulp off on long
+    decimals (the Elo columns), which would make scripts 01-09 drift from
+    full_build.
+    """
+    return pd.read_csv(path, float_precision="round_trip", **kwargs)
+
+
+def raw_files(raw_dir: str = RAW_DIR):
+    return sorted(glob.glob(os.path.join(raw_dir, RAW_GLOB)))
+
+
+def load_raw(files):
+    """01: combine raw season files into one frame."""
+    return pd.concat([read_raw_file(fp) for fp in files], ignore_index=True)
+
+
+def build_team_matches(epl: pd.DataFrame, team: str = TEAM, elo: pd.DataFrame = None):
+    """
+    02: one team's matches in chronological order, from that team's
+    perspective, with pre-match Elo ratings. `elo` is match_elo() output
+    covering these matches; by default every match in `epl` is rated.
+    """
+    matches = team_matches(build_team_perspective(epl), team)
+    # Downstream scripts use the Chelsea-named goal columns
+    matches = matches.rename(columns={"GoalsFor": "ChelseaGoals", "GoalsAgainst": "OppGoals"})
+    keep_cols = [c for c in MATCH_COLS if c in matches.columns]
+    if elo is None:
+        elo, _ = match_elo(epl)
+    return add_elo_features(matches[keep_cols].reset_index(drop=True), elo)
+
+
+def add_elo_features(matches: pd.DataFrame, elo: pd.DataFrame):
+    """ELO_FEATURES from the team's side, from match_elo() rows (matched on date and teams)."""
+    df = matches.merge(elo, on=["Date", "HomeTeam", "AwayTeam"], how="left", validate="many_to_one")
+    is_home = df["IsHome"].to_numpy() == 1
+    team = np.where(is_home, df["Elo_Home"], df["Elo_Away"])
+    opponent = np.where(is_home, df["Elo_Away"], df["Elo_Home"])
+    df[ELO_FEATURES] = elo_features(team, opponent, is_home)
+    return df.drop(columns=["Elo_Home", "Elo_Away"])
+
+
+def add_rolling_form(matches: pd.DataFrame, window: int = WINDOW):
+    """03: rolling form over the previous `window` matches (shifted to avoid leakage)."""
+    df = matches.sort_values("Date").reset_index(drop=True)
+    df["Points"] = df["Target"].map(POINTS_MAP)
+
+    form = rolling_features(
+        df, windows=(window,), ewm_spans=(), season=False, group=None,
+        goals_for="ChelseaGoals", goals_against="OppGoals",
+    )
+    df = pd.concat([df, form], axis=1)
+
+    # Remove rows without enough history
+    return df.dropna().reset_index(drop=True)
+
+
+def _form_state():
+    """Running form for the incremental updater (same window as add_rolling_form)."""
+    return FormState(windows=(WINDOW,), ewm_spans=(), season=False)
+
+
+def add_rolling_form_incremental(new_matches: pd.DataFrame, form: FormState):
+    """
+    03 for newly added matches only: features come from the running FormState
+    (O(1) per match) instead of re-rolling the history. Updates `form` in place.
+    """
+    df = new_matches.sort_values("Date").reset_index(drop=True)
+    df["Points"] = df["Target"].map(POINTS_MAP)
+
+    rows = []
+    for target, gf, ga in zip(df["Target"], df["ChelseaGoals"], df["OppGoals"]):
+        rows.append(form.features())
+        form.update(target, gf, ga)
+    df = pd.concat([df, pd.DataFrame(rows, index=df.index)], axis=1)
+    return df.dropna().reset_index(drop=True)
+
+
+def add_odds_features(features: pd.DataFrame, epl: pd.DataFrame, team: str = TEAM):
+    """
+    06: merge B365 odds and orient them to the team's perspective, plus the
+    consensus across every bookmaker in the raw files (see bookmaker_odds).
+    """
+    epl = epl.copy()
+    epl["Date"] = pd.to_datetime(epl["Date"], dayfirst=True, errors="coerce")
+    features = features.copy()
+    features["Date"] = pd.to_datetime(features["Date"], errors="coerce")
+
+    epl_team = epl[(epl["HomeTeam"] == team) | (epl["AwayTeam"] == team)]
+
+    available_odds = [c for c in ODDS_COLS if c in epl_team.columns]
+    if len(available_odds) < len(ODDS_COLS):
+        raise ValueError("Betting odds columns not found in EPL dataset.")
+
+    books = BOOKS + [MARKET_AVG, MARKET_MAX, CLOSING_BOOK]
+    book_cols = [c for c in epl_team.columns if c[:-1] in books and c[-1] in "HDA" and c not in ODDS_COLS]
+    odds = epl_team[["Date", "HomeTeam", "AwayTeam"] + available_odds + book_cols]
+    df = features.merge(odds, on=["Date", "HomeTeam", "AwayTeam"], how="left")
+
+    is_home = df["IsHome"].to_numpy() == 1
+    oriented = orient(df[ODDS_COLS].to_numpy(), is_home)
+    for i, c in enumerate(["Odds_Win", "Odds_Draw", "Odds_Loss"]):
+        df[c] = oriented[:, i]
+    consensus = consensus_odds(df, is_home)
+    return pd.concat([df.drop(columns=book_cols), consensus[CONSENSUS_COLS]], axis=1)
+
+
+def add_implied_probs(df: pd.DataFrame):
+    """09: margin-free implied probabilities, overround and log odds (same formulas as serving)."""
+    df = df.copy()
+    for c in ODDS_FEATURES:
+        df[c] = pd.to_numeric(df[c], errors="coerce")
+
+    df = df.dropna(subset=ODDS_FEATURES).copy()
+    df[MARKET_FEATURES] = market_features(df[ODDS_FEATURES].to_numpy(dtype=float))
+    return df
+
+
+# ---------------------------------------------------------------------------
+# Full and incremental builds
+# ---------------------------------------------------------------------------
+
+def _paths(out_dir: str):
+    return {k: os.path.join(out_dir, v) for k, v in OUTPUT_FILES.items()}
+
+
+def _file_sig(path: str):
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def _rows_hash(df: pd.DataFrame):
+    return str(int(pd.util.hash_pandas_object(df, index=False).sum() & 0xFFFFFFFFFFFF))
+
+
+def _align(new: pd.DataFrame, columns, dtypes):
+    """Match the column order and dtypes of the existing CSV so appended rows format identically."""
+    new = new.reindex(columns=columns)
+    for c in columns:
+        want = dtypes.get(c)
+        if want and str(new[c].dtype) != want:
+            try:
+                new[c] = new[c].astype(want)
+            except (TypeError, ValueError):
+                pass
+    return new
+
+
+def _raw_state(file_info):
+    return {
+        os.path.basename(fp): {"rows": n_rows, "hash": rows_hash, "sig": _file_sig(fp)}
+        for fp, n_rows, rows_hash in file_info
+    }
+
+
+def _replay_form(matches: pd.DataFrame):
+    form = _form_state()
+    for target, gf, ga in zip(matches["Target"], matches["ChelseaGoals"], matches["OppGoals"]):
+        form.update(target, gf, ga)
+    return form
+
+
+def _save_state(out_dir, state):
+    with open(os.path.join(out_dir, STATE_FILE), "w") as f:
+        json.dump(state, f, indent=2, default=int)
+
+
+def _rebuild_form_index(paths, index_dir):
+    """Rebuild the serving form index from the written epl CSV, as src/16_build_form_index.py does."""
+    if index_dir is not None:
+        build_form_index(read_processed(paths["epl"], low_memory=False), index_dir, source=paths["epl"])
+
+
+def _update_form_index(paths, new_epl: pd.DataFrame, index_dir):
+    """Add the new matches to the form index from its saved per-team state; rebuild it if that is not possible."""
+    if index_dir is None:
+        return
+    try:
+        update_form_index(new_epl, index_dir, source=paths["epl"])
+    except (OSError, ValueError, KeyError) as e:
+        print("Rebuilding the form index:", e)
+        _rebuild_form_index(paths, index_dir)
+
+
+def full_build(raw_dir: str = RAW_DIR, out_dir: str = PROCESSED_DIR, team: str = TEAM, index_dir: str = INDEX_DIR):
+    """
+    Rebuild every processed CSV from the raw files and reset the incremental
+    state. The form index is rebuilt in index_dir (None to leave it alone).
+    """
+    files = raw_files(raw_dir)
+    if not files:
+        raise FileNotFoundError(f"No EPL CSV files found in {raw_dir}. Expected pattern: {RAW_GLOB}")
+
+    parts = [read_raw_file(fp) for fp in files]
+    epl = pd.concat(parts, ignore_index=True)
+    elo_rows, elo = match_elo(epl)
+    matches = build_team_matches(epl, team, elo_rows)
+    features = add_rolling_form(matches)
+    odds = add_odds_features(features, epl, team)
+    odds_plus = add_implied_probs(odds)
+
+    frames = {"epl": epl, "matches": matches, "features": features, "odds": odds, "odds_plus": odds_plus}
+    paths = _paths(out_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    for k, frame in frames.items():
+        frame.to_csv(paths[k], index=False)
+    elo.save(os.path.join(out_dir, ELO_FILE))
+    _rebuild_form_index(paths, index_dir)
+
+    file_info = [(fp, len(p), _rows_hash(p)) for fp, p in zip(files, parts)]
+    _save_state(out_dir, {
+        "team": team,
+        "raw_files": _raw_state(file_info),
+        "last_date": matches["Date"].max().strftime("%Y-%m-%d") if len(matches) else None,
+        "form": _replay_form(matches).to_dict(),
+        "elo": elo.to_dict(),
+        "outputs": {
+            k: {
+                "columns": list(frame.columns),
+                "dtypes": {c: str(t) for c, t in frame.dtypes.items()},
+                "sig": _file_sig(paths[k]),
+            }
+            for k, frame in frames.items()
+        },
+    })
+    return {k: len(v) for k, v in frames.items()}
+
+
+def incremental_update(raw_dir: str = RAW_DIR, out_dir: str = PROCESSED_DIR, team: str = TEAM,
+                       index_dir: str = INDEX_DIR):
+    """
+    Append only matches added to the raw files since the last run, and add
+    them to the form index in index_dir (None to leave it alone) so serving
+    picks up the new form.
+
+    Returns (mode, counts) where mode is "incremental", "up-to-date" or
+    "full" (a full rebuild was needed: no state yet, processed files edited
+    since the last run, rows changed/removed in a raw file, new columns, or
+    new matches dated before already-processed ones).
+    """
+    state_path = os.path.join(out_dir, STATE_FILE)
+    paths = _paths(out_dir)
+
+    def fallback(reason):
+        print("Full rebuild:", reason)
+        return "full", full_build(raw_dir, out_dir, team, index_dir)
+
+    if not os.path.exists(state_path):
+        return fallback("no previous state")
+    with open(state_path) as f:
+        state = json.load(f)
+    if state.get("team") != team:
+        return fallback("team changed")
+    if "form" not in state or "elo" not in state:
+        return fallback("state written by an older version")
+    for k in OUTPUT_FILES:
+        if not os.path.exists(paths[k]) or _file_sig(paths[k]) != state["outputs"][k]["sig"]:
+            return fallback(f"{OUTPUT_FILES[k]} changed since the last run")
+
+    # --- Find new raw rows (unchanged files are skipped without reading) ---
+    new_parts = []
+    file_info = []
+    for fp in raw_files(raw_dir):
+        name = os.path.basename(fp)
+        seen = state["raw_files"].get(name)
+        if seen and _file_sig(fp) == seen["sig"]:
+            file_info.append((fp, seen["rows"], seen["hash"]))
+            continue
+
+        df = read_raw_file(fp)
+        n_old = seen["rows"] if seen else 0
+        if len(df) < n_old or (n_old and _rows_hash(df.iloc[:n_old]) != seen["hash"]):
+            return fallback(f"previously processed rows changed in {name}")
+        if len(df) > n_old:
+            new_parts.append(df.iloc[n_old:])
+        file_info.append((fp, len(df), _rows_hash(df)))
+
+    if len(file_info) < len(state["raw_files"]):
+        return fallback("raw file removed")
+
+    outputs = state["outputs"]
+    counts = {k: 0 for k in OUTPUT_FILES}
+    new_epl = pd.concat(new_parts, ignore_index=True) if new_parts else None
+
+    if new_epl is not None:
+        extra = [c for c in new_epl.columns if c not in outputs["epl"]["columns"]]
+        if extra:
+            return fallback(f"new raw columns {extra[:5]}")
+
+        # Ratings carry on from the saved state: O(1) per new match
+        elo = EloState.from_dict(state["elo"])
+        new_dates = pd.to_datetime(new_epl["Date"], dayfirst=True, errors="coerce")
+        if elo.last_date and new_dates.min() < pd.Timestamp(elo.last_date):
+            return fallback("new matches are dated before already rated ones")
+        elo_rows, elo = match_elo(new_epl, elo)
+
+        new_matches = build_team_matches(new_epl, team, elo_rows)
+        if len(new_matches) and state["last_date"] and new_matches["Date"].min() <= pd.Timestamp(state["last_date"]):
+            return fallback("new matches are dated before already processed ones")
+
+        # Rolling form from the saved per-team running state
+        form = FormState.from_dict(state["form"])
+        new_features = add_rolling_form_incremental(new_matches, form)
+        new_odds = add_odds_features(new_features, new_epl, team)
+        new_odds_plus = add_implied_probs(new_odds)
+
+        new_frames = {
+            "epl": new_epl, "matches": new_matches, "features": new_features,
+            "odds": new_odds, "odds_plus": new_odds_plus,
+        }
+        for k, frame in new_frames.items():
+            if len(frame):
+                aligned = _align(frame, outputs[k]["columns"], outputs[k]["dtypes"])
+                aligned.to_csv(paths[k], mode="a", header=False, index=False)
+            counts[k] = len(frame)
+
+        if len(new_matches):
+            state["last_date"] = new_matches["Date"].max().strftime("%Y-%m-%d")
+        state["form"] = form.to_dict()
+        state["elo"] = elo.to_dict()
+        elo.save(os.path.join(out_dir, ELO_FILE))
+        _update_form_index(paths, new_epl, index_dir)
+
+    # --- Save state ---
+    state["raw_files"] = _raw_state(file_info)
+    for k in OUTPUT_FILES:
+        outputs[k]["sig"] = _file_sig(paths[k])
+    _save_state(out_dir, state)
+
+    return ("incremental" if new_epl is not None else "up-to-date"), counts
+
+
+def compare_outputs(dir_a: str, dir_b: str):
+    """
+    Compare processed CSVs in two directories. epl_all_seasons is compared as
+    a set of rows (appends keep arrival order, full builds keep file order);
+    the team files must match row for row. Returns a list of differences.
+    """
+    problems = []
+    for k, name in OUTPUT_FILES.items():
+        a = pd.read_csv(os.path.join(dir_a, name), low_memory=False)
+        b = pd.read_csv(os.path.join(dir_b, name), low_memory=False)
+        if k == "epl":
+            keys = ["Date", "HomeTeam", "AwayTeam"]
+            a = a.sort_values(keys, kind="stable").reset_index(drop=True)
+            b = b.sort_values(keys, kind="stable").reset_index(drop=True)
+        try:
+            pd.testing.assert_frame_equal(a, b, check_exact=True)
+        except AssertionError as e:
+            problems.append(f"{name}: {str(e).splitlines()[0]}")
+    return problems
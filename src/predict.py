@@ -1,10 +1,18 @@
+import time
+
+_import_start = time.perf_counter()
+
 import argparse
-import joblib
-import os
-import numpy as np
-import pandas as pd
 
-MODEL_PATH = os.path.join("outputs", "final_rf_model.joblib")
+# Standard library only, so a call answered by the daemon never loads numpy or the model
+from predict_daemon import try_predict
+
+# Cold-start timings, printed with --timing
+startup = {"import_seconds": time.perf_counter() - _import_start}
+
+FORM_ARGS = ["formpoints_5", "goalsfor_5", "goalsagainst_5", "goaldiff_5", "winrate_5"]
+# Arguments that describe the fixture (the /api/predict field names)
+FIXTURE_ARGS = ["is_home", "odds_win", "odds_draw", "odds_loss"] + FORM_ARGS + ["date", "opponent"]
 
 def compute_form_features(last5: str):
     """
@@ -28,12 +36,68 @@ def compute_form_features(last5: str):
 
     return form_points, goals_for, goals_against, goal_diff, win_rate
 
+def print_prediction(label: str, proba_dict: dict):
+    print("\nPrediction:", label)
+    print("Probabilities:", {k: round(v, 3) for k, v in proba_dict.items()})
+
+
+def predict_with_daemon(fixture: dict, args):
+    """Ask the prediction daemon (src/predict_daemon.py); False if it is not running."""
+    t0 = time.perf_counter()
+    reply = try_predict([fixture])
+    if reply is None:
+        return False
+    if "error" in reply:
+        raise ValueError(reply["error"])
+    p = reply["predictions"][0]
+    if "form_source" in p:
+        print(f"Form looked up for {args.date} ({p['form_source']}).")
+    print_prediction(p["prediction"], p["probabilities"])
+    if args.timing:
+        print(f"\nStartup: imports {startup['import_seconds'] * 1000:.1f} ms, "
+              f"daemon round trip {(time.perf_counter() - t0) * 1000:.1f} ms (model {reply['model_version']})")
+    return True
+
+
+def predict_locally(fixture: dict, args):
+    t0 = time.perf_counter()
+    from model_registry import format_startup
+    from predict_service import SLOW_START_NOTE, Predictor
+    startup["import_seconds"] += time.perf_counter() - t0
+
+    # Model, form lookup for --date and the raw fixture (src/predict_service.py)
+    resolved = Predictor().resolve(fixture)
+    entry, found = resolved["entry"], resolved["found"]
+    startup["model_load_seconds"], startup["artifact"] = entry["load_seconds"], entry["artifact"]
+    if entry["artifact"] != "flat":
+        print(SLOW_START_NOTE)
+    if found is not None:
+        print(f"Form looked up for {args.date} ({found['source']}).")
+
+    # The bundle's transform turns the raw fixture into the model's columns
+    bundle = entry["bundle"]
+    model = bundle["engine"]
+    X = bundle["transform"].from_raw(resolved["raw"])
+
+    t0 = time.perf_counter()
+    proba = model.predict_proba(X)[0]
+    startup["first_prediction_seconds"] = time.perf_counter() - t0
+
+    # Model classes correspond to encoded labels 0/1/2
+    # Map them to Loss/Draw/Win
+    labels = [bundle["inv_label_map"][c] for c in model.classes_]
+    proba_dict = {labels[i]: float(proba[i]) for i in range(len(labels))}
+
+    print_prediction(labels[int(proba.argmax())], proba_dict)
+    if args.timing:
+        print("\n" + format_startup(startup))
+
 def main():
     parser = argparse.ArgumentParser(description="Chelsea match outcome predictor (RF + odds + form)")
-    parser.add_argument("--is_home", type=int, choices=[0, 1], required=True, help="1 if Chelsea is home, else 0")
-    parser.add_argument("--odds_win", type=float, required=True, help="Decimal odds for Chelsea Win")
-    parser.add_argument("--odds_draw", type=float, required=True, help="Decimal odds for Draw")
-    parser.add_argument("--odds_loss", type=float, required=True, help="Decimal odds for Chelsea Loss")
+    parser.add_argument("--is_home", type=int, choices=[0, 1], help="1 if Chelsea is home, else 0 (optional with --date for past fixtures)")
+    parser.add_argument("--odds_win", type=float, help="Decimal odds for Chelsea Win")
+    parser.add_argument("--odds_draw", type=float, help="Decimal odds for Draw")
+    parser.add_argument("--odds_loss", type=float, help="Decimal odds for Chelsea Loss")
 
     # Option A: Provide form features directly (best/most accurate)
     parser.add_argument("--formpoints_5", type=float, help="Rolling points last 5 (0-15)")
@@ -45,53 +109,26 @@ def main():
     # Option B: Quick fallback using last5 W/D/L only (goals default to 0)
     parser.add_argument("--last5", type=str, help='Last 5 results like "W,W,D,L,W" (goals default to 0)')
 
-    args = parser.parse_args()
+    # Option C: name the fixture; form comes from the precomputed index (src/16_build_form_index.py)
+    parser.add_argument("--date", type=str, help="Fixture date YYYY-MM-DD (form looked up, no scorelines needed)")
+    parser.add_argument("--opponent", type=str, help="Opponent name, checked against the data for past fixtures")
 
-    if not os.path.exists(MODEL_PATH):
-        raise FileNotFoundError(f"Model not found at {MODEL_PATH}. Run src/08_train_and_save_final_model.py first.")
-
-    bundle = joblib.load(MODEL_PATH)
-    model = bundle["model"]
-    FEATURES = bundle["features"]
-    inv_label_map = bundle["inv_label_map"]
-
-    # Build features
-    if all(v is not None for v in [args.formpoints_5, args.goalsfor_5, args.goalsagainst_5, args.goaldiff_5, args.winrate_5]):
-        formpoints_5 = args.formpoints_5
-        goalsfor_5 = args.goalsfor_5
-        goalsagainst_5 = args.goalsagainst_5
-        goaldiff_5 = args.goaldiff_5
-        winrate_5 = args.winrate_5
-    elif args.last5:
-        formpoints_5, goalsfor_5, goalsagainst_5, goaldiff_5, winrate_5 = compute_form_features(args.last5)
-        print("Note: last5 mode used; GoalsFor_5 and GoalsAgainst_5 default to 0. For best accuracy, pass goals features.")
-    else:
-        raise ValueError("Provide either the 5 form feature args OR --last5.")
-
-    row = {
-        "IsHome": args.is_home,
-        "FormPoints_5": formpoints_5,
-        "GoalsFor_5": goalsfor_5,
-        "GoalsAgainst_5": goalsagainst_5,
-        "GoalDiff_5": goaldiff_5,
-        "WinRate_5": winrate_5,
-        "Odds_Win": args.odds_win,
-        "Odds_Draw": args.odds_draw,
-        "Odds_Loss": args.odds_loss,
-    }
-
-    X = pd.DataFrame([row])[FEATURES]
-
-    pred_class = int(model.predict(X)[0])
-    proba = model.predict_proba(X)[0]
+    parser.add_argument("--no-daemon", action="store_true", help="Load the model here even if src/predict_daemon.py is running")
+    parser.add_argument("--timing", action="store_true", help="Print import, model load and prediction times")
 
-    # Model classes correspond to encoded labels 0/1/2
-    # Map them to Loss/Draw/Win
-    labels = [inv_label_map[c] for c in model.classes_]
-    proba_dict = {labels[i]: float(proba[i]) for i in range(len(labels))}
+    args = parser.parse_args()
 
-    print("\nPrediction:", inv_label_map[pred_class])
-    print("Probabilities:", {k: round(v, 3) for k, v in proba_dict.items()})
+    # The raw fixture, as the web app receives it
+    fixture = {k: getattr(args, k) for k in FIXTURE_ARGS if getattr(args, k) is not None}
+    if not all(k in fixture for k in FORM_ARGS):
+        if args.last5:
+            fixture.update(zip(FORM_ARGS, compute_form_features(args.last5)))
+            print("Note: last5 mode used; GoalsFor_5 and GoalsAgainst_5 default to 0. For best accuracy, pass goals features.")
+        elif not args.date:
+            raise ValueError("Provide either the 5 form feature args, --last5 OR --date.")
+
+    if args.no_daemon or not predict_with_daemon(fixture, args):
+        predict_locally(fixture, args)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
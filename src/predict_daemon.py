@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import socket
+import time
+
+# Only the standard library at the top: clients (src/predict.py and
+# src/predict_plus.py) start in milliseconds; serve() imports the model code
+SOCKET_PATH = os.environ.get("PREDICT_SOCKET") or os.path.join("outputs", "predict.sock")
+
+# Seconds a client waits for a reply
+TIMEOUT = 30.0
+
+
+def request(payload: dict, path: str = SOCKET_PATH, timeout: float = TIMEOUT):
+    """Send one request and return the reply. Raises OSError if no daemon is listening."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(timeout)
+        s.connect(path)
+        s.sendall(json.dumps(payload).encode() + b"\n")
+        with s.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("The prediction daemon closed the connection.")
+    return json.loads(line)
+
+
+def try_predict(fixtures, inputs: bool = False, path: str = SOCKET_PATH):
+    """The daemon's reply for these fixtures, or None if it is not running."""
+    if not os.path.exists(path):
+        return None
+    try:
+        return request({"fixtures": fixtures, "inputs": inputs}, path)
+    except (ConnectionRefusedError, FileNotFoundError):
+        # Stale socket file from a daemon that did not shut down cleanly
+        return None
+
+
+def serve(path: str = SOCKET_PATH):
+    """
+    Keep the model and form index warm and answer predictions on a Unix
+    socket until a shutdown request (or Ctrl-C).
+
+    One JSON object per line each way. {"fixtures": [...]} (the
+    /api/predict format, Chelsea's model) returns {"model_version",
+    "predictions": [...]} or {"error", "index"}; add "inputs": true to get
+    each fixture's feature values back. {"command": "status"} and
+    {"command": "shutdown"} do what they say.
+    """
+    import socketserver
+    import threading
+
+    from feature_spec import FeatureError
+    from predict_service import Predictor
+
+    if os.path.exists(path):
+        try:
+            request({"command": "status"}, path, timeout=2.0)
+        except OSError:
+            os.unlink(path)
+        else:
+            raise RuntimeError(f"A prediction daemon is already listening on {path}.")
+
+    predictor = Predictor()
+    t0 = time.perf_counter()
+    predictor.registry.entry()
+    load_seconds = time.perf_counter() - t0
+    started = time.time()
+    stats = {"requests": 0, "fixtures": 0, "errors": 0}
+    stats_lock = threading.Lock()
+
+    def predict(payload):
+        fixtures = payload.get("fixtures")
+        if not isinstance(fixtures, list) or not fixtures or not all(isinstance(f, dict) for f in fixtures):
+            return {"error": "Send a list of fixture objects."}
+        try:
+            result = predictor.predict(fixtures)
+        except FeatureError as e:
+            return {"error": str(e), "index": e.index}
+        except (KeyError, TypeError, ValueError, FileNotFoundError) as e:
+            return {"error": str(e)}
+        labels, proba = result["labels"], result["proba"]
+        predictions = []
+        for k, p in enumerate(proba):
+            prediction = {
+                "prediction": labels[int(p.argmax())],
+                "probabilities": {labels[j]: float(p[j]) for j in range(len(labels))},
+            }
+            if result["found"][k] is not None:
+                prediction["form_source"] = result["found"][k]["source"]
+            if payload.get("inputs"):
+                prediction["inputs"] = dict(zip(result["features"], result["X"][k].tolist()))
+            predictions.append(prediction)
+        with stats_lock:
+            stats["fixtures"] += len(fixtures)
+        return {"model_version": result["version"], "predictions": predictions}
+
+    def status():
+        with stats_lock:
+            counts = dict(stats)
+        return {"pid": os.getpid(), "socket": path, "uptime_seconds": round(time.time() - started, 1),
+                "model_load_seconds": round(load_seconds, 4), "model": predictor.registry.info(), **counts}
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            # A client may send several requests on one connection
+            for line in self.rfile:
+                try:
+                    payload = json.loads(line)
+                    command = payload.get("command") if isinstance(payload, dict) else None
+                    if command == "status":
+                        reply = status()
+                    elif command == "shutdown":
+                        reply = {"stopping": True}
+                        threading.Thread(target=server.shutdown, daemon=True).start()
+                    elif isinstance(payload, dict):
+                        reply = predict(payload)
+                    else:
+                        reply = {"error": "Send a JSON object."}
+                except json.JSONDecodeError as e:
+                    reply = {"error": f"Invalid JSON: {e}"}
+                with stats_lock:
+                    stats["requests"] += 1
+                    stats["errors"] += "error" in reply
+                self.wfile.write(json.dumps(reply).encode() + b"\n")
+                self.wfile.flush()
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    server.daemon_threads = True
+    print(f"Prediction daemon listening on {path} (pid {os.getpid()}, model loaded in {load_seconds * 1000:.1f} ms)",
+          flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.unlink(path)
+    print("Prediction daemon stopped.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Keep the model warm and serve predictions over a Unix socket")
+    parser.add_argument("--socket", default=SOCKET_PATH, help="Socket path (default: $PREDICT_SOCKET or outputs/predict.sock)")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--status", action="store_true", help="Show the running daemon's status")
+    group.add_argument("--stop", action="store_true", help="Stop the running daemon")
+    args = parser.parse_args()
+
+    if args.status or args.stop:
+        try:
+            reply = request({"command": "shutdown" if args.stop else "status"}, args.socket)
+        except OSError:
+            raise SystemExit(f"No prediction daemon listening on {args.socket}.")
+        print(json.dumps(reply, indent=2))
+        return
+    serve(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,156 @@
+import time
+
+_import_start = time.perf_counter()
+
 import argparse
-import joblib
-import os
-import re
-import pandas as pd
-
-MODEL_PATH = os.path.join("outputs", "final_rf_model.joblib")
-
-def parse_scorelines(scorelines: str):
-    """
-    scorelines example:
-      "2-1, 0-0, 1-2, 3-0, 1-1"
-    Interpreted from Chelsea perspective (ChelseaGoals-OppGoals) for each match.
-    Returns rolling features for last 5:
-      FormPoints_5, GoalsFor_5, GoalsAgainst_5, GoalDiff_5, WinRate_5
-    """
-    parts = [p.strip() for p in scorelines.split(",") if p.strip()]
-    if len(parts) != 5:
-        raise ValueError("Provide exactly 5 scorelines separated by commas, e.g. '2-1,0-0,1-2,3-0,1-1'.")
-
-    gf = ga = wins = points = 0
-    for s in parts:
-        m = re.fullmatch(r"(\d+)\s*-\s*(\d+)", s)
-        if not m:
-            raise ValueError(f"Invalid scoreline '{s}'. Use format like 2-1.")
-        chelsea_g = int(m.group(1))
-        opp_g = int(m.group(2))
-
-        gf += chelsea_g
-        ga += opp_g
-
-        if chelsea_g > opp_g:
-            points += 3
-            wins += 1
-        elif chelsea_g == opp_g:
-            points += 1
-        else:
-            points += 0
-
-    goal_diff = gf - ga
-    win_rate = wins / 5.0
-    return float(points), float(gf), float(ga), float(goal_diff), float(win_rate)
+import json
+
+# Standard library only, so a call answered by the daemon never loads numpy or the model
+from predict_daemon import try_predict
+
+# Cold-start timings, printed with --timing
+startup = {"import_seconds": time.perf_counter() - _import_start}
+
+FORM_ARGS = ["formpoints_5", "goalsfor_5", "goalsagainst_5", "goaldiff_5", "winrate_5"]
+# Arguments that describe the fixture (the /api/predict field names)
+FIXTURE_ARGS = ["is_home", "odds_win", "odds_draw", "odds_loss"] + FORM_ARGS + ["last5_scores", "date", "opponent"]
+
+
+def print_prediction(row: dict, label: str, proba_dict: dict):
+    print("\nINPUTS USED:")
+    for k, v in row.items():
+        print(f"  {k}: {v}")
+
+    print("\nPREDICTION:", label)
+    print("PROBABILITIES:", {k: round(v, 3) for k, v in proba_dict.items()})
+
+
+def predict_with_daemon(fixture: dict, args):
+    """Ask the prediction daemon (src/predict_daemon.py); False if it is not running."""
+    t0 = time.perf_counter()
+    reply = try_predict([fixture], inputs=True)
+    if reply is None:
+        return False
+    if "error" in reply:
+        raise ValueError(reply["error"])
+    p = reply["predictions"][0]
+    if "form_source" in p:
+        print(f"Form looked up for {args.date} ({p['form_source']}).")
+    print_prediction(p["inputs"], p["prediction"], p["probabilities"])
+    if args.timing:
+        print(f"\nStartup: imports {startup['import_seconds'] * 1000:.1f} ms, "
+              f"daemon round trip {(time.perf_counter() - t0) * 1000:.1f} ms (model {reply['model_version']})")
+    return True
+
+
+def parse_sweeps(sweeps):
+    """--sweep win=1.2:6:50 --sweep loss=2,3,4 -> {"win": {...}, "loss": [...]}"""
+    from odds_surface import parse_axis
+
+    axes = {}
+    for sweep in sweeps:
+        outcome, _, spec = sweep.partition("=")
+        if not spec:
+            raise ValueError(f"--sweep {sweep}: use OUTCOME=MIN:MAX[:STEPS] or OUTCOME=ODDS,ODDS,...")
+        axes[outcome.strip().lower()] = parse_axis(spec)
+    return axes
+
+
+def print_surface(surface: dict):
+    """A table for one swept outcome, a map of the predicted result for two."""
+    import numpy as np
+
+    axes, proba, labels = surface["axes"], surface["proba"], surface["labels"]
+    if surface["fixed"]:
+        print("\nFIXED ODDS:", surface["fixed"])
+    best = proba.argmax(axis=-1)
+    if len(axes) == 1:
+        (outcome, values), = axes.items()
+        print(f"\n{'odds_' + outcome:>10}" + "".join(f"{label:>8}" for label in labels) + "  prediction")
+        for value, p, b in zip(values, proba, best):
+            print(f"{value:>10.2f}" + "".join(f"{v:>8.3f}" for v in p) + f"  {labels[b]}")
+    elif len(axes) == 2:
+        (rows, row_values), (cols, col_values) = axes.items()
+        print(f"\nPREDICTION MAP: rows odds_{rows} {row_values[0]:.2f} -> {row_values[-1]:.2f}, "
+              f"columns odds_{cols} {col_values[0]:.2f} -> {col_values[-1]:.2f}")
+        print("  " + ", ".join(f"{label[0]} = {label}" for label in labels))
+        for value, row in zip(row_values, best):
+            print(f"{value:>8.2f} " + "".join(labels[b][0] for b in row))
+    share = np.bincount(best.ravel(), minlength=len(labels)) / best.size
+    print("\nPREDICTED OVER THE GRID:", {labels[j]: f"{share[j]:.0%}" for j in range(len(labels))})
+
+
+def predict_locally(fixture: dict, args, axes=None):
+    t0 = time.perf_counter()
+    from model_registry import format_startup
+    from predict_service import SLOW_START_NOTE, Predictor
+    startup["import_seconds"] += time.perf_counter() - t0
+
+    # Model, form lookup for --date and the raw fixture (src/predict_service.py);
+    # swept odds need not be given
+    resolved = Predictor().resolve(fixture, swept=axes or {})
+    entry, found = resolved["entry"], resolved["found"]
+    startup["model_load_seconds"], startup["artifact"] = entry["load_seconds"], entry["artifact"]
+    if entry["artifact"] != "flat":
+        print(SLOW_START_NOTE)
+    if found is not None:
+        print(f"Form looked up for {args.date} ({found['source']}).")
+    bundle = entry["bundle"]
+
+    if axes:
+        # Resolve the fixture once, then score the whole grid in one batched pass
+        from odds_surface import score_surface, surface_json
+
+        t0 = time.perf_counter()
+        surface = score_surface(bundle, resolved["raw"], axes)
+        elapsed = time.perf_counter() - t0
+        print_surface(surface)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(surface_json(surface), f)
+            print("Saved surface to:", args.out)
+        print(f"\nScored {surface['proba'][..., 0].size:,} odds combinations in {elapsed * 1000:.1f} ms")
+        return
+
+    # The bundle's transform turns the raw fixture into the model's columns
+    # (scorelines win over raw form stats)
+    model = bundle["engine"]
+    X = bundle["transform"].from_raw(resolved["raw"])
+    row = dict(zip(bundle["features"], X[0].tolist()))
+
+    t0 = time.perf_counter()
+    proba = model.predict_proba(X)[0]
+    startup["first_prediction_seconds"] = time.perf_counter() - t0
+
+    labels = [bundle["inv_label_map"][c] for c in model.classes_]
+    proba_dict = {labels[i]: float(proba[i]) for i in range(len(labels))}
+
+    print_prediction(row, labels[int(proba.argmax())], proba_dict)
+    if args.timing:
+        print("\n" + format_startup(startup))
+
+
+def predict_batch(args):
+    from predict_service import predict_file
+
+    if not args.out:
+        raise ValueError("--batch needs --out (a .csv or .jsonl path for the predictions).")
+
+    def progress(rows):
+        print(f"\r{rows:,} fixtures scored", end="", flush=True)
+
+    summary = predict_file(args.batch, args.out, chunk_rows=args.chunk, workers=args.workers, on_chunk=progress)
+    print(f"\nWrote {summary['rows']:,} predictions to {args.out} in {summary['seconds']:.2f} s"
+          f" ({summary['errors']:,} fixtures could not be scored; see the error column).")
+
 
 def main():
     parser = argparse.ArgumentParser(description="Chelsea predictor (RF + rolling form + odds)")
 
-    parser.add_argument("--is_home", type=int, choices=[0, 1], required=True, help="1 if Chelsea is home, else 0")
-    parser.add_argument("--odds_win", type=float, required=True, help="Decimal odds for Chelsea Win")
-    parser.add_argument("--odds_draw", type=float, required=True, help="Decimal odds for Draw")
-    parser.add_argument("--odds_loss", type=float, required=True, help="Decimal odds for Chelsea Loss")
+    parser.add_argument("--is_home", type=int, choices=[0, 1], help="1 if Chelsea is home, else 0 (optional with --date for past fixtures)")
+    parser.add_argument("--odds_win", type=float, help="Decimal odds for Chelsea Win")
+    parser.add_argument("--odds_draw", type=float, help="Decimal odds for Draw")
+    parser.add_argument("--odds_loss", type=float, help="Decimal odds for Chelsea Loss")
 
     # Option A: supply rolling stats directly
     parser.add_argument("--formpoints_5", type=float)
@@ -59,54 +162,38 @@ def main():
     # Option B: supply last 5 scorelines (best for demo)
     parser.add_argument("--last5_scores", type=str, help='Example: "2-1,0-0,1-2,3-0,1-1" (Chelsea perspective)')
 
-    args = parser.parse_args()
+    # Option C: name the fixture; form comes from the precomputed index (src/16_build_form_index.py)
+    parser.add_argument("--date", type=str, help="Fixture date YYYY-MM-DD (form looked up, no scorelines needed)")
+    parser.add_argument("--opponent", type=str, help="Opponent name, checked against the data for past fixtures")
 
-    if not os.path.exists(MODEL_PATH):
-        raise FileNotFoundError(f"Model not found at {MODEL_PATH}. Run src/08_train_and_save_final_model.py first.")
-
-    bundle = joblib.load(MODEL_PATH)
-    model = bundle["model"]
-    FEATURES = bundle["features"]
-    inv_label_map = bundle["inv_label_map"]
-
-    # Build form features
-    if args.last5_scores:
-        formpoints_5, goalsfor_5, goalsagainst_5, goaldiff_5, winrate_5 = parse_scorelines(args.last5_scores)
-    elif all(v is not None for v in [args.formpoints_5, args.goalsfor_5, args.goalsagainst_5, args.goaldiff_5, args.winrate_5]):
-        formpoints_5 = args.formpoints_5
-        goalsfor_5 = args.goalsfor_5
-        goalsagainst_5 = args.goalsagainst_5
-        goaldiff_5 = args.goaldiff_5
-        winrate_5 = args.winrate_5
-    else:
-        raise ValueError("Provide either --last5_scores OR all 5 rolling feature arguments.")
-
-    row = {
-        "IsHome": args.is_home,
-        "FormPoints_5": formpoints_5,
-        "GoalsFor_5": goalsfor_5,
-        "GoalsAgainst_5": goalsagainst_5,
-        "GoalDiff_5": goaldiff_5,
-        "WinRate_5": winrate_5,
-        "Odds_Win": args.odds_win,
-        "Odds_Draw": args.odds_draw,
-        "Odds_Loss": args.odds_loss,
-    }
-
-    X = pd.DataFrame([row])[FEATURES]
-
-    pred_class = int(model.predict(X)[0])
-    proba = model.predict_proba(X)[0]
+    # Many fixtures: a CSV (one column per field above) or JSONL file, scored in chunks
+    parser.add_argument("--batch", type=str, help="CSV or JSONL file of fixtures to score")
+    parser.add_argument("--out", type=str, help="Where --batch writes predictions (.csv or .jsonl), or --sweep its surface (.json)")
+    parser.add_argument("--chunk", type=int, default=10000, help="Fixtures per model call in --batch mode")
+    parser.add_argument("--workers", type=int, default=1, help="Processes scoring --batch chunks")
 
-    labels = [inv_label_map[c] for c in model.classes_]
-    proba_dict = {labels[i]: float(proba[i]) for i in range(len(labels))}
+    # Odds sensitivity: the fixture above over a grid of odds, e.g. --sweep win=1.2:6:50 --sweep loss=1.5:12:50
+    parser.add_argument("--sweep", action="append", metavar="OUTCOME=MIN:MAX[:STEPS]",
+                        help="Vary win, draw or loss odds over a range (or ODDS,ODDS,...); repeat for a 2-D grid")
 
-    print("\nINPUTS USED:")
-    for k, v in row.items():
-        print(f"  {k}: {v}")
+    parser.add_argument("--no-daemon", action="store_true", help="Load the model here even if src/predict_daemon.py is running")
+    parser.add_argument("--timing", action="store_true", help="Print import, model load and prediction times")
 
-    print("\nPREDICTION:", inv_label_map[pred_class])
-    print("PROBABILITIES:", {k: round(v, 3) for k, v in proba_dict.items()})
+    args = parser.parse_args()
+
+    if args.batch:
+        predict_batch(args)
+        return
+
+    # The raw fixture, as the web app receives it
+    fixture = {k: getattr(args, k) for k in FIXTURE_ARGS if getattr(args, k) is not None}
+    if not (args.last5_scores or args.date or all(k in fixture for k in FORM_ARGS)):
+        raise ValueError("Provide either --last5_scores, all 5 rolling feature arguments OR --date.")
+    if args.sweep:
+        predict_locally(fixture, args, parse_sweeps(args.sweep))
+        return
+    if args.no_daemon or not predict_with_daemon(fixture, args):
+        predict_locally(fixture, args)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,268 @@
+import csv
+import json
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from feature_spec import RAW_FIELDS, FeatureError, has_form
+from form_index import INDEX_DIR, ReloadingFormIndex, lookup_context
+from model_registry import MODEL_PATH, ModelRegistry
+
+TEAM = "Chelsea"
+
+# Fields a fixture must give unless the form index finds it in the data
+FIXTURE_FIELDS = ["is_home", "odds_win", "odds_draw", "odds_loss"]
+
+SLOW_START_NOTE = "Note: no current flat export; run src/12_export_flat_forest.py for a faster start."
+
+# Fixtures per model call in batch mode
+CHUNK_ROWS = 10000
+
+
+class Predictor:
+    """
+    The final model and the form index, kept warm in one process. Used by
+    the prediction daemon (src/predict_daemon.py) and batch mode; the model
+    is swapped in when it is retrained and the index when it is rebuilt, as
+    in the web app.
+
+    Fixtures are raw dicts in the /api/predict format; form comes from
+    "last5_scores", the raw form fields or, given a "date", the form index.
+    """
+
+    def __init__(self, model_path: str = MODEL_PATH, index_dir: str = INDEX_DIR):
+        self.registry = ModelRegistry(model_path)
+        self.index_dir = index_dir
+        self._form_index = ReloadingFormIndex(index_dir)
+
+    def form_index(self):
+        """The current form index, reopened after src/13_update_features.py rebuilds it."""
+        index = self._form_index.current()
+        if index is None:
+            raise FileNotFoundError(f"Form index not found at {self.index_dir}. "
+                                    "Run src/16_build_form_index.py first.")
+        return index
+
+    def resolve(self, fixture: dict, swept=()):
+        """
+        One fixture for the CLIs, before scoring: {"entry", "raw", "found"}.
+        raw is the fixture's raw fields (FeatureTransform.raw(), one row)
+        with form, venue and odds filled from the form index when the
+        fixture has no form of its own but a date; found is that lookup or
+        None. Raises ValueError naming the arguments still missing (is_home
+        and the odds, except outcomes in `swept`).
+        """
+        entry = self.registry.entry()
+        found = None
+        if not has_form(fixture) and fixture.get("date"):
+            found = self.form_index().lookup(TEAM, fixture["date"], fixture.get("opponent") or None)
+        # Past fixtures also carry their venue and odds; the fixture's own values still win
+        raw = entry["bundle"]["transform"].raw([fixture], lookup_context([found]) if found is not None else None)
+        missing = [k for k in FIXTURE_FIELDS
+                   if np.isnan(raw[0, RAW_FIELDS.index(k)]) and k.removeprefix("odds_") not in swept]
+        if missing:
+            raise ValueError(f"Missing --{', --'.join(missing)} (only past fixtures found via --date supply them).")
+        return {"entry": entry, "raw": raw, "found": found}
+
+    def featurize(self, entry, fixtures):
+        """(X, found): the feature matrix and the form index lookups (None where not needed)."""
+        found = [None] * len(fixtures)
+        for i, fixture in enumerate(fixtures):
+            if not has_form(fixture) and fixture.get("date"):
+                try:
+                    found[i] = self.form_index().lookup(TEAM, fixture["date"], fixture.get("opponent") or None)
+                except ValueError as e:
+                    raise FeatureError(i, str(e)) from None
+        context = lookup_context(found) if any(f is not None for f in found) else None
+        return entry["bundle"]["transform"](fixtures, context), found
+
+    def predict(self, fixtures):
+        """
+        Score fixtures in one model call. Returns a dict with the model
+        version, class labels, (n, n_classes) probabilities, the feature
+        matrix and the form lookups. Raises FeatureError for bad input.
+        """
+        entry = self.registry.entry()
+        bundle = entry["bundle"]
+        X, found = self.featurize(entry, fixtures)
+        proba = bundle["engine"].predict_proba(X)
+        return {
+            "version": entry["version"],
+            "labels": [bundle["inv_label_map"][c] for c in bundle["engine"].classes_],
+            "features": bundle["features"],
+            "proba": proba,
+            "X": X,
+            "found": found,
+        }
+
+    def predict_valid(self, fixtures):
+        """
+        Like predict(), but bad fixtures are set aside instead of failing
+        the batch. Returns (result for the good ones or None, their
+        positions, {position: error message}).
+        """
+        try:
+            return self.predict(fixtures), list(range(len(fixtures))), {}
+        except FeatureError:
+            pass
+        # Find every bad fixture by bisection, then score the rest in one call
+        errors = {}
+        self._find_errors(self.registry.entry(), fixtures, list(range(len(fixtures))), errors)
+        keep = [i for i in range(len(fixtures)) if i not in errors]
+        return (self.predict([fixtures[i] for i in keep]) if keep else None), keep, errors
+
+    def _find_errors(self, entry, fixtures, positions, errors):
+        try:
+            self.featurize(entry, [fixtures[i] for i in positions])
+        except FeatureError as e:
+            if len(positions) == 1:
+                errors[positions[0]] = str(e)
+                return
+            mid = len(positions) // 2
+            self._find_errors(entry, fixtures, positions[:mid], errors)
+            self._find_errors(entry, fixtures, positions[mid:], errors)
+
+
+# ---------------------------------------------------------------------------
+# Batch mode: stream a CSV or JSONL file of fixtures through the model
+# ---------------------------------------------------------------------------
+
+def _is_jsonl(path: str):
+    return path.lower().endswith((".jsonl", ".ndjson"))
+
+
+def read_fixtures(path: str):
+    """Yield fixtures from a CSV (one column per field) or JSONL file, one at a time. Blank CSV cells count as not given."""
+    with open(path, newline="") as f:
+        if _is_jsonl(path):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            for row in csv.DictReader(f):
+                yield {k: v.strip() for k, v in row.items() if k and v is not None and v.strip()}
+
+
+def chunked(items, size: int):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def score_chunk(predictor: Predictor, fixtures):
+    """
+    Output records for one chunk: each input fixture plus prediction,
+    probabilities, model_version and, for fixtures that could not be
+    scored, error.
+    """
+    result, positions, errors = predictor.predict_valid(fixtures)
+    records = [dict(f) for f in fixtures]
+    if result is not None:
+        labels = result["labels"]
+        best = result["proba"].argmax(axis=1)
+    for row, i in enumerate(positions):
+        records[i]["prediction"] = labels[best[row]]
+        records[i]["probabilities"] = {labels[j]: round(float(result["proba"][row, j]), 4) for j in range(len(labels))}
+        records[i]["model_version"] = result["version"]
+    for i, message in errors.items():
+        records[i]["error"] = message
+    return records
+
+
+_worker_predictor = None
+
+
+def _init_worker(model_path: str, index_dir: str):
+    global _worker_predictor
+    _worker_predictor = Predictor(model_path, index_dir)
+
+
+def _score_in_worker(fixtures):
+    return score_chunk(_worker_predictor, fixtures)
+
+
+# Columns batch mode adds to CSV output, after the input columns
+OUTPUT_COLUMNS = ["prediction", "p_loss", "p_draw", "p_win", "model_version", "error"]
+
+
+class _Writer:
+    """Writes records as CSV (the input columns, then OUTPUT_COLUMNS) or JSONL."""
+
+    def __init__(self, path: str, columns=None):
+        self.f = open(path, "w", newline="")
+        self.jsonl = _is_jsonl(path)
+        self.columns = columns
+        self.csv = None
+
+    def write(self, records):
+        if self.jsonl:
+            self.f.writelines(json.dumps(r) + "\n" for r in records)
+            return
+        rows = []
+        for r in records:
+            row = {k: v for k, v in r.items() if k != "probabilities"}
+            row.update({f"p_{k.lower()}": v for k, v in r.get("probabilities", {}).items()})
+            rows.append(row)
+        if self.csv is None:
+            # Input columns from the CSV header, or (JSONL input) from the first chunk
+            columns = self.columns or dict.fromkeys(k for r in records for k in r if k != "probabilities")
+            fields = [c for c in columns if c not in OUTPUT_COLUMNS] + OUTPUT_COLUMNS
+            self.csv = csv.DictWriter(self.f, fieldnames=fields, extrasaction="ignore")
+            self.csv.writeheader()
+        self.csv.writerows(rows)
+
+    def close(self):
+        self.f.close()
+
+
+def predict_file(in_path: str, out_path: str, chunk_rows: int = CHUNK_ROWS, workers: int = 1,
+                 model_path: str = MODEL_PATH, index_dir: str = INDEX_DIR, on_chunk=None):
+    """
+    Stream fixtures from in_path to predictions in out_path, chunk_rows
+    fixtures per model call, writing each chunk as soon as it is scored, so
+    memory stays flat for any file size. With workers > 1 chunks are scored
+    in that many processes (each loads the model once) and still written
+    in input order. on_chunk(rows_done), if given, is called after each chunk.
+    Returns {"rows", "errors", "seconds"}.
+    """
+    t0 = time.perf_counter()
+    columns = None
+    if not _is_jsonl(in_path):
+        with open(in_path, newline="") as f:
+            columns = next(csv.reader(f), [])
+    writer = _Writer(out_path, columns)
+    totals = {"rows": 0, "errors": 0}
+
+    def done(records):
+        writer.write(records)
+        totals["rows"] += len(records)
+        totals["errors"] += sum("error" in r for r in records)
+        if on_chunk is not None:
+            on_chunk(totals["rows"])
+
+    chunks = chunked(read_fixtures(in_path), chunk_rows)
+    try:
+        if workers <= 1:
+            predictor = Predictor(model_path, index_dir)
+            for chunk in chunks:
+                done(score_chunk(predictor, chunk))
+        else:
+            with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(model_path, index_dir)) as pool:
+                # A few chunks in flight per worker; results are taken in submission order
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(_score_in_worker, chunk))
+                    if len(pending) >= 2 * workers:
+                        done(pending.popleft().result())
+                while pending:
+                    done(pending.popleft().result())
+    finally:
+        writer.close()
+    return {**totals, "seconds": time.perf_counter() - t0}
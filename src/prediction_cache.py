@@ -0,0 +1,187 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_SIZE = 4096
+SHARED_FILE = "predictions.sqlite"
+
+# Trim the shared store back to maxsize every this many inserts (not on every
+# insert: counting rows costs more than a lookup)
+TRIM_EVERY = 64
+
+
+class SharedStore:
+    """
+    File-backed LRU shared by every worker on the host (SQLite in WAL mode,
+    so readers don't block each other). Each process opens its own
+    connection lazily, since connections must not cross a fork.
+    """
+
+    def __init__(self, directory: str, maxsize: int):
+        self.path = os.path.join(directory, SHARED_FILE)
+        self.maxsize = maxsize
+        self._conn = None
+        self._pid = None
+        self._inserts = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _db(self):
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=OFF")
+            conn.execute("CREATE TABLE IF NOT EXISTS predictions (key BLOB PRIMARY KEY, proba BLOB, used REAL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS predictions_used ON predictions (used)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key: bytes):
+        db = self._db()
+        row = db.execute("SELECT proba FROM predictions WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        db.execute("UPDATE predictions SET used = ? WHERE key = ?", (time.time(), key))
+        return np.frombuffer(row[0], dtype=np.float64)
+
+    def put(self, key: bytes, proba: np.ndarray):
+        """Store one entry; returns how many old entries were evicted."""
+        db = self._db()
+        db.execute("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)", (key, proba.tobytes(), time.time()))
+        self._inserts += 1
+        if self._inserts % TRIM_EVERY:
+            return 0
+        excess = db.execute("SELECT COUNT(*) FROM predictions").fetchone()[0] - self.maxsize
+        if excess <= 0:
+            return 0
+        return db.execute(
+            "DELETE FROM predictions WHERE key IN (SELECT key FROM predictions ORDER BY used LIMIT ?)", (excess,)
+        ).rowcount
+
+    def drop_other_versions(self, version: str):
+        """Remove entries cached for any model version other than `version`."""
+        prefix = version.encode() + b"|"
+        self._db().execute("DELETE FROM predictions WHERE substr(key, 1, ?) != ?", (len(prefix), prefix))
+
+
+class PredictionCache:
+    """
+    Bounded LRU cache of class probabilities keyed on the exact feature row
+    and the model version.
+
+    lookup() is called with the current model version; when the version
+    changes (the registry hot-swapped the bundle) everything cached for the
+    old model is dropped. With shared_dir set, misses in this process's
+    cache fall back to a file-backed store shared by all workers, so one
+    worker's prediction serves the others.
+
+    on_event, if given, is called as on_event(event, n) for "hit", "miss",
+    "eviction", "invalidation" and "shared_error" (for metrics).
+    """
+
+    def __init__(self, maxsize: int = CACHE_SIZE, shared_dir: str = None, on_event=None):
+        self.maxsize = maxsize
+        self.on_event = on_event
+        self.shared = SharedStore(shared_dir, maxsize) if shared_dir else None
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.stats = {"hit": 0, "miss": 0, "eviction": 0, "invalidation": 0, "shared_error": 0}
+
+    def _count(self, event: str, n: int = 1):
+        if n:
+            self.stats[event] += n
+            if self.on_event is not None:
+                self.on_event(event, n)
+
+    def _shared_call(self, fn, *args):
+        # The shared store is an optimisation: if it is busy or unavailable,
+        # behave like a miss instead of failing the request
+        try:
+            return fn(*args)
+        except sqlite3.Error:
+            self._count("shared_error")
+            return None
+
+    @staticmethod
+    def key(version: str, row) -> bytes:
+        return version.encode() + b"|" + np.asarray(row, dtype=np.float64).tobytes()
+
+    def _check_version(self, version: str):
+        if version != self._version:
+            if self._version is not None:
+                self._entries.clear()
+                if self.shared is not None:
+                    self._shared_call(self.shared.drop_other_versions, version)
+                self._count("invalidation")
+            self._version = version
+
+    def lookup(self, version: str, X: np.ndarray):
+        """
+        Cached probabilities for the rows of X: returns (proba, missing)
+        where proba has NaN rows for the indices listed in `missing`.
+        """
+        proba = None
+        missing = []
+        with self._lock:
+            self._check_version(version)
+            for i, row in enumerate(X):
+                k = self.key(version, row)
+                hit = self._entries.get(k)
+                if hit is not None:
+                    self._entries.move_to_end(k)
+                elif self.shared is not None:
+                    hit = self._shared_call(self.shared.get, k)
+                    if hit is not None:
+                        self._insert(k, hit)
+                if hit is None:
+                    missing.append(i)
+                    continue
+                if proba is None:
+                    proba = np.full((len(X), len(hit)), np.nan)
+                proba[i] = hit
+        self._count("hit", len(X) - len(missing))
+        self._count("miss", len(missing))
+        return proba, missing
+
+    def _insert(self, k: bytes, value: np.ndarray):
+        self._entries[k] = value
+        self._entries.move_to_end(k)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._count("eviction")
+
+    def store(self, version: str, X: np.ndarray, proba: np.ndarray):
+        with self._lock:
+            self._check_version(version)
+            for row, p in zip(X, proba):
+                k = self.key(version, row)
+                value = np.array(p, dtype=np.float64)
+                self._insert(k, value)
+                if self.shared is not None:
+                    self._count("eviction", self._shared_call(self.shared.put, k, value) or 0)
+
+    def predict_proba(self, version: str, engine, X: np.ndarray):
+        """engine.predict_proba(X) with cached rows skipped; misses are scored in one pass."""
+        proba, missing = self.lookup(version, X)
+        if not missing:
+            return proba
+        fresh = engine.predict_proba(X[missing])
+        if proba is None:
+            proba = np.empty((len(X), fresh.shape[1]))
+        proba[missing] = fresh
+        self.store(version, X[missing], fresh)
+        return proba
+
+    def info(self):
+        total = self.stats["hit"] + self.stats["miss"]
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "shared": self.shared.path if self.shared is not None else None,
+            "hit_rate": round(self.stats["hit"] / total, 4) if total else None,
+            **self.stats,
+        }
@@ -0,0 +1,233 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+WINDOWS = (3, 5, 10)
+EWM_SPANS = (5, 10)
+
+POINTS_MAP = {"Win": 3, "Draw": 1, "Loss": 0}
+
+# Per-match stats every feature is built from: points, goals for, goals against, win flag
+STATS = ("points", "gf", "ga", "win")
+
+
+def feature_names(suffix):
+    return [f"FormPoints_{suffix}", f"GoalsFor_{suffix}", f"GoalsAgainst_{suffix}",
+            f"GoalDiff_{suffix}", f"WinRate_{suffix}"]
+
+
+def _group_positions(keys: np.ndarray):
+    """Position of each row within its run of equal keys (rows must be grouped)."""
+    n = len(keys)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = keys[1:] != keys[:-1]
+    starts = np.nonzero(new_group)[0]
+    group_start = starts[np.cumsum(new_group) - 1]
+    return np.arange(n) - group_start, group_start
+
+
+def _exclusive_cumsum(values: np.ndarray):
+    """ecs[i] = sum(values[:i]), so the sum of rows j..i-1 is ecs[i] - ecs[j]."""
+    out = np.zeros(len(values) + 1)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+def rolling_features(df: pd.DataFrame, windows=WINDOWS, ewm_spans=EWM_SPANS, season=True,
+                     group="Team", goals_for="GoalsFor", goals_against="GoalsAgainst"):
+    """
+    Pre-match form features for every row, computed for all teams at once.
+
+    `df` must be sorted by (group, Date); group=None treats it as one team.
+    Every feature only uses the team's *previous* matches (no leakage).
+
+      window w   : sums over the previous w matches (NaN until w played)
+                   FormPoints_w, GoalsFor_w, GoalsAgainst_w, GoalDiff_w, WinRate_w
+      season     : the same stats so far this season (needs SeasonTag) + Games_season
+      ewm span s : exponentially weighted means of the previous results, *_ewm{s}
+
+    Returns a DataFrame aligned with df's index.
+    """
+    n = len(df)
+    points = df["Target"].map(POINTS_MAP).to_numpy(dtype=float)
+    gf = df[goals_for].to_numpy(dtype=float)
+    ga = df[goals_against].to_numpy(dtype=float)
+    win = (points == 3).astype(float)
+
+    keys = df[group].to_numpy() if group else np.zeros(n, dtype=np.int8)
+    pos, _ = _group_positions(keys)
+    idx = np.arange(n)
+
+    ecs = {name: _exclusive_cumsum(v) for name, v in zip(STATS, (points, gf, ga, win))}
+    out = {}
+
+    for w in windows:
+        ok = pos >= w
+        start = np.where(ok, idx - w, 0)
+        sums = {}
+        for name in STATS:
+            s = ecs[name][idx] - ecs[name][start]
+            sums[name] = np.where(ok, s, np.nan)
+        out[f"FormPoints_{w}"] = sums["points"]
+        out[f"GoalsFor_{w}"] = sums["gf"]
+        out[f"GoalsAgainst_{w}"] = sums["ga"]
+        out[f"GoalDiff_{w}"] = sums["gf"] - sums["ga"]
+        out[f"WinRate_{w}"] = sums["win"] / w
+
+    if season:
+        season_keys = (df[group].astype(str) + "|" if group else "") + df["SeasonTag"].astype(str)
+        season_pos, season_start = _group_positions(season_keys.to_numpy())
+        played = season_pos > 0
+        sums = {}
+        for name in STATS:
+            s = ecs[name][idx] - ecs[name][season_start]
+            sums[name] = np.where(played, s, np.nan)
+        out["Games_season"] = season_pos.astype(float)
+        out["FormPoints_season"] = sums["points"]
+        out["GoalsFor_season"] = sums["gf"]
+        out["GoalsAgainst_season"] = sums["ga"]
+        out["GoalDiff_season"] = sums["gf"] - sums["ga"]
+        out["WinRate_season"] = sums["win"] / np.where(played, season_pos, 1)
+
+    if ewm_spans:
+        stats = pd.DataFrame({"points": points, "gf": gf, "ga": ga, "win": win}, index=df.index)
+        grouper = df[group] if group else np.zeros(n, dtype=np.int8)
+        shifted = stats.groupby(grouper, sort=False).shift(1)
+        for span in ewm_spans:
+            ewm = (
+                shifted.groupby(grouper, sort=False)
+                .ewm(span=span)
+                .mean()
+                .reset_index(level=0, drop=True)
+                .reindex(df.index)
+            )
+            out[f"FormPoints_ewm{span}"] = ewm["points"].to_numpy()
+            out[f"GoalsFor_ewm{span}"] = ewm["gf"].to_numpy()
+            out[f"GoalsAgainst_ewm{span}"] = ewm["ga"].to_numpy()
+            out[f"GoalDiff_ewm{span}"] = (ewm["gf"] - ewm["ga"]).to_numpy()
+            out[f"WinRate_ewm{span}"] = ewm["win"].to_numpy()
+
+    return pd.DataFrame(out, index=df.index)
+
+
+class FormState:
+    """
+    Running form for one team. update() adds one result and features() returns
+    the pre-match features for that team's next match, both in O(1):
+    window sums are kept as running totals over a ring buffer of the last
+    max(windows) results, EWMs as running weighted sums.
+
+    Produces the same values as rolling_features() on the full history.
+    """
+
+    def __init__(self, windows=WINDOWS, ewm_spans=EWM_SPANS, season=True):
+        self.windows = tuple(windows)
+        self.ewm_spans = tuple(ewm_spans)
+        self.season = season
+        self.buffer = deque(maxlen=max(self.windows) if self.windows else 1)
+        self.count = 0
+        self.sums = {w: [0.0, 0.0, 0.0, 0.0] for w in self.windows}
+        # adjust=True EWM: mean = weighted_sum / weight_sum
+        self.ewm = {s: [[0.0, 0.0, 0.0, 0.0], 0.0] for s in self.ewm_spans}
+        self.season_tag = None
+        self.season_sums = [0.0, 0.0, 0.0, 0.0]
+        self.season_games = 0
+
+    def update(self, target: str, goals_for: float, goals_against: float, season_tag=None):
+        points = float(POINTS_MAP[target])
+        x = (points, float(goals_for), float(goals_against), 1.0 if points == 3 else 0.0)
+
+        for w in self.windows:
+            sums = self.sums[w]
+            if self.count >= w:
+                old = self.buffer[-w]
+                for i in range(4):
+                    sums[i] -= old[i]
+            for i in range(4):
+                sums[i] += x[i]
+        self.buffer.append(x)
+        self.count += 1
+
+        for span in self.ewm_spans:
+            decay = 1.0 - 2.0 / (span + 1.0)
+            weighted, weight = self.ewm[span]
+            self.ewm[span] = [[x[i] + decay * weighted[i] for i in range(4)], 1.0 + decay * weight]
+
+        if self.season:
+            if season_tag != self.season_tag:
+                self.season_tag = season_tag
+                self.season_sums = [0.0, 0.0, 0.0, 0.0]
+                self.season_games = 0
+            for i in range(4):
+                self.season_sums[i] += x[i]
+            self.season_games += 1
+
+    def features(self, season_tag=None):
+        """Features for the next match (season_tag: the next match's season, if known)."""
+        nan = math.nan
+        out = {}
+        for w in self.windows:
+            if self.count >= w:
+                p, f, a, wins = self.sums[w]
+                out.update(zip(feature_names(w), (p, f, a, f - a, wins / w)))
+            else:
+                out.update(dict.fromkeys(feature_names(w), nan))
+
+        if self.season:
+            same_season = season_tag is None or season_tag == self.season_tag
+            games = self.season_games if same_season else 0
+            out["Games_season"] = float(games)
+            if games:
+                p, f, a, wins = self.season_sums
+                out.update(zip(feature_names("season"), (p, f, a, f - a, wins / games)))
+            else:
+                out.update(dict.fromkeys(feature_names("season"), nan))
+
+        for span in self.ewm_spans:
+            weighted, weight = self.ewm[span]
+            if weight:
+                p, f, a, wins = (v / weight for v in weighted)
+                out.update(zip(feature_names(f"ewm{span}"), (p, f, a, f - a, wins)))
+            else:
+                out.update(dict.fromkeys(feature_names(f"ewm{span}"), nan))
+        return out
+
+    def to_dict(self):
+        return {
+            "windows": list(self.windows), "ewm_spans": list(self.ewm_spans), "season": self.season,
+            "buffer": [list(x) for x in self.buffer], "count": self.count,
+            "sums": {str(w): s for w, s in self.sums.items()},
+            "ewm": {str(s): v for s, v in self.ewm.items()},
+            "season_tag": self.season_tag, "season_sums": self.season_sums, "season_games": self.season_games,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        state = cls(d["windows"], d["ewm_spans"], d["season"])
+        state.buffer.extend(tuple(x) for x in d["buffer"])
+        state.count = d["count"]
+        state.sums = {int(w): list(s) for w, s in d["sums"].items()}
+        state.ewm = {int(s): [list(v[0]), v[1]] for s, v in d["ewm"].items()}
+        state.season_tag = d["season_tag"]
+        state.season_sums = list(d["season_sums"])
+        state.season_games = d["season_games"]
+        return state
+
+
+def build_form_states(df: pd.DataFrame, windows=WINDOWS, ewm_spans=EWM_SPANS, season=True,
+                      group="Team", goals_for="GoalsFor", goals_against="GoalsAgainst"):
+    """Replay each team's history (sorted by date) into a FormState; returns {team: FormState}."""
+    states = {}
+    teams = df[group].to_numpy() if group else [None] * len(df)
+    seasons = df["SeasonTag"].to_numpy() if "SeasonTag" in df.columns else [None] * len(df)
+    for team, target, f, a, tag in zip(teams, df["Target"].to_numpy(), df[goals_for].to_numpy(),
+                                       df[goals_against].to_numpy(), seasons):
+        state = states.get(team)
+        if state is None:
+            state = states[team] = FormState(windows, ewm_spans, season)
+        state.update(target, f, a, tag)
+    return states
@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+
+from bookmaker_odds import consensus_odds, outcome_cols
+from team_perspective import ODDS_COLS
+
+N_SIMS = 1_000_000
+
+# Uniform draws generated per chunk (float32): bounds memory at ~CHUNK_ELEMENTS * 16 bytes
+# (the draws and two 0/1 outcome matrices) whatever the number of simulations
+CHUNK_ELEMENTS = 4_000_000
+
+# Points for the home / away side by result
+HOME_POINTS = {"H": 3, "D": 1, "A": 0}
+AWAY_POINTS = {"H": 0, "D": 1, "A": 3}
+
+# Positions whose points are reported as thresholds (title, top 4, top 6, safety)
+THRESHOLD_POSITIONS = [1, 4, 6, 17]
+
+
+def split_season(season: pd.DataFrame, as_of):
+    """
+    Played fixtures (before as_of, with a result) and remaining fixtures
+    (on/after as_of, or without a result yet). Dates must be datetime64.
+    """
+    as_of = pd.Timestamp(as_of)
+    has_result = season["FTR"].isin(["H", "D", "A"]) if "FTR" in season else pd.Series(False, index=season.index)
+    played = season[(season["Date"] < as_of) & has_result]
+    remaining = season[(season["Date"] >= as_of) | ~has_result]
+    return played.reset_index(drop=True), remaining.sort_values("Date", kind="stable").reset_index(drop=True)
+
+
+def league_table(played: pd.DataFrame, teams):
+    """Points, goal difference and goals for per team (in `teams` order) from played fixtures."""
+    pos = {t: i for i, t in enumerate(teams)}
+    home = played["HomeTeam"].astype(str).map(pos).to_numpy(dtype=np.int64)
+    away = played["AwayTeam"].astype(str).map(pos).to_numpy(dtype=np.int64)
+    hg, ag = played["FTHG"].to_numpy(dtype=float), played["FTAG"].to_numpy(dtype=float)
+    result = played["FTR"].astype(str)
+    n = len(teams)
+    points = np.bincount(home, result.map(HOME_POINTS).to_numpy(dtype=float), n) + \
+        np.bincount(away, result.map(AWAY_POINTS).to_numpy(dtype=float), n)
+    goals_for = np.bincount(home, hg, n) + np.bincount(away, ag, n)
+    goals_against = np.bincount(home, ag, n) + np.bincount(away, hg, n)
+    return pd.DataFrame({
+        "Team": list(teams),
+        "Played": np.bincount(home, minlength=n) + np.bincount(away, minlength=n),
+        "Points": points.astype(int),
+        "GoalDiff": (goals_for - goals_against).astype(int),
+        "GoalsFor": goals_for.astype(int),
+    })
+
+
+def fixture_probabilities(remaining: pd.DataFrame, team: str, bundle: dict, form: dict, base_rates):
+    """
+    (home win, draw, away win) probabilities for every remaining fixture.
+
+    The team's own fixtures are scored by the model bundle in one batch,
+    using its form as of the simulation date and each fixture's B365 odds.
+    All other fixtures use the bookmakers' margin-free consensus (MktP).
+    Fixtures without odds get base_rates (the season's H/D/A frequencies).
+    Returns (probs, source) where source is "model", "market" or "base" per fixture.
+    """
+    market = consensus_odds(remaining)[outcome_cols("MktP")].to_numpy(dtype=float)
+    probs = np.where(np.isnan(market).any(axis=1, keepdims=True), base_rates, market)
+    source = np.where(np.isnan(market).any(axis=1), "base", "market").astype(object)
+
+    is_home = (remaining["HomeTeam"] == team).to_numpy()
+    own = is_home | (remaining["AwayTeam"] == team).to_numpy()
+    odds = remaining.reindex(columns=ODDS_COLS).to_numpy(dtype=float)
+    # Oriented Win/Draw/Loss for the team: away fixtures swap the home and away prices
+    odds = np.where(is_home[:, None], odds, odds[:, ::-1])
+    scored = own & ~np.isnan(odds).any(axis=1)
+    if scored.any():
+        rows = np.flatnonzero(scored)
+        columns = {"is_home": is_home[rows].astype(float),
+                   "odds_win": odds[rows, 0], "odds_draw": odds[rows, 1], "odds_loss": odds[rows, 2]}
+        X = bundle["transform"](columns, {"form": np.tile(list(form.values()), (len(rows), 1))})
+        engine = bundle["engine"]
+        proba = engine.predict_proba(X)
+        labels = [bundle["inv_label_map"][int(c)] for c in engine.classes_]
+        win, draw, loss = (proba[:, labels.index(k)] for k in ["Win", "Draw", "Loss"])
+        home_side = is_home[rows]
+        probs[rows] = np.column_stack([np.where(home_side, win, loss), draw, np.where(home_side, loss, win)])
+        source[rows] = "model"
+    return probs, source
+
+
+def simulate(home, away, probs, base_points, tiebreak, n_sims: int = N_SIMS, seed: int = None,
+             chunk_elements: int = CHUNK_ELEMENTS):
+    """
+    Monte Carlo over the remaining fixtures.
+
+    home / away are team indices per fixture, probs the (home win, draw,
+    away win) probabilities, base_points the points already won and
+    tiebreak a per-team score for equal points (higher ranks first, e.g.
+    current goal difference order). Simulations run in chunks of
+    chunk_elements // n_fixtures, so memory stays bounded for any n_sims;
+    the uniform draws come from one seeded stream, so a seed gives the
+    same result whatever the chunk size.
+
+    Returns counts over all simulations:
+      position  (n_teams, n_teams)      finishes of team t in position p (0-based)
+      points    (n_teams, max_points+1) final points of team t
+      threshold (n_teams, max_points+1) final points of the team in position p
+    """
+    n_teams, n_fix = len(base_points), len(home)
+    max_points = int(base_points.max()) + 3 * n_fix
+    rng = np.random.default_rng(seed)
+
+    # With win = home win and no_away_win = home win or draw (as 0/1), home
+    # points are 2*win + no_away_win and away points 3 - win - 2*no_away_win,
+    # so every team's total is two matrix products over one-hot fixture maps
+    home_map = np.zeros((n_fix, n_teams), dtype=np.float32)
+    away_map = np.zeros((n_fix, n_teams), dtype=np.float32)
+    home_map[np.arange(n_fix), home] = 1.0
+    away_map[np.arange(n_fix), away] = 1.0
+    win_points = 2 * home_map - away_map
+    no_away_win_points = home_map - 2 * away_map
+    base = base_points.astype(np.int32) + 3 * away_map.sum(axis=0).astype(np.int32)
+
+    cum = np.cumsum(probs, axis=1).astype(np.float32)
+    home_win, no_away_win = cum[:, 0], cum[:, 1]
+
+    # Sort keys: points first, then the tiebreak rank (0..n_teams-1), so keys never tie
+    tb_rank = np.argsort(np.argsort(tiebreak, kind="stable"), kind="stable").astype(np.int32)
+
+    position = np.zeros(n_teams * n_teams, dtype=np.int64)
+    points = np.zeros(n_teams * (max_points + 1), dtype=np.int64)
+    threshold = np.zeros(n_teams * (max_points + 1), dtype=np.int64)
+    team_offsets = np.arange(n_teams, dtype=np.int32) * (max_points + 1)
+
+    chunk = max(1, chunk_elements // max(n_fix, 1))
+    done = 0
+    while done < n_sims:
+        c = min(chunk, n_sims - done)
+        u = rng.random((c, n_fix), dtype=np.float32)
+        won = (u < home_win).astype(np.float32)
+        not_lost = (u < no_away_win).astype(np.float32)
+        final = base + (won @ win_points + not_lost @ no_away_win_points).astype(np.int32)
+
+        order = np.argsort(-(final * n_teams + tb_rank), axis=1)  # best first
+        ranks = np.empty_like(order)
+        np.put_along_axis(ranks, order, np.arange(n_teams)[None, :], axis=1)
+
+        position += np.bincount((np.arange(n_teams) * n_teams + ranks).ravel(), minlength=n_teams * n_teams)
+        points += np.bincount((team_offsets + final).ravel(), minlength=len(points))
+        by_position = np.take_along_axis(final, order, axis=1)
+        threshold += np.bincount((team_offsets + by_position).ravel(), minlength=len(threshold))
+        done += c
+
+    return {
+        "position": position.reshape(n_teams, n_teams),
+        "points": points.reshape(n_teams, max_points + 1),
+        "threshold": threshold.reshape(n_teams, max_points + 1),
+        "n_sims": n_sims,
+    }
+
+
+def quantiles(counts: np.ndarray, qs=(0.05, 0.5, 0.95)):
+    """Quantiles of an integer distribution given as counts per value."""
+    cdf = np.cumsum(counts) / counts.sum()
+    return [int(np.searchsorted(cdf, q)) for q in qs]
+
+
+def summarize(result: dict, teams, team: str, positions=THRESHOLD_POSITIONS):
+    """Headline numbers for one team plus the points needed for key positions."""
+    t = list(teams).index(team)
+    n = result["n_sims"]
+    pts = result["points"][t]
+    pos = result["position"][t] / n
+    values = np.arange(len(pts))
+    out = {
+        "team": team,
+        "sims": n,
+        "points_mean": float((pts * values).sum() / n),
+        "points_p5_p50_p95": quantiles(pts),
+        "position_probabilities": {str(p + 1): float(pos[p]) for p in range(len(pos))},
+        "thresholds": {},
+    }
+    for p in positions:
+        if p <= len(teams):
+            counts = result["threshold"][p - 1]
+            out["thresholds"][str(p)] = {
+                "points_mean": float((counts * values).sum() / n),
+                "points_p5_p50_p95": quantiles(counts),
+                # chance the team finishes at least this high
+                "team_probability": float(pos[:p].sum()),
+            }
+    return out
+
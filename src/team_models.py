@@ -0,0 +1,316 @@
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from feature_spec import FEATURE_SETS, FORM_FEATURES, WINDOW, FeatureTransform
+from forest_engine import TOLERANCE, FlatForest, StaleExport, export_forest, load_flat, save_flat
+from model_registry import CHECK_INTERVAL, file_checksum
+
+TEAM_MODEL_DIR = os.path.join("outputs", "team_models")
+MANIFEST_FILE = "manifest.json"
+
+# Same columns, in the same order, as the Chelsea model (src/08_train_and_save_final_model.py)
+FEATURES = FEATURE_SETS["odds"]
+LABEL_MAP = {"Loss": 0, "Draw": 1, "Win": 2}
+
+# Final model settings from script 08
+FOREST_PARAMS = {"n_estimators": 500, "max_depth": 10, "random_state": 42, "class_weight": "balanced"}
+
+# Teams with fewer usable matches are served by the league-wide model
+MIN_MATCHES = 60
+
+# Key of the model trained on every team's matches
+LEAGUE = "_league"
+
+# Default cap on the forests held in memory per process
+MEMORY_CAP_MB = 32.0
+
+
+class ModelFileChanged(FileNotFoundError):
+    """A team model file no longer matches its manifest record (a retrain is rewriting it)."""
+
+
+class StaleModelFile(FileNotFoundError):
+    """A team model exported by an older version (no missing-value routing); the models must be retrained."""
+
+
+def model_file(team: str):
+    """Filesystem-safe .npz name for a team (or LEAGUE)."""
+    return "".join(c if c.isalnum() else "_" for c in team).strip("_").lower() + ".npz"
+
+
+def team_datasets(epl, min_matches: int = MIN_MATCHES):
+    """
+    {team: (X, y)} from every team's point of view, plus LEAGUE with all
+    rows. Rows are in date order and need complete form and odds, so
+    each team's first WINDOW matches are skipped.
+    """
+    from rolling_form import rolling_features
+    from team_perspective import build_team_perspective
+
+    perspective = build_team_perspective(epl, with_odds=True).reset_index(drop=True)
+    form = rolling_features(perspective, windows=(WINDOW,), ewm_spans=(), season=False)
+    df = perspective.join(form[FORM_FEATURES]).dropna(subset=FEATURES)
+    df = df.sort_values(["Date", "Team"], kind="stable")
+
+    X = df[FEATURES].to_numpy(dtype=np.float64)
+    y = df["Target"].map(LABEL_MAP).to_numpy(dtype=np.int64)
+    teams = df["Team"].astype(str).to_numpy()
+    datasets = {LEAGUE: (X, y)}
+    for team in sorted(set(teams)):
+        rows = teams == team
+        if rows.sum() >= min_matches:
+            datasets[team] = (X[rows], y[rows])
+    return datasets
+
+
+def train_team_model(team: str, X, y, out_dir: str = TEAM_MODEL_DIR, params: dict = None):
+    """
+    Fit one forest on the first 80% of a team's matches, score the last
+    20%, and save it as a flat export (no joblib: serving never needs
+    sklearn). Returns the manifest record for the team.
+    """
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score, log_loss
+
+    t0 = time.perf_counter()
+    split = int(len(X) * 0.8)
+    model = RandomForestClassifier(**(params or FOREST_PARAMS), n_jobs=1)
+    model.fit(X[:split], y[:split])
+    fit_seconds = time.perf_counter() - t0
+
+    arrays = export_forest(model)
+    reference = model.predict_proba(X[split:])
+    max_diff = float(np.abs(FlatForest(arrays).predict_proba(X[split:]) - reference).max())
+    if max_diff > TOLERANCE:
+        raise ValueError(f"Flat export of the {team} model deviates by {max_diff}.")
+
+    path = os.path.join(out_dir, model_file(team))
+    save_flat(path, arrays, FEATURES, {v: k for k, v in LABEL_MAP.items()}, max_diff=max_diff,
+              feature_spec=FeatureTransform(FEATURES).spec())
+    return {
+        "team": team,
+        "file": os.path.basename(path),
+        "checksum": file_checksum(path),
+        "bytes": os.path.getsize(path),
+        "train_rows": split,
+        "test_rows": len(X) - split,
+        "accuracy": float(accuracy_score(y[split:], model.classes_[reference.argmax(axis=1)])),
+        "log_loss": float(log_loss(y[split:], reference, labels=model.classes_)),
+        "fit_seconds": fit_seconds,
+    }
+
+
+def train_team_models(datasets: dict, out_dir: str = TEAM_MODEL_DIR, workers: int = None, params: dict = None,
+                      source: str = None):
+    """
+    Train every dataset's model concurrently, one forest per process (each
+    with n_jobs=1), and write the manifest. The league model is the largest
+    job, so it is submitted first.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or min(len(datasets), os.cpu_count() or 1)
+    order = sorted(datasets, key=lambda t: -len(datasets[t][1]))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {t: pool.submit(train_team_model, t, *datasets[t], out_dir, params) for t in order}
+        records = {t: futures[t].result() for t in sorted(datasets)}
+
+    manifest = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "source": source,
+        "features": FEATURES,
+        "params": params or FOREST_PARAMS,
+        "league": records.pop(LEAGUE, None),
+        "teams": records,
+    }
+    with open(os.path.join(out_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+class TeamModelRegistry:
+    """
+    Serves one model per team, loading each flat forest on its first
+    request and keeping the most recently used ones in memory.
+
+    When the resident forests exceed memory_cap_mb, the least recently used
+    are evicted (the one just loaded always stays). Teams without a model
+    of their own use the league-wide one. A retrain (a new manifest) is
+    picked up within check_interval seconds; forests whose file changed are
+    dropped and reload on their next request. A file is only served under
+    the manifest record whose checksum it matches.
+
+    Entries have the same keys as ModelRegistry entries plus "model" (the
+    team, or LEAGUE) and "scope" ("team" or "league"), so they can go
+    straight to predict_rows.
+    Each process keeps its own cache; nothing is loaded before first use.
+
+    on_load, if given, is called as on_load(result, seconds) with result
+    "loaded" or "error", and on_event(event, n) for "hit" and "eviction".
+    """
+
+    def __init__(self, model_dir: str = TEAM_MODEL_DIR, memory_cap_mb: float = MEMORY_CAP_MB,
+                 check_interval: float = CHECK_INTERVAL, on_load=None, on_event=None):
+        self.model_dir = model_dir
+        self.memory_cap = int(memory_cap_mb * 1e6)
+        self.check_interval = check_interval
+        self.on_load = on_load
+        self.on_event = on_event
+        self._resident = OrderedDict()
+        self._loading = {}
+        self._lock = threading.Lock()
+        self._manifest = None
+        self._manifest_stat = None
+        self._last_check = 0.0
+        self.stats = {"loads": 0, "hits": 0, "evictions": 0, "errors": 0}
+        self.load_seconds_total = 0.0
+
+    def _notify(self, fn, *args):
+        if fn is not None:
+            fn(*args)
+
+    def manifest(self, force: bool = False):
+        """The training manifest, re-read when the file changes (checked now with force)."""
+        now = time.monotonic()
+        if not force and self._manifest is not None and now - self._last_check < self.check_interval:
+            return self._manifest
+        self._last_check = now
+        path = os.path.join(self.model_dir, MANIFEST_FILE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No team models in {self.model_dir}. Run src/20_train_team_models.py first.")
+        st = os.stat(path)
+        stat_key = (st.st_mtime_ns, st.st_size)
+        if stat_key != self._manifest_stat:
+            with open(path) as f:
+                manifest = json.load(f)
+            with self._lock:
+                self._manifest, self._manifest_stat = manifest, stat_key
+                records = self._records(manifest)
+                for key in [k for k, e in self._resident.items() if records.get(k, {}).get("checksum") != e["checksum"]]:
+                    del self._resident[key]
+        return self._manifest
+
+    @staticmethod
+    def _records(manifest):
+        records = dict(manifest["teams"])
+        if manifest.get("league"):
+            records[LEAGUE] = manifest["league"]
+        return records
+
+    def teams(self):
+        return sorted(self.manifest()["teams"])
+
+    def entry(self, team: str):
+        """The entry for a team's model (or the league model), loading it on first use."""
+        manifest = self.manifest()
+        key = team if team in manifest["teams"] else LEAGUE
+        if key == LEAGUE and not manifest.get("league"):
+            raise ValueError(f"No model for '{team}' and no league-wide model to fall back on.")
+
+        with self._lock:
+            entry = self._resident.get(key)
+            if entry is not None:
+                self._resident.move_to_end(key)
+                self.stats["hits"] += 1
+            lock = self._loading.setdefault(key, threading.Lock())
+        if entry is not None:
+            self._notify(self.on_event, "hit", 1)
+            return entry
+
+        # One thread loads a given team; others asking for it wait for that load
+        with lock:
+            with self._lock:
+                entry = self._resident.get(key)
+            if entry is None:
+                entry = self._load(key, self._records(manifest)[key])
+        return entry
+
+    def _read_checked(self, key: str, record: dict):
+        """
+        The model file's bytes and the manifest record they match. Retrains
+        rewrite the files before the manifest, so on a mismatch the manifest
+        is re-read once; if it still disagrees, ModelFileChanged is raised.
+        """
+        path = os.path.join(self.model_dir, record["file"])
+        with open(path, "rb") as f:
+            data = f.read()
+        checksum = hashlib.sha256(data).hexdigest()  # as file_checksum
+        if checksum != record["checksum"]:
+            record = self._records(self.manifest(force=True)).get(key, {})
+            if checksum != record.get("checksum"):
+                raise ModelFileChanged(f"{path} does not match the team model manifest (retrain in progress?).")
+        return data, record
+
+    def _load(self, key: str, record: dict):
+        t0 = time.perf_counter()
+        try:
+            # Checksum and forest come from the same bytes, so the version label is always the loaded file's
+            data, record = self._read_checked(key, record)
+            try:
+                bundle = load_flat(io.BytesIO(data))
+            except StaleExport as e:
+                raise StaleModelFile(f"{record['file']}: {e} Run src/20_train_team_models.py.") from None
+        except Exception:
+            self.stats["errors"] += 1
+            self._notify(self.on_load, "error", time.perf_counter() - t0)
+            raise
+        seconds = time.perf_counter() - t0
+        entry = {
+            "bundle": bundle,
+            "artifact": "flat",
+            "checksum": record["checksum"],
+            "version": record["checksum"][:12],
+            "scope": "league" if key == LEAGUE else "team",
+            "model": key,
+            "bytes": bundle["engine"].nbytes,
+            "loaded_at": time.time(),
+            "load_seconds": seconds,
+        }
+        with self._lock:
+            self._resident[key] = entry
+            self.stats["loads"] += 1
+            self.load_seconds_total += seconds
+            evicted = self._evict(keep=key)
+        self._notify(self.on_load, "loaded", seconds)
+        if evicted:
+            self._notify(self.on_event, "eviction", evicted)
+        return entry
+
+    def _evict(self, keep: str):
+        evicted = 0
+        while self.resident_bytes() > self.memory_cap and len(self._resident) > 1:
+            key = next(k for k in self._resident if k != keep)
+            del self._resident[key]
+            evicted += 1
+        self.stats["evictions"] += evicted
+        return evicted
+
+    def resident_bytes(self):
+        return sum(e["bytes"] for e in self._resident.values())
+
+    def info(self):
+        with self._lock:
+            resident = [
+                {"model": k, "version": e["version"], "megabytes": round(e["bytes"] / 1e6, 3),
+                 "load_ms": round(e["load_seconds"] * 1000, 2)}
+                for k, e in reversed(self._resident.items())  # most recently used first
+            ]
+            used = self.resident_bytes()
+        loads = self.stats["loads"]
+        return {
+            "model_dir": self.model_dir,
+            "available": len(self._manifest["teams"]) if self._manifest is not None else None,
+            "resident": resident,
+            "resident_megabytes": round(used / 1e6, 3),
+            "memory_cap_megabytes": self.memory_cap / 1e6,
+            "mean_load_ms": round(self.load_seconds_total / loads * 1000, 2) if loads else None,
+            "pid": os.getpid(),
+            **self.stats,
+        }
@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+
+from bookmaker_odds import CONSENSUS_COLS, consensus_odds, orient
+
+REQUIRED_COLS = ["Date", "HomeTeam", "AwayTeam", "FTHG", "FTAG", "FTR"]
+
+PERSPECTIVE_COLS = [
+    "Date", "SeasonTag", "Team", "HomeTeam", "AwayTeam", "Opponent",
+    "IsHome", "FTHG", "FTAG", "GoalsFor", "GoalsAgainst", "FTR", "Target",
+]
+
+ODDS_COLS = ["B365H", "B365D", "B365A"]
+ORIENTED_ODDS_COLS = ["Odds_Win", "Odds_Draw", "Odds_Loss"]
+
+
+def build_team_perspective(epl: pd.DataFrame, with_odds: bool = False):
+    """
+    Reshape match rows (one per fixture) into a long "team perspective" table
+    with two rows per match: one for the home side and one for the away side.
+
+    Team / Opponent / IsHome / GoalsFor / GoalsAgainst / Target are all from
+    the point of view of "Team". Only vectorized column operations are used,
+    so this scales to many seasons and leagues.
+
+    With with_odds=True the B365 prices are added as Odds_Win / Odds_Draw /
+    Odds_Loss for "Team", along with the all-bookmaker consensus columns
+    from bookmaker_odds.consensus_odds().
+
+    The result is sorted by (Team, Date) and indexed by Team, so one club's
+    matches are a cheap .loc lookup (see team_matches()).
+    """
+    missing = [c for c in REQUIRED_COLS if c not in epl.columns]
+    if missing:
+        raise ValueError(f"Missing required columns: {missing}")
+
+    base = epl.copy()
+    if not pd.api.types.is_datetime64_any_dtype(base["Date"]):
+        # football-data uses day-first dates
+        base["Date"] = pd.to_datetime(base["Date"], dayfirst=True, errors="coerce")
+    base = base.dropna(subset=["Date"])
+    if "SeasonTag" not in base.columns:
+        base["SeasonTag"] = ""
+
+    home = base.assign(
+        Team=base["HomeTeam"], Opponent=base["AwayTeam"], IsHome=1,
+        GoalsFor=base["FTHG"], GoalsAgainst=base["FTAG"],
+    )
+    away = base.assign(
+        Team=base["AwayTeam"], Opponent=base["HomeTeam"], IsHome=0,
+        GoalsFor=base["FTAG"], GoalsAgainst=base["FTHG"],
+    )
+    cols = list(PERSPECTIVE_COLS)
+    if with_odds:
+        cols += ORIENTED_ODDS_COLS + CONSENSUS_COLS
+    long = pd.concat([home, away], ignore_index=True)
+
+    if with_odds:
+        is_home = long["IsHome"].to_numpy() == 1
+        b365 = long.reindex(columns=ODDS_COLS).to_numpy(dtype=float)
+        long[ORIENTED_ODDS_COLS] = orient(b365, is_home)
+        long = pd.concat([long, consensus_odds(long, is_home)], axis=1)
+
+    # FTR: H=home win, D=draw, A=away win -> Win/Draw/Loss for "Team"
+    team_won = np.where(long["IsHome"] == 1, long["FTR"] == "H", long["FTR"] == "A")
+    long["Target"] = np.select(
+        [long["FTR"] == "D", team_won],
+        ["Draw", "Win"],
+        default="Loss",
+    )
+
+    long = long[cols]
+    long = long.sort_values(["Team", "Date"], kind="stable").set_index("Team", drop=False)
+    long.index.name = None
+    return long
+
+
+def team_matches(perspective: pd.DataFrame, team: str):
+    """All matches for one team in chronological order (empty if unknown)."""
+    if team not in perspective.index:
+        return perspective.iloc[0:0].reset_index(drop=True)
+    rows = perspective.loc[[team]]
+    return rows.sort_values("Date", kind="stable").reset_index(drop=True)
@@ -0,0 +1,13 @@
+import time
+
+import numpy as np
+
+
+def median_ms(fn, calls):
+    """Median wall time of fn() over `calls` calls, in milliseconds."""
+    times = []
+    for _ in range(calls):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times) * 1000)
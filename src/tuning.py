@@ -0,0 +1,178 @@
+import hashlib
+import json
+import math
+import os
+import tempfile
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import ParameterSampler, TimeSeriesSplit
+
+from backtest import class_proba, probabilistic_scores
+
+CHECKPOINT_PATH = os.path.join("outputs", "tuning", "halving_checkpoint.jsonl")
+
+ETA = 3            # keep the best 1/ETA of candidates at every rung
+MIN_TREES = 10     # smallest forest fitted in the first rung
+MIN_WINDOW = 30    # fewest (most recent) training rows per fold in the first rung
+RANK_BY = "log_loss"
+
+
+def time_series_folds(n_rows: int, n_splits: int = 5):
+    """TimeSeriesSplit folds as (train_end, test_start, test_end): every split is contiguous."""
+    return [
+        (int(train[-1]) + 1, int(test[0]), int(test[-1]) + 1)
+        for train, test in TimeSeriesSplit(n_splits=n_splits).split(np.zeros(n_rows))
+    ]
+
+
+def rung_schedule(n_candidates: int, eta: int = ETA):
+    """(n_candidates, budget fraction) per rung: the last rung uses the full trees and window."""
+    n_rungs = max(1, math.ceil(math.log(n_candidates, eta))) if n_candidates > 1 else 1
+    schedule = []
+    for r in range(n_rungs):
+        keep = max(1, math.ceil(n_candidates / eta ** r))
+        schedule.append((keep, float(eta) ** (r - n_rungs + 1)))
+    return schedule
+
+
+def _share(X, y, data_dir: str):
+    """Write the fold data once; workers memory-map it instead of receiving pickled copies."""
+    np.save(os.path.join(data_dir, "X.npy"), np.ascontiguousarray(np.asarray(X, dtype=np.float32)))
+    np.save(os.path.join(data_dir, "y.npy"), np.asarray(y))
+
+
+def _evaluate(data_dir, cand, rung, params, budget, folds, random_state):
+    """Fit one candidate at one rung's budget on every fold; runs in a worker."""
+    X = np.load(os.path.join(data_dir, "X.npy"), mmap_mode="r")
+    y = np.load(os.path.join(data_dir, "y.npy"), mmap_mode="r")
+
+    params = dict(params)
+    trees = max(MIN_TREES, math.ceil(params.pop("n_estimators") * budget))
+    t0 = time.perf_counter()
+    y_true, proba = [], []
+    for train_end, test_start, test_end in folds:
+        window = min(train_end, max(MIN_WINDOW, math.ceil(train_end * budget)))
+        X_train, y_train = X[train_end - window:train_end], y[train_end - window:train_end]
+
+        model = RandomForestClassifier(**params, n_estimators=trees, random_state=random_state, n_jobs=1)
+        model.fit(X_train, y_train)
+
+        proba.append(class_proba(model, X[test_start:test_end]))
+        y_true.append(np.asarray(y[test_start:test_end]))
+
+    return {
+        "candidate": cand, "rung": rung, "trees": trees, "budget": budget,
+        "seconds": time.perf_counter() - t0,
+        **probabilistic_scores(np.concatenate(y_true), np.vstack(proba)),
+    }
+
+
+def _settings_key(settings: dict):
+    return hashlib.sha256(json.dumps(settings, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _load_checkpoint(path: str, key: str, restart: bool):
+    """Evaluations already recorded by an earlier (interrupted) run of the same search."""
+    if restart or not os.path.exists(path):
+        return None
+    done = {}
+    with open(path) as f:
+        lines = f.readlines()
+    header = json.loads(lines[0]) if lines else {}
+    if header.get("key") != key:
+        raise ValueError(f"{path} belongs to a different search; pass --restart to discard it.")
+    good = 1
+    for line in lines[1:]:
+        try:
+            rec = json.loads(line)
+        except json.JSONDecodeError:
+            break  # partly written last line of an interrupted run
+        done[(rec["candidate"], rec["rung"])] = rec
+        good += 1
+    if good < len(lines) or not lines[-1].endswith("\n"):
+        with open(path, "w") as f:
+            f.writelines(line if line.endswith("\n") else line + "\n" for line in lines[:good])
+    return done
+
+
+def successive_halving(X, y, param_dist, n_iter: int = 25, n_splits: int = 5, eta: int = ETA,
+                       rank_by: str = RANK_BY, random_state: int = 42, n_jobs: int = -1,
+                       checkpoint: str = CHECKPOINT_PATH, restart: bool = False, log=print):
+    """
+    Random-forest search with successive halving over tree count and
+    training-window size.
+
+    All n_iter sampled candidates start on a small budget (a fraction of
+    their n_estimators, fitted on the most recent fraction of each fold's
+    training rows). After each rung only the best 1/eta by `rank_by` carry
+    on to the next rung, whose budget is eta times larger; the last rung
+    uses the full trees and window. Every evaluation is scored on all
+    TimeSeriesSplit folds (accuracy, log loss, Brier, RPS).
+
+    X / y are written once to memory-mapped .npy files that the worker
+    processes open, and every finished evaluation is appended to the
+    `checkpoint` file, so rerunning an interrupted search skips the work
+    already done.
+
+    Returns (best, records): the winner's record and every evaluation.
+    """
+    candidates = list(ParameterSampler(param_dist, n_iter=n_iter, random_state=random_state))
+    folds = time_series_folds(len(X), n_splits)
+    schedule = rung_schedule(len(candidates), eta)
+    lower_is_better = rank_by != "accuracy"
+
+    settings = {"candidates": candidates, "folds": folds, "schedule": schedule,
+                "rank_by": rank_by, "random_state": random_state, "rows": len(X)}
+    key = _settings_key(settings)
+    done = _load_checkpoint(checkpoint, key, restart)
+    os.makedirs(os.path.dirname(checkpoint) or ".", exist_ok=True)
+    if done is None:
+        done = {}
+        with open(checkpoint, "w") as f:
+            f.write(json.dumps({"key": key, "settings": settings}, default=str) + "\n")
+    elif done:
+        log(f"Resuming: {len(done)} evaluations loaded from {checkpoint}")
+
+    records = []
+    alive = list(range(len(candidates)))
+    with tempfile.TemporaryDirectory(prefix="tune_") as data_dir:
+        _share(X, y, data_dir)
+        for rung, (keep, budget) in enumerate(schedule):
+            todo = [c for c in alive if (c, rung) not in done]
+            t0 = time.perf_counter()
+            jobs = (
+                delayed(_evaluate)(data_dir, c, rung, candidates[c], budget, folds, random_state)
+                for c in todo
+            )
+            with open(checkpoint, "a") as f:
+                for rec in Parallel(n_jobs=n_jobs, return_as="generator")(jobs):
+                    f.write(json.dumps(rec) + "\n")
+                    f.flush()
+                    done[(rec["candidate"], rung)] = rec
+
+            results = [done[(c, rung)] for c in alive]
+            results.sort(key=lambda r: r[rank_by], reverse=not lower_is_better)
+            records.extend(results)
+            log(f"Rung {rung}: {len(alive)} candidates, budget {budget:.3f} "
+                f"({len(todo)} fitted in {time.perf_counter() - t0:.1f} s), best {rank_by} {results[0][rank_by]:.4f}")
+            if rung + 1 < len(schedule):
+                alive = [r["candidate"] for r in results[:schedule[rung + 1][0]]]
+
+    for rec in records:
+        rec["params"] = candidates[rec["candidate"]]
+    best = records[-len(alive):][0]
+    return best, records
+
+
+def candidate_times(records):
+    """Total wall time per candidate across every rung and fold, slowest first."""
+    totals = {}
+    for rec in records:
+        entry = totals.setdefault(rec["candidate"], {"candidate": rec["candidate"], "params": rec["params"],
+                                                    "rungs": 0, "seconds": 0.0})
+        entry["rungs"] += 1
+        entry["seconds"] += rec["seconds"]
+    return sorted(totals.values(), key=lambda e: e["seconds"], reverse=True)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+PROCESSED_DIR = os.path.join(ROOT, "data", "processed")
+RAW_DIR = os.path.join(ROOT, "data", "raw")
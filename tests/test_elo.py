@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from conftest import PROCESSED_DIR
+from elo import EloState, match_elo
+from pipeline import read_processed
+
+
+def load_epl():
+    epl = read_processed(os.path.join(PROCESSED_DIR, "epl_all_seasons.csv"), low_memory=False)
+    epl["Date"] = pd.to_datetime(epl["Date"], dayfirst=True, errors="coerce")
+    return epl
+
+
+def test_update_matches_match_elo():
+    epl = load_epl()
+    rows, state = match_elo(epl)
+
+    ordered = epl.sort_values("Date", kind="stable")
+    one_by_one = EloState()
+    pre = [one_by_one.update(h, a, hg, ag, d.strftime("%Y-%m-%d")) for h, a, hg, ag, d in
+           zip(ordered["HomeTeam"], ordered["AwayTeam"], ordered["FTHG"], ordered["FTAG"], ordered["Date"])]
+    np.testing.assert_array_equal(np.array(pre), rows[["Elo_Home", "Elo_Away"]].to_numpy())
+    assert one_by_one.to_dict() == state.to_dict()
+
+
+def test_match_elo_continues_from_state():
+    epl = load_epl().sort_values("Date", kind="stable").reset_index(drop=True)
+    rows, state = match_elo(epl)
+
+    split = len(epl) - 50
+    head, saved = match_elo(epl.iloc[:split])
+    tail, saved = match_elo(epl.iloc[split:], EloState.from_dict(saved.to_dict()))
+    pd.testing.assert_frame_equal(pd.concat([head, tail], ignore_index=True), rows, check_exact=True)
+    assert saved.to_dict() == state.to_dict()
@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from conftest import PROCESSED_DIR
+from forest_compaction import collapse_subtrees, leaf_values_only, shrink_dtypes
+from forest_engine import FlatForest, StaleExport, export_forest, load_flat, save_flat
+
+LABEL_MAP = {"Loss": 0, "Draw": 1, "Win": 2}
+INV_LABEL_MAP = {v: k for k, v in LABEL_MAP.items()}
+FEATURES = ["FormPoints_5", "GoalDiff_5", "Elo_Diff", "Odds_Win", "Odds_Draw", "Odds_Loss"]
+
+
+@pytest.fixture(scope="module")
+def data():
+    df = pd.read_csv(os.path.join(PROCESSED_DIR, "chelsea_features_odds_plus.csv"))
+    X = df[FEATURES].to_numpy(dtype=float)
+    y = df["Target"].map(LABEL_MAP).to_numpy()
+    rng = np.random.default_rng(0)
+    # Train with some missing values so splits learn where NaN goes
+    X_train = X.copy()
+    X_train[rng.random(X.shape) < 0.1] = np.nan
+    model = RandomForestClassifier(n_estimators=25, max_depth=6, random_state=0).fit(X_train, y)
+
+    missing = X[rng.integers(0, len(X), 500)]
+    missing[rng.random(missing.shape) < 0.25] = np.nan
+    jitter = X[rng.integers(0, len(X), 500)] * rng.uniform(0.7, 1.3, size=(500, X.shape[1]))
+    return model, np.vstack([X, jitter, missing])
+
+
+def test_flat_forest_matches_sklearn(data):
+    model, X = data
+    flat = FlatForest(export_forest(model))
+    assert (flat.predict_proba(X) == model.predict_proba(X)).all()
+    assert (flat.predict(X) == model.predict(X)).all()
+
+
+def test_exact_compaction_keeps_predictions(data):
+    model, X = data
+    arrays = leaf_values_only(shrink_dtypes(collapse_subtrees(export_forest(model))))
+    assert (FlatForest(arrays).predict_proba(X) == model.predict_proba(X)).all()
+
+
+def test_nan_without_routing_is_rejected(data):
+    model, X = data
+    arrays = export_forest(model)
+    del arrays["missing_left"]
+    flat = FlatForest(arrays)
+    flat.predict_proba(X[:10])
+    with pytest.raises(ValueError):
+        flat.predict_proba(X[-500:])
+    with pytest.raises(ValueError):
+        FlatForest(export_forest(model)).predict_proba(np.full((1, X.shape[1]), np.inf))
+
+
+def test_export_without_routing_is_rejected_at_load(data, tmp_path):
+    model, X = data
+    arrays = export_forest(model)
+    path = str(tmp_path / "flat.npz")
+    save_flat(path, arrays, FEATURES, INV_LABEL_MAP)
+    assert (load_flat(path)["engine"].predict_proba(X) == model.predict_proba(X)).all()
+
+    del arrays["missing_left"]
+    save_flat(path, arrays, FEATURES, INV_LABEL_MAP)
+    with pytest.raises(StaleExport):
+        load_flat(path)
@@ -0,0 +1,45 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from conftest import PROCESSED_DIR, RAW_DIR
+from form_index import ARRAYS, FormIndex, build_form_index, update_form_index
+from ingest import read_raw_file
+from pipeline import read_processed
+
+# Oldest season first, so the last one brings promoted teams
+SEASONS = ["E0.csv"] + [f"E0 ({i}).csv" for i in range(1, 6)]
+
+
+def assert_same_index(dir_a, dir_b):
+    a, b = FormIndex(dir_a), FormIndex(dir_b)
+    assert a.teams == b.teams
+    assert a.meta["last_date"] == b.meta["last_date"]
+    for name in ARRAYS:
+        assert np.array_equal(getattr(a, name), getattr(b, name), equal_nan=name in ("form", "odds", "elo", "latest"))
+
+
+def test_update_matches_full_build(tmp_path):
+    parts = [read_raw_file(os.path.join(RAW_DIR, name)) for name in SEASONS]
+    epl = pd.concat(parts, ignore_index=True)
+    full_dir, inc_dir = str(tmp_path / "full"), str(tmp_path / "incremental")
+    build_form_index(epl, full_dir)
+
+    # A new season (with promoted teams), then a few matches at a time
+    build_form_index(pd.concat(parts[:-1], ignore_index=True), inc_dir)
+    last = parts[-1]
+    for start in range(0, len(last), 150):
+        update_form_index(last.iloc[start:start + 150], inc_dir)
+    assert set(parts[-1]["HomeTeam"]) - set(parts[-2]["HomeTeam"])
+    assert_same_index(inc_dir, full_dir)
+
+
+def test_fixture_elo_matches_pipeline(tmp_path):
+    epl = read_processed(os.path.join(PROCESSED_DIR, "epl_all_seasons.csv"), low_memory=False)
+    build_form_index(epl, str(tmp_path))
+    index = FormIndex(str(tmp_path))
+    matches = read_processed(os.path.join(PROCESSED_DIR, "chelsea_matches.csv"))
+    for row in matches.tail(20).itertuples():
+        found = index.lookup("Chelsea", row.Date, row.Opponent)
+        assert found["elo"] == [row.Elo_Team, row.Elo_Opp]
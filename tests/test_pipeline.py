@@ -0,0 +1,46 @@
+import os
+import shutil
+
+import numpy as np
+
+from conftest import RAW_DIR
+from form_index import ARRAYS, FormIndex
+from pipeline import compare_outputs, full_build, incremental_update
+
+LATEST = "E0 (5).csv"
+
+
+def copy_raw(dest, drop_last=0):
+    os.makedirs(dest)
+    for name in os.listdir(RAW_DIR):
+        shutil.copy(os.path.join(RAW_DIR, name), dest)
+    if drop_last:
+        path = os.path.join(dest, LATEST)
+        with open(path) as f:
+            lines = f.readlines()
+        with open(path, "w") as f:
+            f.writelines(lines[:-drop_last])
+
+
+def test_incremental_update_matches_full_build(tmp_path):
+    raw = str(tmp_path / "raw")
+    copy_raw(raw, drop_last=20)
+    inc_dir, inc_index = str(tmp_path / "incremental"), str(tmp_path / "incremental_index")
+    full_build(raw, inc_dir, index_dir=inc_index)
+
+    # The rest of the season arrives
+    shutil.copy(os.path.join(RAW_DIR, LATEST), raw)
+    mode, counts = incremental_update(raw, inc_dir, index_dir=inc_index)
+    assert mode == "incremental"
+    assert counts["epl"] == 20
+
+    full_dir, full_index = str(tmp_path / "full"), str(tmp_path / "full_index")
+    full_build(RAW_DIR, full_dir, index_dir=full_index)
+    assert compare_outputs(inc_dir, full_dir) == []
+
+    assert incremental_update(raw, inc_dir, index_dir=inc_index)[0] == "up-to-date"
+    # The rebuilt form index serves the same form as a fresh one
+    inc, full = FormIndex(inc_index), FormIndex(full_index)
+    assert inc.teams == full.teams
+    for name in ARRAYS:
+        assert np.array_equal(getattr(inc, name), getattr(full, name), equal_nan=name in ("form", "odds"))
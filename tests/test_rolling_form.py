@@ -0,0 +1,49 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from conftest import PROCESSED_DIR
+from pipeline import _replay_form, add_rolling_form, add_rolling_form_incremental, read_processed
+from rolling_form import FormState, build_form_states, rolling_features
+from team_perspective import build_team_perspective
+
+
+def perspective():
+    epl = read_processed(os.path.join(PROCESSED_DIR, "epl_all_seasons.csv"), low_memory=False)
+    long = build_team_perspective(epl).reset_index(drop=True)
+    # Calendar-year seasons so the season features reset along the way
+    long["SeasonTag"] = long["Date"].dt.year.astype(str)
+    return long
+
+
+def test_form_state_matches_rolling_features():
+    long = perspective()
+    expected = rolling_features(long)
+
+    states = {}
+    rows = []
+    for team, target, gf, ga, tag in zip(long["Team"], long["Target"], long["GoalsFor"],
+                                         long["GoalsAgainst"], long["SeasonTag"]):
+        state = states.setdefault(team, FormState())
+        rows.append(state.features(tag))
+        state.update(target, gf, ga, tag)
+    got = pd.DataFrame(rows, index=long.index)[expected.columns]
+    np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), rtol=1e-12, atol=1e-12)
+
+    # Replaying each team, with a JSON round trip, ends in the same state
+    replayed = build_form_states(long)
+    for team, state in states.items():
+        restored = FormState.from_dict(replayed[team].to_dict())
+        assert restored.features() == state.features()
+
+
+def test_incremental_form_matches_add_rolling_form():
+    matches = read_processed(os.path.join(PROCESSED_DIR, "chelsea_matches.csv"), parse_dates=["Date"])
+    expected = add_rolling_form(matches)
+
+    split = len(matches) - 30
+    form = _replay_form(matches.iloc[:split])
+    new = add_rolling_form_incremental(matches.iloc[split:], form)
+    pd.testing.assert_frame_equal(new, expected.tail(len(new)).reset_index(drop=True), check_exact=True)
+    assert form.to_dict() == _replay_form(matches).to_dict()
@@ -1,108 +1,471 @@
-from flask import Flask, render_template, request
-import joblib
+import time
+
+_import_start = time.perf_counter()
+
+from flask import Flask, Response, jsonify, render_template, request
 import os
-import pandas as pd
-import re
+import sys
+import numpy as np
+
+# Shared helpers live in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from batching import MAX_BATCH, MicroBatcher
+from elo import ELO_PATH, EloRatings
+from feature_spec import ELO_FIELDS, FeatureError, has_form
+from forest_engine import FLAT_PATH
+from form_index import INDEX_DIR, ReloadingFormIndex, lookup_context, to_day
+from metrics import Metrics, RequestTimer
+from model_registry import MODEL_PATH, ModelRegistry, format_startup
+from odds_surface import score_surface, surface_json
+from prediction_cache import CACHE_SIZE, PredictionCache
+from team_models import MEMORY_CAP_MB, TEAM_MODEL_DIR, TeamModelRegistry
 
 app = Flask(__name__)
 
-MODEL_PATH = os.path.join("outputs", "final_rf_model.joblib")
+# Request timings and counters, summed over all gunicorn workers at /metrics
+metrics = Metrics()
+
+
+def record_model_load(result, seconds):
+    metrics.inc("chelsea_model_loads_total", result=result)
+    if result == "loaded":
+        metrics.observe("chelsea_model_load_seconds", seconds)
+
+
+# Cold-start report, shown at /api/model. Nothing here imports pandas or
+# sklearn, and the model normally loads from the flat export (see
+# model_registry), so a new process is ready in well under a second.
+# first_prediction_seconds is per process (each gunicorn worker's first request).
+startup = {"import_seconds": time.perf_counter() - _import_start, "model_load_seconds": None,
+           "artifact": None, "first_prediction_seconds": None}
+
+# One registry per process. Loading here (at import) lets gunicorn --preload
+# load the forest once in the master so forked workers share it.
+# FLAT_MODEL_PATH can point at a compacted forest (src/18_compact_forest.py)
+# to fit more workers per box.
+registry = ModelRegistry(MODEL_PATH, on_load=record_model_load,
+                         flat_path=os.environ.get("FLAT_MODEL_PATH") or FLAT_PATH)
+if os.path.exists(MODEL_PATH):
+    _load_start = time.perf_counter()
+    startup["artifact"] = registry.load()["artifact"]
+    startup["model_load_seconds"] = time.perf_counter() - _load_start
+
+# Other clubs' models (src/20_train_team_models.py) load on their first
+# request; the least recently used are dropped past TEAM_MODELS_MEMORY_MB
+def record_team_model_load(result, seconds):
+    metrics.inc("chelsea_team_model_loads_total", result=result)
+    if result == "loaded":
+        metrics.observe("chelsea_team_model_load_seconds", seconds)
+
+
+def record_team_model_event(event, n):
+    metrics.inc("chelsea_team_model_cache_total", n, event=event)
+
+
+team_registry = TeamModelRegistry(
+    os.environ.get("TEAM_MODEL_DIR") or TEAM_MODEL_DIR,
+    memory_cap_mb=float(os.environ.get("TEAM_MODELS_MEMORY_MB", MEMORY_CAP_MB)),
+    on_load=record_team_model_load,
+    on_event=record_team_model_event,
+)
+
+# Identical requests (same fixture, same quoted odds) skip the forest walk.
+# Set PREDICTION_CACHE_DIR to also share cached predictions between workers.
+def record_cache_event(event, n):
+    metrics.inc("chelsea_prediction_cache_total", n, event=event)
+
+
+prediction_cache = PredictionCache(
+    maxsize=int(os.environ.get("PREDICTION_CACHE_SIZE", CACHE_SIZE)),
+    shared_dir=os.environ.get("PREDICTION_CACHE_DIR") or None,
+    on_event=record_cache_event,
+)
+
+# Optional micro-batching: with MICROBATCH_MAX_WAIT_MS set, concurrent requests
+# in one worker (gunicorn -k gthread --threads N) share a single model call
+def score(entry, X):
+    if entry.get("scope") is not None:
+        # Team models skip the prediction cache, which holds one model version at a time
+        return entry["bundle"]["engine"].predict_proba(X)
+    return prediction_cache.predict_proba(entry["version"], entry["bundle"]["engine"], X)
+
+
+def record_batch(requests, rows, waits):
+    metrics.observe("chelsea_batch_requests", requests)
+    metrics.observe("chelsea_batch_rows", rows)
+    for wait in waits:
+        metrics.observe("chelsea_batch_wait_seconds", wait)
+
+
+def record_queue_depth(depth):
+    metrics.observe("chelsea_batch_queue_depth", depth)
+
+
+_max_wait_ms = float(os.environ.get("MICROBATCH_MAX_WAIT_MS") or 0)
+batcher = MicroBatcher(
+    score,
+    max_wait=_max_wait_ms / 1000,
+    max_batch=int(os.environ.get("MICROBATCH_MAX_BATCH", MAX_BATCH)),
+    on_batch=record_batch,
+    on_queue=record_queue_depth,
+) if _max_wait_ms > 0 else None
+
+# Precomputed per-team form (src/16_build_form_index.py), memory-mapped so
+# a fixture can be named by date/opponent instead of typing scorelines;
+# reopened when src/13_update_features.py rebuilds it
+TEAM = "Chelsea"
+form_index = ReloadingFormIndex(INDEX_DIR)
+
+# Current Elo ratings (src/elo.py), kept up to date by src/13_update_features.py
+# and re-read when the file changes
+elo_ratings = EloRatings(os.environ.get("ELO_RATINGS_PATH") or ELO_PATH)
+
+# Bad input the user can fix; anything else is a bug and is logged
+INPUT_ERRORS = (KeyError, TypeError, ValueError, FileNotFoundError)
+
+
+def fixture_team(fixture: dict):
+    """The club a fixture is predicted for ("team", Chelsea by default), as spelled in the data."""
+    team = str(fixture.get("team") or TEAM).strip()
+    index = form_index.current()
+    if index is not None:
+        team = index.teams[index.team_id(team)]
+    return team
+
+
+def model_entry(team: str):
+    """Chelsea's own model, or the team (or league-wide) model for any other club."""
+    return registry.entry() if team == TEAM else team_registry.entry(team)
+
+
+def lookup_form(fixture: dict, team: str = TEAM):
+    index = form_index.current()
+    if index is None:
+        raise ValueError("Form index not built. Run src/16_build_form_index.py first.")
+    opponent = fixture.get("opponent") or None
+    return index.lookup(team, fixture["date"], opponent)
+
 
-def parse_scorelines(scorelines: str):
-    parts = [p.strip() for p in scorelines.split(",") if p.strip()]
-    if len(parts) != 5:
-        raise ValueError("Enter exactly 5 scorelines, separated by commas.")
+def elo_moved_on(fixture: dict):
+    """The ratings' last date if the fixture is dated on or before it (current ratings would include later results), else None."""
+    state = elo_ratings.state()
+    if fixture.get("date") and state is not None and state.last_date \
+            and str(to_day(fixture["date"])) <= state.last_date:
+        return state.last_date
+    return None
 
-    gf = ga = wins = points = 0
-    for s in parts:
-        m = re.fullmatch(r"(\d+)\s*-\s*(\d+)", s)
-        if not m:
-            raise ValueError(f"Invalid scoreline '{s}'. Use format like 2-1.")
-        chelsea_g = int(m.group(1))
-        opp_g = int(m.group(2))
 
-        gf += chelsea_g
-        ga += opp_g
+def lookup_elo(fixture: dict, team: str = TEAM, is_home=None):
+    """
+    Current ratings of the team and a fixture's "opponent", or None: no
+    ratings file, no opponent, a team the ratings do not know, or a fixture
+    dated on or before the last rated match (see elo_moved_on).
+    """
+    opponent = fixture.get("opponent")
+    if not opponent or elo_ratings.state() is None or elo_moved_on(fixture):
+        return None
+    try:
+        index = form_index.current()
+        if index is not None:
+            opponent = index.teams[index.team_id(opponent)]
+        return elo_ratings.lookup(team, opponent, is_home)
+    except ValueError:
+        return None
 
-        if chelsea_g > opp_g:
-            points += 3
-            wins += 1
-        elif chelsea_g == opp_g:
-            points += 1
 
-    goal_diff = gf - ga
-    win_rate = wins / 5.0
-    return float(points), float(gf), float(ga), float(goal_diff), float(win_rate)
+def fixture_context(entry, fixtures, team: str = TEAM):
+    """
+    What the feature transform needs beyond the fixtures themselves, or
+    None: form index lookups for fixtures named by "date" (which also fill
+    in is_home, odds and pre-match Elo for fixtures already in the data)
+    and, for models with Elo features, the current ratings of a named
+    opponent for upcoming fixtures (lookup_elo).
+    """
+    found = [None] * len(fixtures)
+    for i, fixture in enumerate(fixtures):
+        if not has_form(fixture) and fixture.get("date"):
+            try:
+                found[i] = lookup_form(fixture, team)
+            except ValueError as e:
+                raise FeatureError(i, str(e)) from None
+    context = lookup_context(found) if any(f is not None for f in found) else None
+    transform = entry["bundle"]["transform"]
+    if transform.uses_elo:
+        context = context or {}
+        elo = context.setdefault("elo", np.full((len(fixtures), 2), np.nan))
+        for i, fixture in enumerate(fixtures):
+            if not np.isnan(elo[i]).any() or all(fixture.get(k) is not None for k in ELO_FIELDS):
+                continue
+            opponent = fixture.get("opponent") or (found[i] or {}).get("opponent")
+            current = lookup_elo({**fixture, "opponent": opponent}, team)
+            last_rated = elo_moved_on(fixture)
+            if current is not None:
+                elo[i] = current["team"], current["opponent"]
+            elif opponent and last_rated:
+                raise FeatureError(i, f"Elo ratings for {fixture['date']} are only known for matches in the data; "
+                                      f"give elo_team and elo_opp, or a date after {last_rated}.")
+    return context
 
-def load_bundle():
-    if not os.path.exists(MODEL_PATH):
-        raise FileNotFoundError("Model not found. Run src/08_train_and_save_final_model.py first.")
-    return joblib.load(MODEL_PATH)
+
+def featurize(entry, fixtures, team: str = TEAM):
+    """
+    Raw fixtures -> the model's feature matrix, through the bundle's
+    compiled feature transform (src/feature_spec.py), from `team`'s point
+    of view (scorelines and odds are the team's). Form comes from
+    "last5_scores", all 5 raw form fields, or - given a "date" (and
+    optionally "opponent") - the precomputed form index (fixture_context).
+    Raises FeatureError (a ValueError) carrying the index of the bad fixture.
+    """
+    return entry["bundle"]["transform"](fixtures, fixture_context(entry, fixtures, team))
+
+
+def confidence_level(max_prob: float):
+    if max_prob >= 0.60:
+        return "High"
+    elif max_prob >= 0.45:
+        return "Medium"
+    return "Low"
+
+
+def record_prediction(label: str, confidence: str):
+    metrics.inc("chelsea_predictions_total", **{"class": label, "confidence": confidence})
+
+
+def predict_rows(entry, X):
+    """
+    Score a feature matrix (from featurize) with a single predict_proba
+    pass through the compiled flat forest (src/forest_engine.py). Rows
+    already in the prediction cache for this model version are not scored
+    again. With
+    micro-batching on, the rows join other requests' in one model call.
+    The class is the argmax of the probabilities (what model.predict does
+    internally), so the forest is only walked once.
+    Returns (labels, proba) where proba has shape (n_rows, n_classes).
+    """
+    bundle = entry["bundle"]
+    engine = bundle["engine"]
+    inv_label_map = bundle["inv_label_map"]
+
+    t0 = time.perf_counter()
+    proba = batcher.predict(entry, X) if batcher is not None else score(entry, X)
+    if startup["first_prediction_seconds"] is None:
+        startup["first_prediction_seconds"] = time.perf_counter() - t0
+        app.logger.info(format_startup(startup))
+    labels = [inv_label_map[c] for c in engine.classes_]
+    return labels, proba
 
 
 @app.route("/", methods=["GET", "POST"])
 def index():
+    timer = RequestTimer(metrics, "index")
     result = None
     probs = None
     confidence = None
     error = None
     used = None
+    status = 200
 
     if request.method == "POST":
         try:
-            bundle = load_bundle()
-            model = bundle["model"]
-            FEATURES = bundle["features"]
-            inv_label_map = bundle["inv_label_map"]
-
-            is_home = int(request.form.get("is_home"))
-            odds_win = float(request.form.get("odds_win"))
-            odds_draw = float(request.form.get("odds_draw"))
-            odds_loss = float(request.form.get("odds_loss"))
-            last5_scores = request.form.get("last5_scores", "").strip()
-
-            formpoints_5, goalsfor_5, goalsagainst_5, goaldiff_5, winrate_5 = parse_scorelines(last5_scores)
-
-            row = {
-                "IsHome": is_home,
-                "FormPoints_5": formpoints_5,
-                "GoalsFor_5": goalsfor_5,
-                "GoalsAgainst_5": goalsagainst_5,
-                "GoalDiff_5": goaldiff_5,
-                "WinRate_5": winrate_5,
-                "Odds_Win": odds_win,
-                "Odds_Draw": odds_draw,
-                "Odds_Loss": odds_loss,
-            }
-
-            X = pd.DataFrame([row])[FEATURES]
-            pred_class = int(model.predict(X)[0])
-            proba = model.predict_proba(X)[0]
-
-            labels = [inv_label_map[c] for c in model.classes_]
+            with timer.phase("parse"):
+                # Blank form fields count as not given
+                fixture = {k: v.strip() for k, v in request.form.items() if v.strip()}
+                team = fixture_team(fixture)
+                entry = model_entry(team)
+            with timer.phase("featurize"):
+                X = featurize(entry, [fixture], team)
+
+            with timer.phase("inference"):
+                labels, proba = predict_rows(entry, X)
+            proba = proba[0]
+
             probs = {labels[i]: round(float(proba[i]), 3) for i in range(len(labels))}
-            result = inv_label_map[pred_class]
-            used = row
+            result = labels[int(np.argmax(proba))]
+            used = dict(zip(entry["bundle"]["features"], X[0].tolist()))
 
             # Determine prediction confidence
-            max_prob = max(probs.values())
-            if max_prob >= 0.60:
-                confidence = "High"
-            elif max_prob >= 0.45:
-                confidence = "Medium"
-            else:
-                confidence = "Low"
+            confidence = confidence_level(max(probs.values()))
+            record_prediction(result, confidence)
 
+        except INPUT_ERRORS as e:
+            metrics.inc("chelsea_errors_total", endpoint="index", type=type(e).__name__)
+            error = f"Missing field {e}" if isinstance(e, KeyError) else str(e)
         except Exception as e:
-            error = str(e)
-
-    return render_template(
-        "index.html",
-        result=result,
-        probs=probs,
-        confidence=confidence,
-        error=error,
-        used=used
-    )
+            metrics.inc("chelsea_errors_total", endpoint="index", type=type(e).__name__)
+            app.logger.exception("Prediction failed")
+            error = "Something went wrong while predicting; the error has been logged."
+            status = 500
+
+    with timer.phase("render"):
+        page = render_template(
+            "index.html",
+            result=result,
+            probs=probs,
+            confidence=confidence,
+            error=error,
+            used=used
+        )
+    timer.finish(status)
+    return page, status
+
+
+def api_error(timer, message, status, exc=None, **extra):
+    if exc is not None:
+        metrics.inc("chelsea_errors_total", endpoint=timer.endpoint, type=type(exc).__name__)
+    timer.finish(status)
+    return jsonify({"error": message, **extra}), status
+
+
+@app.route("/api/predict", methods=["POST"])
+def api_predict():
+    """
+    JSON batch prediction. Body is a list of fixtures (or {"fixtures": [...]}):
+      {"is_home": 1, "odds_win": 1.8, "odds_draw": 3.6, "odds_loss": 4.5,
+       "last5_scores": "2-1,0-0,1-2,3-0,1-1"}
+    Raw form stats (formpoints_5, goalsfor_5, ...) can replace last5_scores,
+    or name the fixture with "date" (+ "opponent") to use the form index.
+    Add "team" to predict for another club (its own model, loaded on first
+    use). Fixtures are featurized and scored in one pass per model. An
+    upcoming fixture with an "opponent" also gets both teams' current Elo
+    ratings.
+    """
+    timer = RequestTimer(metrics, "api_predict")
+    with timer.phase("parse"):
+        payload = request.get_json(silent=True)
+        fixtures = payload.get("fixtures") if isinstance(payload, dict) else payload
+    if not isinstance(fixtures, list) or not fixtures:
+        return api_error(timer, "Send a JSON list of fixtures (or {\"fixtures\": [...]}).", 400, ValueError())
+
+    teams = []
+    with timer.phase("featurize"):
+        for i, fixture in enumerate(fixtures):
+            try:
+                if not isinstance(fixture, dict):
+                    raise ValueError("Each fixture must be a JSON object.")
+                teams.append(fixture_team(fixture))
+            except INPUT_ERRORS as e:
+                return api_error(timer, str(e), 400, e, index=i)
+
+    # Group the fixtures by model: one featurize and predict pass per model
+    groups = {}
+    for i, team in enumerate(teams):
+        groups.setdefault(team, []).append(i)
+    try:
+        entries = {team: model_entry(team) for team in groups}
+    except FileNotFoundError as e:
+        return api_error(timer, str(e), 503, e)
+    except ValueError as e:
+        return api_error(timer, str(e), 400, e)
+
+    X = {}
+    with timer.phase("featurize"):
+        for team, idx in groups.items():
+            try:
+                X[team] = featurize(entries[team], [fixtures[i] for i in idx], team)
+            except INPUT_ERRORS as e:
+                msg = f"Missing field {e}" if isinstance(e, KeyError) else str(e)
+                where = {"index": idx[e.index]} if isinstance(e, FeatureError) else {}
+                return api_error(timer, msg, 400, e, **where)
+
+    predictions = [None] * len(fixtures)
+    with timer.phase("inference"):
+        scored = {team: predict_rows(entries[team], X[team]) for team in groups}
+
+    with timer.phase("render"):
+        for team, idx in groups.items():
+            labels, proba = scored[team]
+            entry = entries[team]
+            home_col = entry["bundle"]["features"].index("IsHome")
+            for k, (i, p) in enumerate(zip(idx, proba)):
+                best = int(p.argmax())
+                label = labels[best]
+                confidence = confidence_level(float(p[best]))
+                predictions[i] = {
+                    "team": team,
+                    "model_version": entry["version"],
+                    "prediction": label,
+                    "probabilities": {labels[j]: round(float(p[j]), 3) for j in range(len(labels))},
+                    "confidence": confidence,
+                }
+                if entry.get("scope") == "league":
+                    predictions[i]["model"] = "league"
+                elo = lookup_elo(fixtures[i], team, is_home=X[team][k, home_col])
+                if elo is not None:
+                    predictions[i]["elo"] = {"team": round(elo["team"], 1), "opponent": round(elo["opponent"], 1),
+                                             "expected_score": round(elo["expected_score"], 3),
+                                             "as_of": elo["as_of"]}
+                record_prediction(label, confidence)
+
+        versions = {entry["version"] for entry in entries.values()}
+        response = jsonify({
+            "model_version": versions.pop() if len(versions) == 1 else None,
+            "count": len(predictions),
+            "predictions": predictions,
+        })
+    timer.finish(200)
+    return response
+
+
+@app.route("/api/odds-surface", methods=["POST"])
+def api_odds_surface():
+    """
+    Probabilities for one fixture over a grid of odds, e.g.
+      {"fixture": {"is_home": 1, "odds_draw": 3.6, "last5_scores": "2-1,0-0,1-2,3-0,1-1"},
+       "odds": {"win": {"min": 1.2, "max": 6, "steps": 50}, "loss": {"min": 1.5, "max": 12, "steps": 50}}}
+    Each outcome in "odds" is a {min, max, steps} range or a list of odds;
+    the others keep the fixture's own. The fixture is resolved once and the
+    whole grid is scored in one batched pass (src/odds_surface.py), so a
+    50x50 sweep costs one request instead of 2,500.
+    """
+    timer = RequestTimer(metrics, "api_odds_surface")
+    with timer.phase("parse"):
+        payload = request.get_json(silent=True)
+    if not isinstance(payload, dict) or not isinstance(payload.get("fixture"), dict) \
+            or not isinstance(payload.get("odds"), dict):
+        return api_error(timer, "Send {\"fixture\": {...}, \"odds\": {\"win\": {\"min\", \"max\", \"steps\"}, ...}}.",
+                         400, ValueError())
+    fixture = payload["fixture"]
+
+    try:
+        team = fixture_team(fixture)
+        entry = model_entry(team)
+    except FileNotFoundError as e:
+        return api_error(timer, str(e), 503, e)
+    except INPUT_ERRORS as e:
+        return api_error(timer, str(e), 400, e)
+
+    bundle = entry["bundle"]
+    try:
+        with timer.phase("featurize"):
+            raw = bundle["transform"].raw([fixture], fixture_context(entry, [fixture], team))
+        with timer.phase("inference"):
+            surface = score_surface(bundle, raw, payload["odds"])
+    except INPUT_ERRORS as e:
+        return api_error(timer, f"Missing field {e}" if isinstance(e, KeyError) else str(e), 400, e)
+
+    with timer.phase("render"):
+        response = jsonify({"team": team, "model_version": entry["version"], **surface_json(surface)})
+    timer.finish(200)
+    return response
+
+
+@app.route("/api/model", methods=["GET"])
+def model_info():
+    return jsonify({
+        **registry.info(),
+        "prediction_cache": prediction_cache.info(),
+        "micro_batching": batcher.info() if batcher is not None else None,
+        "team_models": team_registry.info(),
+        "elo": elo_ratings.info(),
+        "startup": startup,
+    })
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    """Prometheus text format, totals across every worker of this server."""
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file